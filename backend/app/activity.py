@@ -0,0 +1,198 @@
+﻿from __future__ import annotations
+
+from datetime import date
+
+from sqlalchemy import delete, event, func, insert, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from .models import ActivityDaily, ChecklistItem, UpdateLog, Workspace, live_idea_ids
+from .tagger import DONE
+
+# Bump when what the rollup counts changes: the next startup rebuilds it once.
+ROLLUP_VERSION = 1
+
+_DELTAS_KEY = "activity_deltas"
+_TABLE = ActivityDaily.__table__
+_KEY_COLUMNS = ("workspace_id", "idea_id", "day")
+
+
+def _delta(session: Session | None, workspace_id: str, idea_id: str, day: date, logs: int, done: int) -> None:
+    if session is None:
+        return
+    deltas = session.info.setdefault(_DELTAS_KEY, {})
+    counts = deltas.setdefault((workspace_id, idea_id, day), [0, 0])
+    counts[0] += logs
+    counts[1] += done
+
+
+def _log_inserted(mapper, connection, target: UpdateLog) -> None:
+    _delta(Session.object_session(target), target.workspace_id, target.idea_id, target.created_at.date(), 1, 0)
+
+
+def _log_deleted(mapper, connection, target: UpdateLog) -> None:
+    session = Session.object_session(target)
+    _delta(session, target.workspace_id, target.idea_id, target.created_at.date(), -1, 0)
+    # Items not loaded in the session go with the log through ON DELETE CASCADE, without
+    # ORM events of their own: count them here, before the DELETE (loaded ones are gone by now).
+    items = ChecklistItem.__table__
+    for day, done in connection.execute(
+        select(items.c.report_date, func.count())
+        .where(items.c.log_id == target.id, items.c.state == DONE)
+        .group_by(items.c.report_date)
+    ):
+        _delta(session, target.workspace_id, target.idea_id, day, 0, -done)
+
+
+def _item_inserted(mapper, connection, target: ChecklistItem) -> None:
+    if target.state == DONE:
+        _delta(Session.object_session(target), target.workspace_id, target.idea_id, target.report_date, 0, 1)
+
+
+def _item_deleted(mapper, connection, target: ChecklistItem) -> None:
+    if target.state == DONE:
+        _delta(Session.object_session(target), target.workspace_id, target.idea_id, target.report_date, 0, -1)
+
+
+event.listen(UpdateLog, "after_insert", _log_inserted)
+event.listen(UpdateLog, "before_delete", _log_deleted)
+event.listen(ChecklistItem, "after_insert", _item_inserted)
+event.listen(ChecklistItem, "after_delete", _item_deleted)
+
+
+def _upsert_statement(connection: Connection):
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    statement = dialect_insert(_TABLE)
+    return statement.on_conflict_do_update(
+        index_elements=list(_KEY_COLUMNS),
+        set_={
+            "log_count": _TABLE.c.log_count + statement.excluded.log_count,
+            "done_count": _TABLE.c.done_count + statement.excluded.done_count,
+        },
+    )
+
+
+def apply_deltas(connection: Connection, deltas: dict[tuple[str, str, date], list[int]]) -> None:
+    """Add per-(workspace, idea, day) count deltas to the rollup in one executemany upsert."""
+    rows = [
+        {"workspace_id": workspace_id, "idea_id": idea_id, "day": day, "log_count": logs, "done_count": done}
+        for (workspace_id, idea_id, day), (logs, done) in deltas.items()
+        if logs or done
+    ]
+    if not rows:
+        return
+    statement = _upsert_statement(connection)
+    if statement is not None:
+        connection.execute(statement, rows)
+    else:
+        for row in rows:
+            key = [_TABLE.c[name] == row[name] for name in _KEY_COLUMNS]
+            changed = connection.execute(
+                update(_TABLE)
+                .where(*key)
+                .values(log_count=_TABLE.c.log_count + row["log_count"], done_count=_TABLE.c.done_count + row["done_count"])
+            ).rowcount
+            if not changed:
+                connection.execute(insert(_TABLE).values(**row))
+    shrunk = {row["workspace_id"] for row in rows if row["log_count"] < 0 or row["done_count"] < 0}
+    if shrunk:
+        connection.execute(
+            delete(_TABLE).where(_TABLE.c.workspace_id.in_(shrunk), _TABLE.c.log_count <= 0, _TABLE.c.done_count <= 0)
+        )
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_on_flush(session: Session, flush_context) -> None:
+    # Same transaction as the rows themselves: a rollback undoes the rollup change too.
+    deltas = session.info.pop(_DELTAS_KEY, None)
+    if deltas:
+        apply_deltas(session.connection(), deltas)
+
+
+def rebuild(db: Session, workspace_id: str | None = None) -> int:
+    """Recompute the rollup of one workspace (default: all) from update logs and checklist items.
+
+    The workspace rows are locked and the old rollup deleted before counting: a writer adding
+    logs meanwhile waits for the commit (it bumps the workspace revision) instead of applying a
+    delta the recount would lose. Returns rows written.
+    """
+    log_keys = (UpdateLog.workspace_id, UpdateLog.idea_id, func.date(UpdateLog.created_at))
+    done_keys = (ChecklistItem.workspace_id, ChecklistItem.idea_id, ChecklistItem.report_date)
+    locked = select(Workspace.id).with_for_update()
+    stale = delete(ActivityDaily)
+    logs_q = select(*log_keys, func.count()).group_by(*log_keys)
+    done_q = select(*done_keys, func.count()).where(ChecklistItem.state == DONE).group_by(*done_keys)
+    if workspace_id is not None:
+        locked = locked.where(Workspace.id == workspace_id)
+        stale = stale.where(ActivityDaily.workspace_id == workspace_id)
+        logs_q = logs_q.where(UpdateLog.workspace_id == workspace_id)
+        done_q = done_q.where(ChecklistItem.workspace_id == workspace_id)
+    db.execute(locked).all()
+    db.execute(stale)
+
+    counts: dict[tuple[str, str, date], list[int]] = {}
+    for workspace, idea_id, day, logs in db.execute(logs_q):
+        # date() is a string on SQLite and a date on PostgreSQL.
+        counts.setdefault((workspace, idea_id, date.fromisoformat(str(day))), [0, 0])[0] += logs
+    for workspace, idea_id, day, done in db.execute(done_q):
+        counts.setdefault((workspace, idea_id, day), [0, 0])[1] += done
+    rows = [
+        {"workspace_id": workspace, "idea_id": idea_id, "day": day, "log_count": logs, "done_count": done}
+        for (workspace, idea_id, day), (logs, done) in counts.items()
+    ]
+    if rows:
+        db.execute(insert(ActivityDaily), rows)
+    db.commit()
+    return len(rows)
+
+
+def heatmap(
+    db: Session, workspace_id: str, start: date, end: date, idea_id: str | None = None, by_idea: bool = False
+) -> list[dict]:
+    """Days in [start, end] with activity: log and completed-item counts, per idea or summed."""
+    keys = [ActivityDaily.day, ActivityDaily.idea_id] if by_idea else [ActivityDaily.day]
+    q = select(*keys, func.sum(ActivityDaily.log_count), func.sum(ActivityDaily.done_count)).where(
+        ActivityDaily.workspace_id == workspace_id,
+        ActivityDaily.day >= start,
+        ActivityDaily.day <= end,
+        ActivityDaily.idea_id.in_(live_idea_ids(workspace_id)),
+    )
+    if idea_id:
+        q = q.where(ActivityDaily.idea_id == idea_id)
+    days: list[dict] = []
+    for row in db.execute(q.group_by(*keys).order_by(*keys)):
+        day = {"day": row[0], "logs": int(row[-2]), "done": int(row[-1])}
+        if by_idea:
+            day["idea_id"] = row[1]
+        days.append(day)
+    return days
+
+
+def active_idea_ids(db: Session, workspace_id: str, since: date) -> set[str]:
+    """Ideas with at least one update log on or after `since`."""
+    return set(
+        db.scalars(
+            select(ActivityDaily.idea_id)
+            .where(
+                ActivityDaily.workspace_id == workspace_id,
+                ActivityDaily.day >= since,
+                ActivityDaily.log_count > 0,
+                ActivityDaily.idea_id.in_(live_idea_ids(workspace_id)),
+            )
+            .distinct()
+        )
+    )
+
+
+def last_log_day(db: Session, workspace_id: str, idea_id: str) -> date | None:
+    return db.scalar(
+        select(func.max(ActivityDaily.day)).where(
+            ActivityDaily.workspace_id == workspace_id, ActivityDaily.idea_id == idea_id, ActivityDaily.log_count > 0
+        )
+    )
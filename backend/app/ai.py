@@ -0,0 +1,342 @@
+﻿from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+import logging
+import random
+import threading
+import time
+
+from . import metrics, usage
+from .config import settings
+
+logger = logging.getLogger("researchos.ai")
+
+
+class ProviderError(Exception):
+    """A provider call failed. `retryable` errors (timeouts, 429, 5xx) may be retried."""
+
+    def __init__(self, message: str, retryable: bool = False, status_code: int | None = None) -> None:
+        super().__init__(message)
+        self.retryable = retryable
+        self.status_code = status_code
+
+
+class ProviderTimeout(ProviderError):
+    def __init__(self, message: str = "provider timed out") -> None:
+        super().__init__(message, retryable=True)
+
+
+class CircuitOpenError(ProviderError):
+    def __init__(self) -> None:
+        super().__init__("circuit open: provider calls are short-circuited", retryable=False)
+
+
+class RateLimited(ProviderError):
+    def __init__(self) -> None:
+        super().__init__("local rate limit: no capacity within AI_QUEUE_TIMEOUT_SECONDS", retryable=False)
+
+
+@dataclass
+class Completion:
+    text: str
+    model: str
+    input_tokens: int = 0
+    output_tokens: int = 0
+    latency_ms: float = 0.0
+
+
+class Provider:
+    name = ""
+
+    def complete(self, system: str, user: str, max_output_tokens: int, model: str) -> Completion:
+        raise NotImplementedError
+
+    def probe(self) -> None:
+        """Cheap connectivity/credential check; raises ProviderError on failure."""
+        raise NotImplementedError
+
+
+class OpenAIProvider(Provider):
+    name = "openai"
+
+    def __init__(self, api_key: str, timeout_s: float) -> None:
+        self._api_key = api_key
+        self._timeout_s = timeout_s
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        # One client per process: it owns the HTTP connection pool. Import is deferred (~0.7 s).
+        with self._lock:
+            if self._client is None:
+                from openai import OpenAI
+
+                # Retries are handled by complete() below so they share one budget with the breaker.
+                self._client = OpenAI(api_key=self._api_key, timeout=self._timeout_s, max_retries=0)
+            return self._client
+
+    def _translate(self, exc: Exception) -> ProviderError:
+        import openai
+
+        if isinstance(exc, openai.APITimeoutError):
+            return ProviderTimeout(str(exc))
+        if isinstance(exc, openai.APIConnectionError):
+            return ProviderError(str(exc), retryable=True)
+        if isinstance(exc, openai.APIStatusError):
+            status = exc.status_code
+            return ProviderError(str(exc), retryable=status == 429 or status >= 500, status_code=status)
+        return ProviderError(str(exc))
+
+    def complete(self, system: str, user: str, max_output_tokens: int, model: str) -> Completion:
+        client = self._get_client()
+        started = time.perf_counter()
+        try:
+            response = client.responses.create(
+                model=model,
+                input=[{"role": "system", "content": system}, {"role": "user", "content": user}],
+                max_output_tokens=max_output_tokens,
+            )
+        except Exception as exc:
+            raise self._translate(exc) from exc
+        usage = getattr(response, "usage", None)
+        return Completion(
+            text=(response.output_text or "").strip(),
+            model=model,
+            input_tokens=(usage.input_tokens or 0) if usage is not None else 0,
+            output_tokens=(usage.output_tokens or 0) if usage is not None else 0,
+            latency_ms=(time.perf_counter() - started) * 1000,
+        )
+
+    def probe(self) -> None:
+        try:
+            self._get_client().models.list()
+        except Exception as exc:
+            raise self._translate(exc) from exc
+
+
+class FakeProvider(Provider):
+    """Offline provider with configurable latency, errors and timeouts (FAKE_AI_* settings)."""
+
+    name = "fake"
+
+    def __init__(self, latency_ms: float, failure_rate: float, timeout_rate: float, seed: int | None = None) -> None:
+        self.latency_ms = latency_ms
+        self.failure_rate = failure_rate
+        self.timeout_rate = timeout_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _roll(self) -> float:
+        with self._lock:
+            return self._rng.random()
+
+    def _maybe_fail(self) -> None:
+        roll = self._roll()
+        if roll < self.timeout_rate:
+            time.sleep(settings.ai_timeout_seconds)
+            raise ProviderTimeout()
+        if roll < self.timeout_rate + self.failure_rate:
+            time.sleep(self.latency_ms / 1000)
+            raise ProviderError("fake provider error", retryable=True, status_code=503)
+
+    def complete(self, system: str, user: str, max_output_tokens: int, model: str) -> Completion:
+        from .services import _local_summarize_markdown
+
+        started = time.perf_counter()
+        self._maybe_fail()
+        time.sleep(self.latency_ms / 1000)
+        summary, tags = _local_summarize_markdown(user)
+        lines = ["SUMMARY:", *[f"- {line.lstrip('- ')}" for line in summary.splitlines()[:5]], f"TAGS: {', '.join(tags)}"]
+        return Completion(
+            text="\n".join(lines),
+            model=model,
+            input_tokens=(len(system) + len(user)) // 4,
+            output_tokens=min(max_output_tokens, len(summary) // 4 + 8),
+            latency_ms=(time.perf_counter() - started) * 1000,
+        )
+
+    def probe(self) -> None:
+        self._maybe_fail()
+
+
+class CircuitBreaker:
+    """Closed -> open after `failure_threshold` consecutive failures; after `reset_timeout_s`
+    a single half-open probe call decides between closing again and re-opening."""
+
+    def __init__(self, failure_threshold: int, reset_timeout_s: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout_s:
+                self.state = "half_open"
+                self._probe_in_flight = False
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def cancel(self) -> None:
+        """The allowed call never reached the provider; let another caller take the half-open probe."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning("ai circuit opened after %d consecutive failures", self.failures)
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+
+_provider: Provider | None = None
+_provider_lock = threading.Lock()
+breaker = CircuitBreaker(settings.ai_breaker_failure_threshold, settings.ai_breaker_reset_seconds)
+
+
+def get_provider() -> Provider | None:
+    """The configured provider, or None when summarization should stay local."""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            if settings.ai_provider == "fake":
+                _provider = FakeProvider(
+                    settings.fake_ai_latency_ms, settings.fake_ai_failure_rate, settings.fake_ai_timeout_rate
+                )
+            elif settings.ai_provider == "openai" and settings.openai_api_key:
+                _provider = OpenAIProvider(settings.openai_api_key, settings.ai_timeout_seconds)
+        return _provider
+
+
+def complete(provider: Provider, system: str, user: str, max_output_tokens: int, model: str) -> Completion:
+    """Call `provider` within the local rate limits and behind the circuit breaker.
+
+    Waits (up to AI_QUEUE_TIMEOUT_SECONDS) for token-bucket and concurrency capacity, retries
+    retryable errors within the retry budget, and records the outcome in the usage ledger.
+    """
+    estimated = (len(system) + len(user)) // 4 + max_output_tokens
+    if not usage.bucket.acquire(estimated, settings.ai_queue_timeout_seconds):
+        usage.ledger.record(provider.name, model, "rate_limited")
+        raise RateLimited()
+    if not breaker.allow():
+        usage.bucket.settle(estimated, 0)
+        raise CircuitOpenError()
+
+    started = time.perf_counter()
+    deadline = time.monotonic() + settings.ai_retry_budget_seconds
+    attempt = 0
+    while True:
+        if not usage.concurrency.acquire(max(0.0, deadline - time.monotonic())):
+            breaker.cancel()
+            usage.ledger.record(provider.name, model, "rate_limited", latency_ms=(time.perf_counter() - started) * 1000)
+            raise RateLimited()
+        try:
+            result = provider.complete(system, user, max_output_tokens, model)
+        except ProviderError as exc:
+            usage.concurrency.release(throttled=exc.status_code == 429)
+            backoff = settings.ai_retry_backoff_seconds * (2**attempt) * random.uniform(0.5, 1.5)
+            attempt += 1
+            if not exc.retryable or attempt > settings.ai_max_retries or time.monotonic() + backoff >= deadline:
+                breaker.record_failure()
+                outcome = "timeout" if isinstance(exc, ProviderTimeout) else "throttled" if exc.status_code == 429 else "error"
+                usage.ledger.record(provider.name, model, outcome, latency_ms=(time.perf_counter() - started) * 1000)
+                raise
+            time.sleep(backoff)
+            continue
+        usage.concurrency.release()
+        breaker.record_success()
+        usage.bucket.settle(estimated, result.input_tokens + result.output_tokens)
+        usage.ledger.record(
+            provider.name,
+            model,
+            "ok" if result.text else "empty_output",
+            result.input_tokens,
+            result.output_tokens,
+            (time.perf_counter() - started) * 1000,
+        )
+        return result
+
+
+@dataclass
+class HealthStatus:
+    status: str  # active | error | inactive | unknown
+    message: str
+    checked_at: datetime | None = None
+    latency_ms: float | None = None
+
+
+class HealthMonitor:
+    """Provider health, probed in a background thread and served from cache."""
+
+    def __init__(self, interval_s: float) -> None:
+        self.interval_s = interval_s
+        self._status = HealthStatus("unknown", "Health check pending.")
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def refresh(self) -> HealthStatus:
+        provider = get_provider()
+        if provider is None:
+            status = HealthStatus("inactive", "No API key configured. Using local fallback summarization.", datetime.utcnow())
+        else:
+            started = time.perf_counter()
+            try:
+                provider.probe()
+                status = HealthStatus("active", f"{provider.name} is connected and working.", datetime.utcnow())
+            except ProviderError as exc:
+                status = HealthStatus("error", f"API key set but validation failed: {exc}", datetime.utcnow())
+            status.latency_ms = round((time.perf_counter() - started) * 1000, 1)
+        with self._lock:
+            self._status = status
+        return status
+
+    def _loop(self) -> None:
+        while True:
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("ai health probe failed")
+            time.sleep(self.interval_s)
+
+    def ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, name="researchos-ai-health", daemon=True)
+        self._thread.start()
+
+    def current(self) -> HealthStatus:
+        self.ensure_started()
+        with self._lock:
+            status = self._status
+        metrics.record_cache("ai_health", status.checked_at is not None)
+        return status
+
+
+health = HealthMonitor(settings.ai_health_refresh_seconds)
+
+metrics.registry.register(
+    metrics.Gauge(
+        "researchos_ai_circuit_state",
+        "AI provider circuit breaker: 0 closed, 1 half-open, 2 open.",
+        lambda: [((), {"closed": 0.0, "half_open": 1.0, "open": 2.0}[breaker.state])],
+    )
+)
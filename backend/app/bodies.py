@@ -0,0 +1,137 @@
+﻿from __future__ import annotations
+
+from datetime import datetime, timedelta
+import hashlib
+import zlib
+
+from sqlalchemy import delete, event, insert, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .models import ReportBody, UpdateLog
+
+# Stored as-is when compression would not save at least this fraction (short reports).
+_MIN_SAVING = 0.1
+
+
+def body_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def encode(text: str) -> tuple[str, bytes]:
+    """(codec, data) for `text` with the configured codec, or "raw" when that does not pay off."""
+    raw = text.encode("utf-8")
+    codec = settings.report_body_codec
+    zstandard = _zstd() if codec == "zstd" else None
+    if zstandard is not None:
+        data = zstandard.ZstdCompressor(level=settings.report_body_level).compress(raw)
+    else:
+        # zstd without the optional `zstandard` package falls back to zlib.
+        codec = "zlib"
+        data = zlib.compress(raw, min(settings.report_body_level, 9))
+    if len(data) > len(raw) * (1 - _MIN_SAVING):
+        return "raw", raw
+    return codec, data
+
+
+def decode(codec: str, data: bytes) -> str:
+    if codec == "raw":
+        raw = data
+    elif codec == "zlib":
+        raw = zlib.decompress(data)
+    elif codec == "zstd":
+        zstandard = _zstd()
+        if zstandard is None:
+            raise RuntimeError("report body is zstd-compressed; install `zstandard` to read it")
+        raw = zstandard.ZstdDecompressor().decompress(data)
+    else:
+        raise ValueError(f"Unknown report body codec: {codec}")
+    return bytes(raw).decode("utf-8")
+
+
+def _insert_ignore(connection: Connection):
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert(ReportBody.__table__).on_conflict_do_nothing(index_elements=["hash"])
+
+
+def store(connection: Connection, texts: dict[str, str]) -> None:
+    """Make sure a blob exists for every {hash: text}; bodies already stored are not re-sent.
+
+    Reused blobs get a fresh `created_at`, which keeps `prune` off them until the logs
+    referring to them are committed.
+    """
+    if not texts:
+        return
+    table = ReportBody.__table__
+    known = set(connection.scalars(select(table.c.hash).where(table.c.hash.in_(list(texts)))))
+    now = datetime.utcnow()
+    if known:
+        # A prune may delete a blob between the SELECT and here; only blobs still present count as
+        # stored. The touched rows stay locked until this transaction commits.
+        touch = update(table).where(table.c.hash.in_(known)).values(created_at=now)
+        if connection.dialect.update_returning:
+            known = set(connection.scalars(touch.returning(table.c.hash)))
+        else:
+            connection.execute(touch)
+            known = set(connection.scalars(select(table.c.hash).where(table.c.hash.in_(known))))
+    rows = []
+    for digest, text in texts.items():
+        if digest in known:
+            continue
+        codec, data = encode(text)
+        rows.append({"hash": digest, "codec": codec, "data": data, "size": len(text), "created_at": now})
+    if not rows:
+        return
+    # A concurrent writer may store the same body between the SELECT and the INSERT.
+    statement = _insert_ignore(connection)
+    if statement is not None:
+        connection.execute(statement, rows)
+    else:
+        for row in rows:
+            if connection.scalar(select(table.c.hash).where(table.c.hash == row["hash"])) is None:
+                connection.execute(insert(table).values(**row))
+
+
+@event.listens_for(Session, "before_flush")
+def _store_on_flush(session: Session, flush_context, instances) -> None:
+    # Bodies set through UpdateLog.body_md since the last flush; one SELECT + INSERT per flush.
+    texts: dict[str, str] = {}
+    for obj in (*session.new, *session.dirty):
+        if isinstance(obj, UpdateLog) and obj not in session.deleted:
+            pending = obj.__dict__.pop("_body_pending", None)
+            if pending is not None:
+                texts[pending[0]] = pending[1]
+    if texts:
+        store(session.connection(), texts)
+
+
+def prune(db: Session) -> int:
+    """Delete blobs no update log refers to any more. Returns blobs removed.
+
+    Blobs stored or reused within the last `report_body_prune_grace_seconds` are kept: a writer
+    may not have committed the log that refers to them yet.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.report_body_prune_grace_seconds)
+    referenced = select(UpdateLog.body_hash).where(UpdateLog.body_hash == ReportBody.hash).exists()
+    removed = db.execute(
+        delete(ReportBody)
+        .where(ReportBody.created_at < cutoff, ~referenced)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return removed
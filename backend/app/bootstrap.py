@@ -0,0 +1,338 @@
+﻿from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import datetime
+import hashlib
+import hmac
+import importlib
+import logging
+import threading
+import time
+
+from sqlalchemy import inspect as sa_inspect, select, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.schema import CreateTable
+
+from . import ai, bodies, events, jobs, usage
+from .config import settings
+from .db import Base, SessionLocal, engine
+from .models import BootstrapStep, Deliverable, Idea, Task, UpdateLog, Workspace
+
+logger = logging.getLogger("researchos.bootstrap")
+
+# Bump when _run_migrations gains a step that the model metadata does not capture.
+MIGRATIONS_VERSION = 5
+
+
+@dataclass
+class Readiness:
+    state: str = "starting"  # starting | ready | failed
+    steps: dict[str, dict] = field(default_factory=dict)
+    error: str | None = None
+    started: float = field(default_factory=time.perf_counter)
+    finished: float | None = None
+    _done: threading.Event = field(default_factory=threading.Event)
+
+    def wait(self, timeout: float) -> bool:
+        """Block until startup has finished; True only if it succeeded."""
+        self._done.wait(timeout)
+        return self.state == "ready"
+
+    def as_dict(self) -> dict:
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        return {
+            "status": self.state,
+            "elapsed_ms": round(elapsed * 1000, 1),
+            "steps": self.steps,
+            "error": self.error,
+        }
+
+
+readiness = Readiness()
+
+
+def _run_migrations() -> None:
+    """Add columns that were introduced after the initial schema."""
+    with engine.connect() as conn:
+        inspector = sa_inspect(engine)
+
+        # --- tasks.sort_order (added in PR#2) ---
+        if "tasks" in inspector.get_table_names():
+            cols = {c["name"] for c in inspector.get_columns("tasks")}
+            if "sort_order" not in cols:
+                conn.execute(text("ALTER TABLE tasks ADD COLUMN sort_order INTEGER NOT NULL DEFAULT 0"))
+                conn.commit()
+
+        # --- stored priority score (app/priority.py); filled by the "priority" startup step ---
+        for table_name in ("ideas", "tasks"):
+            if table_name in inspector.get_table_names():
+                cols = {c["name"] for c in inspector.get_columns(table_name)}
+                if "priority_score" not in cols:
+                    conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN priority_score FLOAT NOT NULL DEFAULT 0"))
+                    conn.commit()
+
+        # --- ideas.deleted_at (soft delete, purged in the background) ---
+        if "ideas" in inspector.get_table_names():
+            cols = {c["name"] for c in inspector.get_columns("ideas")}
+            if "deleted_at" not in cols:
+                conn.execute(text("ALTER TABLE ideas ADD COLUMN deleted_at TIMESTAMP"))
+                conn.commit()
+
+        # --- update_logs.body_md moved to report_bodies (compressed, one row per distinct body) ---
+        if "update_logs" in inspector.get_table_names():
+            cols = {c["name"] for c in inspector.get_columns("update_logs")}
+            if "body_md" in cols:
+                _migrate_bodies(conn, "body_hash" in cols)
+
+        # --- revision columns for delta sync ---
+        # Pre-existing rows start at revision 1 so a first sync from `since=0` returns them.
+        for model in (Workspace, Idea, Task, Deliverable, UpdateLog):
+            table = model.__table__
+            cols = {c["name"] for c in inspector.get_columns(table.name)}
+            if "revision" not in cols:
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN revision INTEGER NOT NULL DEFAULT 1"))
+                conn.commit()
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+        conn.commit()
+    _migrate_cascades()
+
+
+def _migrate_bodies(conn, has_hash: bool, batch_size: int = 500) -> None:
+    """Copy inline bodies into report_bodies batch by batch, then drop update_logs.body_md.
+
+    Each batch commits, so an interrupted startup resumes with the logs that have no hash yet.
+    """
+    if not has_hash:
+        conn.execute(text("ALTER TABLE update_logs ADD COLUMN body_hash VARCHAR(64)"))
+        conn.commit()
+    moved = 0
+    while True:
+        rows = conn.execute(
+            text("SELECT id, body_md FROM update_logs WHERE body_hash IS NULL LIMIT :limit"), {"limit": batch_size}
+        ).all()
+        if not rows:
+            break
+        hashes = {row.id: bodies.body_hash(row.body_md or "") for row in rows}
+        bodies.store(conn, {hashes[row.id]: row.body_md or "" for row in rows})
+        conn.execute(
+            text("UPDATE update_logs SET body_hash = :hash WHERE id = :id"),
+            [{"id": log_id, "hash": digest} for log_id, digest in hashes.items()],
+        )
+        conn.commit()
+        moved += len(rows)
+    conn.execute(text("ALTER TABLE update_logs DROP COLUMN body_md"))
+    conn.commit()
+    logger.info("moved %d update log bodies to report_bodies", moved)
+
+
+def _cascade_targets() -> dict[str, list[dict]]:
+    """Existing foreign keys to ideas / update_logs that lack the ON DELETE CASCADE of the models."""
+    inspector = sa_inspect(engine)
+    existing = set(inspector.get_table_names())
+    targets: dict[str, list[dict]] = {}
+    for table in Base.metadata.sorted_tables:
+        wanted = {fk.parent.name for fk in table.foreign_keys if fk.ondelete == "CASCADE"}
+        if table.name not in existing or not wanted:
+            continue
+        stale = [
+            fk
+            for fk in inspector.get_foreign_keys(table.name)
+            if set(fk["constrained_columns"]) & wanted
+            and (fk.get("options") or {}).get("ondelete", "").upper() != "CASCADE"
+        ]
+        if stale:
+            targets[table.name] = stale
+    return targets
+
+
+def _migrate_cascades() -> None:
+    """Recreate idea / update log foreign keys with ON DELETE CASCADE.
+
+    Rows orphaned by deletes from before the cascade existed are removed first, since they
+    would fail the constraint. PostgreSQL swaps the constraints in place. SQLite cannot alter
+    a constraint, so the table is rebuilt: create a copy with the new definition, copy rows,
+    drop the old table and rename the copy. This runs with foreign key enforcement off.
+    """
+    targets = _cascade_targets()
+    if not targets:
+        return
+    logger.info("adding ON DELETE CASCADE to %s", ", ".join(targets))
+    sqlite = engine.dialect.name == "sqlite"
+    with engine.connect() as conn:
+        if sqlite:
+            conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        for name in targets:
+            table = Base.metadata.tables[name]
+            for fk in table.foreign_keys:
+                if fk.ondelete == "CASCADE":
+                    parent = fk.column.table.name
+                    conn.execute(
+                        text(f"DELETE FROM {name} WHERE {fk.parent.name} NOT IN (SELECT {fk.column.name} FROM {parent})")
+                    )
+            if sqlite:
+                old_columns = {c["name"] for c in sa_inspect(conn).get_columns(name)}
+                columns = ", ".join(c.name for c in table.columns if c.name in old_columns)
+                ddl = str(CreateTable(table).compile(dialect=engine.dialect))
+                conn.exec_driver_sql(ddl.replace(f"CREATE TABLE {name} (", f"CREATE TABLE {name}__new (", 1))
+                conn.exec_driver_sql(f"INSERT INTO {name}__new ({columns}) SELECT {columns} FROM {name}")
+                conn.exec_driver_sql(f"DROP TABLE {name}")
+                conn.exec_driver_sql(f"ALTER TABLE {name}__new RENAME TO {name}")
+                for index in table.indexes:
+                    index.create(conn)
+            else:
+                for fk in targets[name]:
+                    local = ", ".join(fk["constrained_columns"])
+                    remote = ", ".join(fk["referred_columns"])
+                    conn.execute(text(f'ALTER TABLE {name} DROP CONSTRAINT "{fk["name"]}"'))
+                    conn.execute(
+                        text(
+                            f'ALTER TABLE {name} ADD CONSTRAINT "{fk["name"]}" FOREIGN KEY ({local}) '
+                            f'REFERENCES {fk["referred_table"]} ({remote}) ON DELETE CASCADE'
+                        )
+                    )
+        conn.commit()
+        if sqlite:
+            conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+
+
+def _schema_fingerprint() -> str:
+    parts = [f"migrations:{MIGRATIONS_VERSION}"]
+    for table in sorted(Base.metadata.tables.values(), key=lambda t: t.name):
+        parts.append(table.name)
+        parts.extend(f"{table.name}.{column.name}:{column.type}" for column in table.columns)
+        parts.extend(f"{table.name}#{index.name}" for index in sorted(table.indexes, key=lambda i: i.name or ""))
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+def _apply_schema() -> None:
+    Base.metadata.create_all(bind=engine)
+    _run_migrations()
+
+
+def _owner_fingerprint() -> str:
+    # Keyed hash: the owner password must not be recoverable from the bootstrap table.
+    material = "\n".join([settings.owner_email, settings.owner_password, settings.owner_workspace_name])
+    return hmac.new(settings.jwt_secret.encode("utf-8"), material.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def _apply_owner() -> None:
+    from .services import ensure_owner_context
+
+    with SessionLocal() as db:
+        ensure_owner_context(db)
+
+
+def _activity_fingerprint() -> str:
+    from .activity import ROLLUP_VERSION
+
+    return f"activity:{ROLLUP_VERSION}"
+
+
+def _apply_activity() -> None:
+    # Fills the rollup for logs written before it existed; afterwards it is maintained on write.
+    from . import activity
+
+    with SessionLocal() as db:
+        activity.rebuild(db)
+
+
+def _priority_fingerprint() -> str:
+    from .priority import formula_fingerprint
+
+    return formula_fingerprint()
+
+
+def _apply_priority() -> None:
+    from . import priority
+
+    with SessionLocal() as db:
+        priority.rescore(db)
+
+
+# (name, fingerprint, apply). A step is skipped when bootstrap_steps already holds its
+# current fingerprint, so a warm restart costs one SELECT instead of schema reflection,
+# create_all and a PBKDF2 round.
+STEPS: list[tuple[str, Callable[[], str], Callable[[], None]]] = [
+    ("schema", _schema_fingerprint, _apply_schema),
+    ("owner", _owner_fingerprint, _apply_owner),
+    ("activity", _activity_fingerprint, _apply_activity),
+    ("priority", _priority_fingerprint, _apply_priority),
+]
+
+
+def _applied_fingerprints() -> dict[str, str]:
+    try:
+        with SessionLocal() as db:
+            return {row.name: row.fingerprint for row in db.scalars(select(BootstrapStep))}
+    except SQLAlchemyError:
+        # Fresh database: the table itself is created by the schema step.
+        return {}
+
+
+def _record(name: str, fingerprint: str, duration_ms: int) -> None:
+    with SessionLocal() as db:
+        db.merge(BootstrapStep(name=name, fingerprint=fingerprint, duration_ms=duration_ms, applied_at=datetime.utcnow()))
+        db.commit()
+
+
+def warmup() -> None:
+    """Pay one-off costs (optional imports, first pool connection) before the first request does."""
+    modules = ["jose.jwt"]
+    if settings.ai_provider == "openai" and settings.openai_api_key:
+        modules.append("openai")
+    for name in modules:
+        started = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            continue
+        readiness.steps[f"import:{name}"] = {"status": "loaded", "ms": round((time.perf_counter() - started) * 1000, 1)}
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    # Budget enforcement needs month-to-date spend from before this process started.
+    usage.ledger.load()
+    # First provider probe in the background so /settings/ai has a status to serve.
+    ai.health.ensure_started()
+
+
+def run_bootstrap() -> None:
+    try:
+        applied = {} if settings.bootstrap_force else _applied_fingerprints()
+        for name, fingerprint_of, apply in STEPS:
+            fingerprint = fingerprint_of()
+            if applied.get(name) == fingerprint:
+                readiness.steps[name] = {"status": "skipped", "ms": 0.0}
+                continue
+            started = time.perf_counter()
+            apply()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            _record(name, fingerprint, int(elapsed_ms))
+            readiness.steps[name] = {"status": "applied", "ms": round(elapsed_ms, 1)}
+        warmup()
+    except Exception as exc:
+        logger.exception("startup failed")
+        readiness.state = "failed"
+        readiness.error = f"{type(exc).__name__}: {exc}"
+    else:
+        readiness.state = "ready"
+        jobs.start_inline_worker()
+        events.start_remote_poller()
+        if settings.watch_reports_enabled:
+            from . import watcher
+
+            watcher.start_inline_watcher()
+    finally:
+        readiness.finished = time.perf_counter()
+        readiness._done.set()
+        logger.info("startup %s in %.0f ms: %s", readiness.state, (readiness.finished - readiness.started) * 1000, readiness.steps)
+
+
+def start() -> None:
+    if settings.bootstrap_mode == "blocking":
+        run_bootstrap()
+        if readiness.state == "failed":
+            raise RuntimeError(f"startup failed: {readiness.error}")
+        return
+    threading.Thread(target=run_bootstrap, name="researchos-bootstrap", daemon=True).start()
@@ -0,0 +1,203 @@
+﻿from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import and_, event, inspect, insert, or_, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session, selectinload
+
+from .models import Deliverable, Idea, Task, Tombstone, UpdateLog, Workspace, live_idea_ids, new_id
+
+TRACKED_ENTITIES: dict[type, str] = {
+    Idea: "idea",
+    Task: "task",
+    Deliverable: "deliverable",
+    UpdateLog: "update_log",
+}
+
+# Fixed order used to break ties inside one revision when paginating /changes.
+SYNC_TABLES: list[type] = [Idea, Task, Deliverable, UpdateLog, Tombstone]
+
+_FLUSH_REVISIONS_KEY = "flush_revisions"
+
+
+def allocate_revision(connection: Connection, workspace_id: str) -> int:
+    """Bump and return the workspace revision counter.
+
+    The UPDATE holds the workspace row lock until commit, so concurrent writers commit
+    revisions in order and a reader's cursor never skips a revision that commits later.
+    """
+    table = Workspace.__table__
+    bump = update(table).where(table.c.id == workspace_id).values(revision=table.c.revision + 1)
+    if connection.dialect.update_returning:
+        return connection.execute(bump.returning(table.c.revision)).scalar_one()
+    connection.execute(bump)
+    return connection.execute(select(table.c.revision).where(table.c.id == workspace_id)).scalar_one()
+
+
+def _flush_revision(session: Session, connection: Connection, workspace_id: str) -> int:
+    # One revision per workspace per flush: every row written together shares it.
+    revisions = session.info.setdefault(_FLUSH_REVISIONS_KEY, {})
+    revision = revisions.get(workspace_id)
+    if revision is None:
+        revision = revisions[workspace_id] = allocate_revision(connection, workspace_id)
+    return revision
+
+
+def _before_insert(mapper, connection, target) -> None:
+    session = Session.object_session(target)
+    if session is not None:
+        target.revision = _flush_revision(session, connection, target.workspace_id)
+
+
+def _before_update(mapper, connection, target) -> None:
+    session = Session.object_session(target)
+    if session is not None and session.is_modified(target, include_collections=False):
+        target.revision = _flush_revision(session, connection, target.workspace_id)
+
+
+def _before_delete(mapper, connection, target) -> None:
+    session = Session.object_session(target)
+    if session is not None:
+        target.revision = _flush_revision(session, connection, target.workspace_id)
+
+
+def _after_delete(mapper, connection, target) -> None:
+    connection.execute(
+        insert(Tombstone.__table__).values(
+            id=new_id(),
+            workspace_id=target.workspace_id,
+            entity_type=TRACKED_ENTITIES[type(target)],
+            entity_id=target.id,
+            revision=target.revision,
+            deleted_at=datetime.utcnow(),
+        )
+    )
+
+
+def _after_soft_delete(mapper, connection, target: Idea) -> None:
+    # A soft-deleted idea is gone for sync clients now, before the purge removes the row.
+    if target.deleted_at is not None and inspect(target).attrs.deleted_at.history.added:
+        _after_delete(mapper, connection, target)
+
+
+for _model in TRACKED_ENTITIES:
+    event.listen(_model, "before_insert", _before_insert)
+    event.listen(_model, "before_update", _before_update)
+    event.listen(_model, "before_delete", _before_delete)
+    event.listen(_model, "after_delete", _after_delete)
+event.listen(Idea, "after_update", _after_soft_delete)
+
+
+@event.listens_for(Session, "after_flush")
+def _reset_flush_revisions(session: Session, flush_context) -> None:
+    session.info.pop(_FLUSH_REVISIONS_KEY, None)
+
+
+@dataclass(frozen=True)
+class SyncCursor:
+    """Position in the (revision, table, id) ordering shared by all synced tables."""
+
+    revision: int
+    table: int = len(SYNC_TABLES)
+    row_id: str = ""
+
+    @classmethod
+    def parse(cls, raw: str) -> SyncCursor:
+        # A bare revision means "everything up to and including this revision".
+        parts = raw.split(":", 2)
+        if len(parts) == 1:
+            return cls(int(parts[0]))
+        return cls(int(parts[0]), int(parts[1]), parts[2])
+
+    def __str__(self) -> str:
+        if self.table >= len(SYNC_TABLES):
+            return str(self.revision)
+        return f"{self.revision}:{self.table}:{self.row_id}"
+
+
+@dataclass
+class ChangeSet:
+    rows: dict[type, list]
+    next_cursor: SyncCursor
+    has_more: bool
+    revision: int
+
+
+def _after_cursor(model: type, table_index: int, cursor: SyncCursor):
+    if table_index < cursor.table:
+        return model.revision > cursor.revision
+    if table_index > cursor.table:
+        return model.revision >= cursor.revision
+    return or_(model.revision > cursor.revision, and_(model.revision == cursor.revision, model.id > cursor.row_id))
+
+
+def changes_since(db: Session, workspace_id: str, cursor: SyncCursor, limit: int) -> ChangeSet:
+    """Collect up to `limit` upserts/tombstones after `cursor` using the (workspace_id, revision, id) indexes."""
+    # Read the high-water mark first and ignore anything newer: a revision committed while
+    # the tables below are being read could otherwise be seen half-applied.
+    workspace_revision = db.scalar(select(Workspace.revision).where(Workspace.id == workspace_id)) or 0
+    live = live_idea_ids(workspace_id)
+
+    candidates: list[tuple[int, int, str, object]] = []
+    for table_index, model in enumerate(SYNC_TABLES):
+        q = select(model).where(
+            model.workspace_id == workspace_id,
+            model.revision <= workspace_revision,
+            _after_cursor(model, table_index, cursor),
+        )
+        if model is Idea:
+            q = q.where(Idea.deleted_at.is_(None))
+        elif model is not Tombstone:
+            # The idea's tombstone stands for its tasks, deliverables and logs until the purge.
+            q = q.where(model.idea_id.in_(live))
+        if model is UpdateLog:
+            q = q.options(selectinload(UpdateLog.body))
+        rows = db.scalars(q.order_by(model.revision.asc(), model.id.asc()).limit(limit + 1)).all()
+        candidates.extend((row.revision, table_index, row.id, row) for row in rows)
+
+    candidates.sort(key=lambda item: item[:3])
+    page = candidates[:limit]
+    has_more = len(candidates) > limit
+
+    grouped: dict[type, list] = {model: [] for model in SYNC_TABLES}
+    for _, table_index, _, row in page:
+        grouped[SYNC_TABLES[table_index]].append(row)
+
+    if has_more:
+        last_revision, last_table, last_id, _ = page[-1]
+        next_cursor = SyncCursor(last_revision, last_table, last_id)
+    else:
+        # Caught up: resume from the workspace high-water mark.
+        next_cursor = SyncCursor(max(workspace_revision, cursor.revision))
+    return ChangeSet(rows=grouped, next_cursor=next_cursor, has_more=has_more, revision=workspace_revision)
+
+
+def committed_changes(
+    db: Session, workspace_id: str, after_revision: int, up_to: int, limit: int
+) -> list[tuple[int, str, str, str, str | None]] | None:
+    """(revision, type, id, op, idea_id) of rows written in (after_revision, up_to], in revision order.
+
+    Ids only, for the change feed; inserts and updates both come back as "update". None when
+    more than `limit` rows changed: the caller resyncs instead of replaying them one by one.
+    """
+    live = live_idea_ids(workspace_id)
+    changes: list[tuple[int, str, str, str, str | None]] = []
+    for model, entity_type in TRACKED_ENTITIES.items():
+        idea_id = model.id if model is Idea else model.idea_id
+        q = select(model.revision, model.id, idea_id).where(
+            model.workspace_id == workspace_id, model.revision > after_revision, model.revision <= up_to
+        )
+        q = q.where(Idea.deleted_at.is_(None)) if model is Idea else q.where(model.idea_id.in_(live))
+        for revision, row_id, idea in db.execute(q.limit(limit + 1)):
+            changes.append((revision, entity_type, row_id, "update", idea))
+    tombstones = select(Tombstone.revision, Tombstone.entity_type, Tombstone.entity_id).where(
+        Tombstone.workspace_id == workspace_id, Tombstone.revision > after_revision, Tombstone.revision <= up_to
+    )
+    for revision, entity_type, entity_id in db.execute(tombstones.limit(limit + 1)):
+        changes.append((revision, entity_type, entity_id, "delete", entity_id if entity_type == "idea" else None))
+    if len(changes) > limit:
+        return None
+    changes.sort(key=lambda change: change[0])
+    return changes
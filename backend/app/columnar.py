@@ -0,0 +1,239 @@
+﻿from __future__ import annotations
+
+from collections.abc import Callable, Iterator
+from operator import attrgetter
+from pathlib import Path
+from typing import IO
+import zipfile
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .bodies import decode
+from .config import settings
+from .models import ChecklistItem, Deliverable, Idea, ReportBody, Task, UpdateLog, UpdateLogTag, live_idea_ids
+from .priority import INPUT_KEYS
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+
+class ColumnarUnavailable(RuntimeError):
+    """The optional `pyarrow` package is not installed."""
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError as exc:
+        raise ColumnarUnavailable("columnar export needs the optional `pyarrow` package") from exc
+    return pyarrow
+
+
+def _tables(pa, workspace_id: str) -> dict[str, tuple[object, list[tuple[str, object, Callable]]]]:
+    """Per table: the query and its (column, arrow type, row -> value) fields.
+
+    Low-cardinality text (status, state, type, source, tag) is dictionary-encoded: stored once
+    per distinct value in each row group and loaded as categoricals by pandas / polars.
+    """
+    category = pa.dictionary(pa.int32(), pa.string())
+    text_list = pa.list_(pa.string())
+    stamp = pa.timestamp("us")
+    live = live_idea_ids(workspace_id)
+
+    ideas = select(
+        Idea.id, Idea.title, Idea.description, Idea.status, Idea.main_topic_flag, Idea.start_month,
+        Idea.target_month, Idea.priority_inputs, Idea.priority_score, Idea.revision, Idea.created_at, Idea.updated_at,
+    ).where(Idea.workspace_id == workspace_id, Idea.deleted_at.is_(None)).order_by(Idea.id)
+    tasks = select(
+        Task.id, Task.idea_id, Task.phase_id, Task.title, Task.status, Task.importance, Task.start_month,
+        Task.end_month, Task.due_month, Task.dependencies, Task.sort_order, Task.priority_score, Task.revision,
+        Task.updated_at,
+    ).where(Task.workspace_id == workspace_id, Task.idea_id.in_(live)).order_by(Task.id)
+    deliverables = select(
+        Deliverable.id, Deliverable.idea_id, Deliverable.title, Deliverable.type, Deliverable.due_month,
+        Deliverable.status, Deliverable.revision,
+    ).where(Deliverable.workspace_id == workspace_id, Deliverable.idea_id.in_(live)).order_by(Deliverable.id)
+    logs = (
+        select(
+            UpdateLog.id, UpdateLog.idea_id, UpdateLog.source, UpdateLog.title, UpdateLog.ai_summary,
+            UpdateLog.ai_tags, UpdateLog.ai_risk_flags, UpdateLog.revision, UpdateLog.created_at,
+            ReportBody.codec, ReportBody.data,
+        )
+        .outerjoin(ReportBody, ReportBody.hash == UpdateLog.body_hash)
+        .where(UpdateLog.workspace_id == workspace_id, UpdateLog.idea_id.in_(live))
+        .order_by(UpdateLog.id)
+    )
+    items = select(
+        ChecklistItem.log_id, ChecklistItem.idea_id, ChecklistItem.position, ChecklistItem.state, ChecklistItem.text,
+        ChecklistItem.report_date, ChecklistItem.report_week, ChecklistItem.report_month,
+    ).where(ChecklistItem.workspace_id == workspace_id, ChecklistItem.idea_id.in_(live)).order_by(
+        ChecklistItem.log_id, ChecklistItem.position
+    )
+    tags = select(
+        UpdateLogTag.log_id, UpdateLogTag.idea_id, UpdateLogTag.tag, UpdateLogTag.report_date,
+        UpdateLogTag.report_week, UpdateLogTag.report_month,
+    ).where(UpdateLogTag.workspace_id == workspace_id, UpdateLogTag.idea_id.in_(live)).order_by(
+        UpdateLogTag.log_id, UpdateLogTag.tag
+    )
+
+    def body(row) -> str | None:
+        return None if row.codec is None else decode(row.codec, row.data)
+
+    periods = [
+        ("report_date", pa.date32(), attrgetter("report_date")),
+        ("report_week", category, attrgetter("report_week")),
+        ("report_month", category, attrgetter("report_month")),
+    ]
+    return {
+        "ideas": (
+            ideas,
+            [
+                ("id", pa.string(), attrgetter("id")),
+                ("title", pa.string(), attrgetter("title")),
+                ("description", pa.string(), attrgetter("description")),
+                ("status", category, attrgetter("status")),
+                ("main_topic_flag", pa.bool_(), attrgetter("main_topic_flag")),
+                ("start_month", pa.string(), attrgetter("start_month")),
+                ("target_month", pa.string(), attrgetter("target_month")),
+                # priority_inputs is a JSON object; one float column per input is what analyses filter on.
+                *[(key, pa.float64(), lambda row, key=key: (row.priority_inputs or {}).get(key)) for key in INPUT_KEYS],
+                ("priority_score", pa.float64(), attrgetter("priority_score")),
+                ("revision", pa.int64(), attrgetter("revision")),
+                ("created_at", stamp, attrgetter("created_at")),
+                ("updated_at", stamp, attrgetter("updated_at")),
+            ],
+        ),
+        "tasks": (
+            tasks,
+            [
+                ("id", pa.string(), attrgetter("id")),
+                ("idea_id", pa.string(), attrgetter("idea_id")),
+                ("phase_id", pa.string(), attrgetter("phase_id")),
+                ("title", pa.string(), attrgetter("title")),
+                ("status", category, attrgetter("status")),
+                ("importance", pa.int32(), attrgetter("importance")),
+                ("start_month", pa.string(), attrgetter("start_month")),
+                ("end_month", pa.string(), attrgetter("end_month")),
+                ("due_month", pa.string(), attrgetter("due_month")),
+                ("dependencies", text_list, attrgetter("dependencies")),
+                ("sort_order", pa.int32(), attrgetter("sort_order")),
+                ("priority_score", pa.float64(), attrgetter("priority_score")),
+                ("revision", pa.int64(), attrgetter("revision")),
+                ("updated_at", stamp, attrgetter("updated_at")),
+            ],
+        ),
+        "deliverables": (
+            deliverables,
+            [
+                ("id", pa.string(), attrgetter("id")),
+                ("idea_id", pa.string(), attrgetter("idea_id")),
+                ("title", pa.string(), attrgetter("title")),
+                ("type", category, attrgetter("type")),
+                ("due_month", pa.string(), attrgetter("due_month")),
+                ("status", category, attrgetter("status")),
+                ("revision", pa.int64(), attrgetter("revision")),
+            ],
+        ),
+        "update_logs": (
+            logs,
+            [
+                ("id", pa.string(), attrgetter("id")),
+                ("idea_id", pa.string(), attrgetter("idea_id")),
+                ("source", category, attrgetter("source")),
+                ("title", pa.string(), attrgetter("title")),
+                ("body_md", pa.large_string(), body),
+                ("ai_summary", pa.string(), attrgetter("ai_summary")),
+                ("ai_tags", pa.list_(category), attrgetter("ai_tags")),
+                ("ai_risk_flags", text_list, attrgetter("ai_risk_flags")),
+                ("revision", pa.int64(), attrgetter("revision")),
+                ("created_at", stamp, attrgetter("created_at")),
+            ],
+        ),
+        "checklist_items": (
+            items,
+            [
+                ("log_id", pa.string(), attrgetter("log_id")),
+                ("idea_id", pa.string(), attrgetter("idea_id")),
+                ("position", pa.int32(), attrgetter("position")),
+                ("state", category, attrgetter("state")),
+                ("text", pa.string(), attrgetter("text")),
+                *periods,
+            ],
+        ),
+        "update_log_tags": (
+            tags,
+            [
+                ("log_id", pa.string(), attrgetter("log_id")),
+                ("idea_id", pa.string(), attrgetter("idea_id")),
+                ("tag", category, attrgetter("tag")),
+                *periods,
+            ],
+        ),
+    }
+
+
+TABLES = ("ideas", "tasks", "deliverables", "update_logs", "checklist_items", "update_log_tags")
+
+
+def record_batches(db: Session, workspace_id: str, table: str, batch_size: int) -> tuple[object, Iterator]:
+    """(schema, iterator of RecordBatch) for one table, read `batch_size` rows at a time.
+
+    The query runs with `stream_results`, a server-side cursor on PostgreSQL, so neither the
+    rows nor the Arrow buffers of the whole table are held in memory at once.
+    """
+    pa = _pyarrow()
+    query, fields = _tables(pa, workspace_id)[table]
+    schema = pa.schema([(name, arrow_type) for name, arrow_type, _ in fields])
+
+    def batches():
+        result = db.execute(query.execution_options(stream_results=True, yield_per=batch_size))
+        for rows in result.partitions():
+            yield pa.RecordBatch.from_arrays(
+                [pa.array([value(row) for row in rows], type=arrow_type) for _, arrow_type, value in fields],
+                schema=schema,
+            )
+
+    return schema, batches()
+
+
+def write_table(db: Session, workspace_id: str, table: str, fmt: str, sink: IO[bytes], batch_size: int) -> int:
+    """Write one table as Parquet or Arrow IPC (file format) to `sink`. Returns rows written."""
+    pa = _pyarrow()
+    schema, batches = record_batches(db, workspace_id, table, batch_size)
+    compression = settings.columnar_compression or None
+    rows = 0
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        # One row group per batch: readers can skip or parallelize over them.
+        with pq.ParquetWriter(sink, schema, compression=compression) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+                rows += batch.num_rows
+    else:
+        options = pa.ipc.IpcWriteOptions(compression=compression)
+        with pa.ipc.new_file(sink, schema, options=options) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+                rows += batch.num_rows
+    return rows
+
+
+def export_workspace(
+    db: Session, workspace_id: str, path: Path, fmt: str = "parquet", table: str | None = None, batch_size: int = 10000
+) -> dict[str, int]:
+    """Write `table` as a single file, or every table as a zip of files, to `path`. Returns rows per table."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown columnar format: {fmt}")
+    if table is not None:
+        if table not in TABLES:
+            raise ValueError(f"Unknown table: {table}")
+        with open(path, "wb") as sink:
+            return {table: write_table(db, workspace_id, table, fmt, sink, batch_size)}
+    counts: dict[str, int] = {}
+    # Members are stored, not deflated: Parquet pages and Arrow buffers are already compressed.
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED) as archive:
+        for name in TABLES:
+            with archive.open(f"{name}{FORMATS[fmt]}", "w", force_zip64=True) as sink:
+                counts[name] = write_table(db, workspace_id, name, fmt, sink, batch_size)
+    return counts
@@ -1,5 +1,47 @@
 ﻿from pydantic_settings import BaseSettings, SettingsConfigDict
 
+# Engine/pool presets selected with DB_PROFILE. Liveness comes from pool_recycle plus
+# LIFO checkout instead of a pre-ping round-trip on every checkout; "legacy" keeps the
+# original behaviour (pre-ping, no SQLite pragmas) for comparison benchmarks.
+DB_PROFILES: dict[str, dict[str, object]] = {
+    "default": {
+        "pool_size": 5,
+        "max_overflow": 10,
+        "pool_timeout": 30.0,
+        "pool_recycle": 1800,
+        "pool_pre_ping": False,
+        "pool_use_lifo": True,
+        "sqlite_pragmas": True,
+    },
+    "small": {
+        "pool_size": 2,
+        "max_overflow": 2,
+        "pool_timeout": 30.0,
+        "pool_recycle": 300,
+        "pool_pre_ping": False,
+        "pool_use_lifo": True,
+        "sqlite_pragmas": True,
+    },
+    "throughput": {
+        "pool_size": 20,
+        "max_overflow": 30,
+        "pool_timeout": 10.0,
+        "pool_recycle": 1800,
+        "pool_pre_ping": False,
+        "pool_use_lifo": True,
+        "sqlite_pragmas": True,
+    },
+    "legacy": {
+        "pool_size": 5,
+        "max_overflow": 10,
+        "pool_timeout": 30.0,
+        "pool_recycle": -1,
+        "pool_pre_ping": True,
+        "pool_use_lifo": False,
+        "sqlite_pragmas": False,
+    },
+}
+
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
@@ -11,6 +53,21 @@ class Settings(BaseSettings):
 
     database_url: str = "sqlite:///./researchos.db"
 
+    # Engine profile (see DB_PROFILES); the db_* fields below override single entries.
+    db_profile: str = "default"
+    db_pool_size: int | None = None
+    db_max_overflow: int | None = None
+    db_pool_timeout: float | None = None
+    db_pool_recycle: int | None = None
+    db_pool_pre_ping: bool | None = None
+    sqlite_journal_mode: str = "wal"
+    sqlite_synchronous: str = "normal"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size_kib: int = 20000
+    pg_statement_timeout_ms: int = 30000
+    pg_prepare_threshold: int | None = 5
+
     owner_email: str = "dhkwon@dgist.ac.kr"
     owner_password: str = "change-this-password"
     owner_workspace_name: str = "Personal Research Workspace"
@@ -18,10 +75,144 @@ class Settings(BaseSettings):
     openai_api_key: str = ""
     openai_model: str = "gpt-5-mini"
     ai_monthly_budget_usd: float = 20.0
+    ai_input_usd_per_1m_tokens: float = 0.25
+    ai_output_usd_per_1m_tokens: float = 2.0
+    ai_provider: str = "openai"  # openai | fake | local
+    ai_timeout_seconds: float = 20.0
+    ai_max_retries: int = 2
+    ai_retry_backoff_seconds: float = 0.5
+    ai_retry_budget_seconds: float = 30.0
+    ai_breaker_failure_threshold: int = 5
+    ai_breaker_reset_seconds: float = 60.0
+    ai_health_refresh_seconds: float = 300.0
+    fake_ai_latency_ms: float = 200.0
+    fake_ai_failure_rate: float = 0.0
+    fake_ai_timeout_rate: float = 0.0
+    # Rate limiting and budget degradation (0 disables a rate)
+    ai_requests_per_minute: float = 60.0
+    ai_tokens_per_minute: float = 200000.0
+    ai_max_concurrency: int = 4
+    ai_queue_timeout_seconds: float = 30.0
+    ai_cheap_model: str = "gpt-5-nano"
+    ai_cheap_input_usd_per_1m_tokens: float = 0.05
+    ai_cheap_output_usd_per_1m_tokens: float = 0.4
+    ai_budget_cheap_ratio: float = 0.8
+    ai_budget_local_ratio: float = 1.0
+    # Month-to-date spend is re-read from ai_usage this often, so the API and job worker
+    # processes share one budget (0 re-reads on every budget check).
+    ai_usage_refresh_seconds: float = 5.0
+    # Long reports: map-reduce over heading-delimited chunks, cached by content hash
+    ai_single_call_chars: int = 15000
+    ai_chunk_chars: int = 6000
+    ai_chunk_min_chars: int = 800
+    ai_map_concurrency: int = 4
+    ai_summary_cache_enabled: bool = True
+    # Local summarizer tags: tag -> keywords/aliases, matched as case-insensitive substrings.
+    # Override with JSON, e.g. LOCAL_TAGS='{"rtl": ["rtl", "verilog"], "fpga": ["vivado", "bitstream"]}'
+    local_tags: dict[str, list[str]] = {
+        "rtl": ["rtl"],
+        "simulation": ["simulation"],
+        "debug": ["debug"],
+        "vivado": ["vivado"],
+        "matlab": ["matlab"],
+    }
+
+    # Related-reports index (hashing TF-IDF over update logs, memory-mapped files on disk)
+    similarity_enabled: bool = True
+    similarity_index_dir: str = "./similarity_index"
+    similarity_dim: int = 2**18
 
     # Reports ingestion
     reports_dir: str = "C:/Research/07_reports"
     reports_pattern: str = "Daily_Report_*.md"
+    upload_max_entry_bytes: int = 5 * 1024 * 1024
+    upload_batch_size: int = 25
+    # Update log bodies are stored once per distinct text, compressed: "zlib", or "zstd" when
+    # the optional `zstandard` package is installed (zlib otherwise).
+    report_body_codec: str = "zlib"
+    report_body_level: int = 6
+    # Unreferenced bodies are pruned once older than this, so a body a writer has just stored or
+    # reused is not deleted before the log referring to it commits.
+    report_body_prune_grace_seconds: int = 3600
+    # DELETE /ideas/{id} hides the idea at once; its rows are purged by a "purge_idea" job
+    # ("background") or before the response ("immediate"), idea_purge_batch_size per commit.
+    idea_delete_mode: str = "background"
+    idea_purge_batch_size: int = 500
+    # POST /restore/workspace spools the snapshot to restore_dir (default: the system temp dir)
+    # and a "restore_workspace" job loads it, restore_batch_size rows per commit. PostgreSQL
+    # batches go through COPY FROM STDIN unless restore_use_copy is off.
+    restore_dir: str = ""
+    restore_batch_size: int = 5000
+    restore_use_copy: bool = True
+    # GET /export/workspace/columnar (needs the optional `pyarrow` package): rows per Arrow
+    # record batch / Parquet row group, and the page/buffer codec ("zstd", "lz4", "" for none).
+    columnar_batch_size: int = 10000
+    columnar_compression: str = "zstd"
+    # Watch reports_dir and ingest new/edited reports into watch_idea_id (scripts.watch_reports,
+    # or in the API process when watch_reports_enabled). Uses OS file events, else stat polling.
+    watch_reports_enabled: bool = False
+    watch_idea_id: str = ""
+    watch_debounce_seconds: float = 2.0
+    watch_poll_seconds: float = 5.0
+    watch_force_polling: bool = False
+
+    # Gantt timeline: per-workspace plans cached until the workspace revision changes
+    timeline_cache_size: int = 256
+    timeline_max_months: int = 120
+
+    # Priority score of ideas and tasks (stored, indexed): sum of weight * input over the idea's
+    # priority_inputs (1-5) plus task importance, minus priority_due_weight per month from
+    # priority_epoch to the due month. Changing these re-scores every row on the next startup.
+    priority_weights: dict[str, float] = {"impact": 2.0, "urgency": 1.5, "risk": -0.5, "effort": -1.0, "importance": 1.0}
+    priority_due_weight: float = 0.5
+    priority_epoch: str = "2026-01"
+
+    # Change feed (SSE)
+    events_log_size: int = 2000
+    events_queue_size: int = 256
+    events_heartbeat_seconds: float = 15.0
+    events_retry_ms: int = 3000
+    # Changes committed by other processes (standalone worker, report watcher, other API
+    # workers) are picked up from the workspace revision this often; 0 disables.
+    events_poll_seconds: float = 2.0
+
+    # Request instrumentation
+    log_level: str = "INFO"
+    instrumentation_enabled: bool = True
+    request_log_enabled: bool = True
+    n_plus_one_detection: bool = False
+    n_plus_one_threshold: int = 5
+    metrics_token: str = ""
+
+    # Background jobs. The inline worker runs jobs in the API process; set it to false when
+    # a separate `python -m scripts.worker` is deployed.
+    jobs_inline_worker: bool = True
+    jobs_inline_concurrency: int = 1
+    jobs_poll_seconds: float = 1.0
+    jobs_lease_seconds: int = 300
+    jobs_max_attempts: int = 3
+    jobs_retry_base_seconds: float = 10.0
+    jobs_retry_max_seconds: float = 600.0
+
+    # Startup: "background" answers /health immediately and runs bootstrap + warmup in a
+    # thread; "blocking" finishes them before the server accepts requests.
+    bootstrap_mode: str = "background"
+    bootstrap_force: bool = False
+    startup_wait_seconds: float = 20.0
+
+    def engine_profile(self) -> dict[str, object]:
+        if self.db_profile not in DB_PROFILES:
+            raise ValueError(f"Unknown DB_PROFILE {self.db_profile!r}; expected one of {sorted(DB_PROFILES)}")
+        profile = dict(DB_PROFILES[self.db_profile])
+        overrides = {
+            "pool_size": self.db_pool_size,
+            "max_overflow": self.db_max_overflow,
+            "pool_timeout": self.db_pool_timeout,
+            "pool_recycle": self.db_pool_recycle,
+            "pool_pre_ping": self.db_pool_pre_ping,
+        }
+        profile.update({key: value for key, value in overrides.items() if value is not None})
+        return profile
 
 
 settings = Settings()
@@ -1,4 +1,5 @@
-﻿from sqlalchemy import create_engine
+﻿from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
 
 from .config import settings
@@ -8,8 +9,76 @@ class Base(DeclarativeBase):
     pass
 
 
-connect_args = {"check_same_thread": False} if settings.database_url.startswith("sqlite") else {}
-engine = create_engine(settings.database_url, future=True, pool_pre_ping=True, connect_args=connect_args)
+def _is_memory_sqlite(url: str) -> bool:
+    return url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+
+
+def sqlite_pragmas() -> list[str]:
+    return [
+        f"PRAGMA journal_mode={settings.sqlite_journal_mode}",
+        f"PRAGMA synchronous={settings.sqlite_synchronous}",
+        f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}",
+        f"PRAGMA mmap_size={settings.sqlite_mmap_size}",
+        f"PRAGMA cache_size=-{settings.sqlite_cache_size_kib}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record) -> None:
+    # Off by default in SQLite; ON DELETE CASCADE on idea / update log children depends on it.
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA foreign_keys=ON")
+    finally:
+        cursor.close()
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in sqlite_pragmas():
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+def build_engine(url: str, profile: dict[str, object]) -> Engine:
+    """Create an engine for `url` tuned by an engine profile (see config.DB_PROFILES)."""
+    kwargs: dict[str, object] = {"future": True, "pool_pre_ping": profile["pool_pre_ping"]}
+    connect_args: dict[str, object] = {}
+
+    if url.startswith("sqlite"):
+        connect_args["check_same_thread"] = False
+        if profile["sqlite_pragmas"]:
+            # Match the driver-level lock wait to busy_timeout (pysqlite defaults to 5s).
+            connect_args["timeout"] = settings.sqlite_busy_timeout_ms / 1000
+    elif url.startswith("postgresql"):
+        if url.startswith("postgresql:"):
+            # SQLAlchemy maps a bare postgresql:// to psycopg2; requirements.txt ships psycopg 3.
+            url = make_url(url).set(drivername="postgresql+psycopg").render_as_string(hide_password=False)
+        connect_args["options"] = f"-c statement_timeout={settings.pg_statement_timeout_ms}"
+        if url.startswith("postgresql+psycopg:") and settings.pg_prepare_threshold is not None:
+            # psycopg 3 prepares statements server-side after N executions; psycopg2 cannot.
+            connect_args["prepare_threshold"] = settings.pg_prepare_threshold
+
+    if not _is_memory_sqlite(url):
+        kwargs.update(
+            pool_size=profile["pool_size"],
+            max_overflow=profile["max_overflow"],
+            pool_timeout=profile["pool_timeout"],
+            pool_recycle=profile["pool_recycle"],
+            pool_use_lifo=profile["pool_use_lifo"],
+        )
+
+    built = create_engine(url, connect_args=connect_args, **kwargs)
+    if url.startswith("sqlite"):
+        event.listen(built, "connect", _enable_sqlite_foreign_keys)
+    if url.startswith("sqlite") and profile["sqlite_pragmas"]:
+        event.listen(built, "connect", _apply_sqlite_pragmas)
+    return built
+
+
+engine = build_engine(settings.database_url, settings.engine_profile())
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
 
@@ -0,0 +1,380 @@
+﻿from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass
+import json
+import logging
+import threading
+import uuid
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from .changes import TRACKED_ENTITIES, committed_changes
+from .config import settings
+from .db import SessionLocal
+from .models import Workspace
+
+logger = logging.getLogger("researchos.events")
+
+_PENDING_KEY = "pending_change_events"
+
+# SSE ids are "<boot>:<seq>". `seq` restarts with the process, so a cursor from another boot
+# (before a restart, or from another API worker) can't be replayed here and gets a resync.
+BOOT_ID = uuid.uuid4().hex[:8]
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    """`seq` orders the stream (SSE id with BOOT_ID); `revision` is the row revision usable with /changes."""
+
+    seq: int
+    revision: int
+    type: str
+    id: str
+    op: str
+    idea_id: str | None = None
+
+    def to_sse(self) -> str:
+        payload = {"revision": self.revision, "type": self.type, "id": self.id, "op": self.op, "idea_id": self.idea_id}
+        return f"id: {BOOT_ID}:{self.seq}\nevent: change\ndata: {json.dumps(payload)}\n\n"
+
+
+def resync_sse(seq: int) -> str:
+    """Tell the client its cursor can't be replayed; it should catch up via /changes and resume."""
+    return f"id: {BOOT_ID}:{seq}\nevent: resync\ndata: {json.dumps({'seq': seq})}\n\n"
+
+
+class Subscriber:
+    """One SSE connection. Lives on the event loop that serves the stream."""
+
+    def __init__(self, workspace_id: str, last_seq: int, maxsize: int) -> None:
+        self.workspace_id = workspace_id
+        self.last_seq = last_seq
+        self.lagged = False
+        self.queue: asyncio.Queue[ChangeEvent | None] = asyncio.Queue(maxsize=maxsize)
+        self.loop = asyncio.get_running_loop()
+
+    def offer(self, item: ChangeEvent) -> None:
+        # Runs on the subscriber's loop. A full queue means the client is not keeping up:
+        # drop the backlog and let the stream catch up from the bounded log instead.
+        if self.lagged:
+            return
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.lag()
+
+    def lag(self) -> None:
+        self.lagged = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class _WorkspaceChannel:
+    def __init__(self, log_size: int) -> None:
+        self.seq = 0
+        self.log: deque[ChangeEvent] = deque(maxlen=log_size)
+        self.subscribers: set[Subscriber] = set()
+        # Workspace revision the remote poller has caught up to (None: not polled), and the
+        # revisions published by this process since, which the poller must not publish again.
+        self.revision: int | None = None
+        self.local_revisions: set[int] = set()
+
+
+class ChangeBus:
+    """Per-workspace fan-out of entity change events with a bounded replay log.
+
+    `publish` is called from sync handlers running in the threadpool, so channel state is
+    guarded by a lock and delivery to subscribers is handed to their event loop.
+    """
+
+    def __init__(self, log_size: int, queue_size: int) -> None:
+        self._log_size = log_size
+        self._queue_size = queue_size
+        self._lock = threading.Lock()
+        self._channels: dict[str, _WorkspaceChannel] = {}
+
+    def _channel(self, workspace_id: str) -> _WorkspaceChannel:
+        channel = self._channels.get(workspace_id)
+        if channel is None:
+            channel = self._channels[workspace_id] = _WorkspaceChannel(self._log_size)
+        return channel
+
+    def current_seq(self, workspace_id: str) -> int:
+        with self._lock:
+            return self._channel(workspace_id).seq
+
+    def publish(self, workspace_id: str, changes: list[tuple[int, str, str, str, str | None]]) -> list[ChangeEvent]:
+        with self._lock:
+            channel = self._channel(workspace_id)
+            if channel.revision is not None:
+                channel.local_revisions.update(change[0] for change in changes)
+            published = self._append(channel, changes)
+            subscribers = list(channel.subscribers)
+        self._deliver(subscribers, published)
+        return published
+
+    def _append(self, channel: _WorkspaceChannel, changes) -> list[ChangeEvent]:
+        published: list[ChangeEvent] = []
+        for revision, entity_type, entity_id, op, idea_id in changes:
+            channel.seq += 1
+            item = ChangeEvent(channel.seq, revision, entity_type, entity_id, op, idea_id)
+            channel.log.append(item)
+            published.append(item)
+        return published
+
+    def polling_targets(self) -> dict[str, int | None]:
+        """{workspace_id: revision polled so far} for channels with subscribers."""
+        with self._lock:
+            targets: dict[str, int | None] = {}
+            for workspace_id, channel in self._channels.items():
+                if channel.subscribers:
+                    targets[workspace_id] = channel.revision
+                else:
+                    channel.revision = None
+                    channel.local_revisions.clear()
+            return targets
+
+    def publish_remote(
+        self, workspace_id: str, revision: int, changes: list[tuple[int, str, str, str, str | None]] | None
+    ) -> list[ChangeEvent]:
+        """Publish changes up to `revision` that another process committed; None means too many to list."""
+        with self._lock:
+            channel = self._channel(workspace_id)
+            first_poll = channel.revision is None
+            local = channel.local_revisions
+            channel.local_revisions = {seen for seen in local if seen > revision}
+            channel.revision = revision
+            subscribers = list(channel.subscribers)
+            if first_poll:
+                return []
+            if changes is None:
+                # Move past every cursor the log could serve: subscribers resync from /changes.
+                channel.seq += 1
+                channel.log.clear()
+                published = []
+            else:
+                published = self._append(channel, [change for change in changes if change[0] not in local])
+        if changes is None:
+            for sub in subscribers:
+                try:
+                    sub.loop.call_soon_threadsafe(sub.lag)
+                except RuntimeError:
+                    pass
+        self._deliver(subscribers, published)
+        return published
+
+    @staticmethod
+    def _deliver(subscribers: list[Subscriber], published: list[ChangeEvent]) -> None:
+        for sub in subscribers:
+            for item in published:
+                try:
+                    sub.loop.call_soon_threadsafe(sub.offer, item)
+                except RuntimeError:
+                    # Loop already closed; the stream is gone and will unsubscribe itself.
+                    break
+
+    def subscribe(self, workspace_id: str, last_seq: int | None, revision: int | None = None) -> Subscriber:
+        """`revision`: the workspace revision read just before, where remote polling starts."""
+        with self._lock:
+            channel = self._channel(workspace_id)
+            if channel.revision is None and revision is not None:
+                channel.revision = revision
+            start = channel.seq if last_seq is None else last_seq
+            sub = Subscriber(workspace_id, start, self._queue_size)
+            channel.subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        with self._lock:
+            self._channel(sub.workspace_id).subscribers.discard(sub)
+
+    def replay(self, workspace_id: str, after_seq: int) -> tuple[list[ChangeEvent], bool]:
+        """Return retained events newer than `after_seq`, and whether the log covers the gap."""
+        with self._lock:
+            channel = self._channel(workspace_id)
+            if after_seq > channel.seq:
+                return [], False
+            items = [item for item in channel.log if item.seq > after_seq]
+            oldest = channel.log[0].seq if channel.log else channel.seq + 1
+            complete = after_seq >= oldest - 1
+            return items, complete
+
+
+change_bus = ChangeBus(settings.events_log_size, settings.events_queue_size)
+
+
+def _workspace_revision(workspace_id: str) -> int:
+    with SessionLocal() as db:
+        return db.scalar(select(Workspace.revision).where(Workspace.id == workspace_id)) or 0
+
+
+class RemoteChangePoller:
+    """Publishes changes committed by other processes: job workers, the report watcher, other API workers.
+
+    The bus only sees this process's commits. Every `interval_s`, the revision of each workspace
+    with subscribers is compared with the last one seen; the rows written in between are read
+    (ids only) and published, minus the revisions this process already published itself.
+    """
+
+    def __init__(self, bus: ChangeBus, interval_s: float) -> None:
+        self.bus = bus
+        self.interval_s = interval_s
+        self._stop = threading.Event()
+
+    def poll_once(self) -> int:
+        targets = self.bus.polling_targets()
+        if not targets:
+            return 0
+        published = 0
+        with SessionLocal() as db:
+            rows = db.execute(select(Workspace.id, Workspace.revision).where(Workspace.id.in_(list(targets))))
+            heads = {workspace_id: revision for workspace_id, revision in rows}
+            for workspace_id, seen in targets.items():
+                head = heads.get(workspace_id) or 0
+                if seen is not None and head <= seen:
+                    continue
+                changes = None
+                if seen is not None:
+                    changes = committed_changes(db, workspace_id, seen, head, settings.events_log_size)
+                published += len(self.bus.publish_remote(workspace_id, head, changes))
+        return published
+
+    def run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            try:
+                self.poll_once()
+            except Exception:
+                logger.exception("change feed poll failed")
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+_poller: RemoteChangePoller | None = None
+
+
+def start_remote_poller() -> None:
+    """Background thread publishing other processes' changes (EVENTS_POLL_SECONDS; 0 disables)."""
+    global _poller
+    if _poller is not None or settings.events_poll_seconds <= 0:
+        return
+    _poller = RemoteChangePoller(change_bus, settings.events_poll_seconds)
+    threading.Thread(target=_poller.run, name="researchos-events", daemon=True).start()
+
+
+def stop_remote_poller() -> None:
+    if _poller is not None:
+        _poller.stop()
+
+
+def record_change(
+    session: Session, workspace_id: str, revision: int, entity_type: str, entity_id: str, op: str, idea_id: str | None
+) -> None:
+    """Queue a change event, published if and when `session` commits."""
+    session.info.setdefault(_PENDING_KEY, []).append((workspace_id, revision, entity_type, entity_id, op, idea_id))
+
+
+def _record(target, op: str) -> None:
+    session = Session.object_session(target)
+    if session is None:
+        return
+    entity_type = TRACKED_ENTITIES[type(target)]
+    idea_id = target.id if entity_type == "idea" else getattr(target, "idea_id", None)
+    record_change(session, target.workspace_id, target.revision, entity_type, target.id, op, idea_id)
+
+
+def _after_insert(mapper, connection, target) -> None:
+    _record(target, "insert")
+
+
+def _after_update(mapper, connection, target) -> None:
+    # Setting Idea.deleted_at is the delete as far as clients are concerned.
+    _record(target, "delete" if getattr(target, "deleted_at", None) is not None else "update")
+
+
+def _after_delete(mapper, connection, target) -> None:
+    _record(target, "delete")
+
+
+for _model in TRACKED_ENTITIES:
+    event.listen(_model, "after_insert", _after_insert)
+    event.listen(_model, "after_update", _after_update)
+    event.listen(_model, "after_delete", _after_delete)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_on_commit(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    by_workspace: dict[str, list[tuple[int, str, str, str, str | None]]] = {}
+    for workspace_id, *change in pending:
+        by_workspace.setdefault(workspace_id, []).append(tuple(change))
+    for workspace_id, changes in by_workspace.items():
+        change_bus.publish(workspace_id, changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def parse_event_id(raw: str | None) -> tuple[int | None, bool]:
+    """(seq, replayable) for a `Last-Event-ID`; ids from another boot or malformed ones are not replayable."""
+    if not raw:
+        return None, True
+    boot, _, seq = raw.partition(":")
+    if boot != BOOT_ID or not seq.isdigit():
+        return None, False
+    return int(seq), True
+
+
+async def stream_changes(
+    workspace_id: str,
+    last_event_id: str | None,
+    is_disconnected: Callable[[], Awaitable[bool]],
+) -> AsyncIterator[str]:
+    """Yield SSE frames: replay after `last_event_id`, then live events with heartbeats."""
+    last_seq, replayable = parse_event_id(last_event_id)
+    revision = await asyncio.to_thread(_workspace_revision, workspace_id) if settings.events_poll_seconds > 0 else None
+    sub = change_bus.subscribe(workspace_id, last_seq, revision)
+    try:
+        yield f"retry: {settings.events_retry_ms}\n\n"
+        if not replayable:
+            # Cursor from before a restart or from another API worker: catch up via /changes.
+            yield resync_sse(sub.last_seq)
+        while True:
+            if last_seq is not None or sub.lagged:
+                items, complete = change_bus.replay(workspace_id, sub.last_seq)
+                sub.lagged = False
+                if not complete:
+                    sub.last_seq = change_bus.current_seq(workspace_id)
+                    items = [item for item in items if item.seq > sub.last_seq]
+                    yield resync_sse(sub.last_seq)
+                for item in items:
+                    sub.last_seq = item.seq
+                    yield item.to_sse()
+                last_seq = None
+
+            try:
+                item = await asyncio.wait_for(sub.queue.get(), timeout=settings.events_heartbeat_seconds)
+            except asyncio.TimeoutError:
+                if await is_disconnected():
+                    break
+                yield ": keep-alive\n\n"
+                continue
+
+            if item is None:
+                # Overflow marker: loop back to catch up from the log.
+                continue
+            if item.seq <= sub.last_seq:
+                continue
+            sub.last_seq = item.seq
+            yield item.to_sse()
+    finally:
+        change_bus.unsubscribe(sub)
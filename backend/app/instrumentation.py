@@ -0,0 +1,187 @@
+﻿from __future__ import annotations
+
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+import json
+import logging
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Mapper
+
+from . import metrics
+from .config import settings
+
+logger = logging.getLogger("researchos.request")
+
+
+@dataclass
+class RequestStats:
+    method: str
+    route: str
+    started: float = field(default_factory=time.perf_counter)
+    db_ms: float = 0.0
+    query_count: int = 0
+    rows: int = 0  # ORM instances loaded
+    rows_written: int = 0  # rowcount of INSERT / UPDATE / DELETE statements
+    spans_ms: dict[str, float] = field(default_factory=dict)
+    statements: Counter[str] | None = None
+
+    def add_span(self, name: str, elapsed_ms: float) -> None:
+        self.spans_ms[name] = self.spans_ms.get(name, 0.0) + elapsed_ms
+
+    def repeated_statements(self, threshold: int) -> list[tuple[str, int]]:
+        if not self.statements:
+            return []
+        return [(stmt, count) for stmt, count in self.statements.most_common() if count >= threshold]
+
+
+_current: ContextVar[RequestStats | None] = ContextVar("researchos_request_stats", default=None)
+
+
+def current_stats() -> RequestStats | None:
+    return _current.get()
+
+
+def timed(span: str):
+    """Decorator: add the wrapped call's duration to the current request under `span`."""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            stats = _current.get()
+            if stats is None:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stats.add_span(span, (time.perf_counter() - started) * 1000)
+
+        return wrapper
+
+    return decorator
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _current.get() is not None:
+        conn.info.setdefault("researchos_query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    stats = _current.get()
+    if stats is None:
+        return
+    started_stack = conn.info.get("researchos_query_started")
+    if started_stack:
+        stats.db_ms += (time.perf_counter() - started_stack.pop()) * 1000
+    stats.query_count += 1
+    if not statement.lstrip().upper().startswith("SELECT") and cursor.rowcount and cursor.rowcount > 0:
+        stats.rows_written += cursor.rowcount
+    if stats.statements is not None:
+        stats.statements[statement] += 1
+
+
+@event.listens_for(Mapper, "load")
+def _on_load(target, context) -> None:
+    stats = _current.get()
+    if stats is not None:
+        stats.rows += 1
+
+
+def server_timing_header(stats: RequestStats, total_ms: float) -> str:
+    parts = [
+        f"total;dur={total_ms:.1f}",
+        f'db;dur={stats.db_ms:.1f};desc="{stats.query_count} queries, {stats.rows} rows, {stats.rows_written} written"',
+    ]
+    parts.extend(f"{name};dur={value:.1f}" for name, value in stats.spans_ms.items())
+    app_ms = max(0.0, total_ms - stats.db_ms - sum(stats.spans_ms.values()))
+    parts.append(f"app;dur={app_ms:.1f}")
+    return ", ".join(parts)
+
+
+class InstrumentationMiddleware:
+    """ASGI middleware: per-request timing, query counts, Server-Timing header and a JSON log line."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not settings.instrumentation_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(method=scope["method"], route=scope["path"])
+        if settings.n_plus_one_detection:
+            stats.statements = Counter()
+        token = _current.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                total_ms = (time.perf_counter() - stats.started) * 1000
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing_header(stats, total_ms).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            stats.route = getattr(route, "path", None) or "<unmatched>"
+            total_ms = (time.perf_counter() - stats.started) * 1000
+            metrics.observe_request(
+                stats.method, stats.route, status_code, total_ms / 1000, stats.db_ms / 1000, stats.query_count
+            )
+            _log_request(stats, status_code, total_ms)
+
+
+def configure_logging() -> None:
+    app_logger = logging.getLogger("researchos")
+    app_logger.setLevel(settings.log_level.upper())
+    if not app_logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+        app_logger.addHandler(handler)
+
+
+def _log_request(stats: RequestStats, status_code: int, total_ms: float) -> None:
+    repeated = stats.repeated_statements(settings.n_plus_one_threshold)
+    if repeated:
+        logger.warning(
+            json.dumps(
+                {
+                    "event": "n_plus_one",
+                    "method": stats.method,
+                    "route": stats.route,
+                    "statements": [{"count": count, "sql": " ".join(stmt.split())[:300]} for stmt, count in repeated],
+                }
+            )
+        )
+    if not settings.request_log_enabled:
+        return
+    logger.info(
+        json.dumps(
+            {
+                "event": "request",
+                "method": stats.method,
+                "route": stats.route,
+                "status": status_code,
+                "total_ms": round(total_ms, 2),
+                "db_ms": round(stats.db_ms, 2),
+                "queries": stats.query_count,
+                "rows": stats.rows,
+                "rows_written": stats.rows_written,
+                **{f"{name}_ms": round(value, 2) for name, value in stats.spans_ms.items()},
+            }
+        )
+    )
@@ -0,0 +1,318 @@
+﻿from __future__ import annotations
+
+import atexit
+from collections.abc import Callable
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+import logging
+import multiprocessing
+import os
+from pathlib import Path
+import random
+import socket
+import threading
+import time
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.orm import Session
+
+from . import usage
+from .config import settings
+from .db import SessionLocal, engine
+from .models import Job
+
+logger = logging.getLogger("researchos.jobs")
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+Handler = Callable[[Session, Job, "Progress"], dict]
+HANDLERS: dict[str, Handler] = {}
+
+
+def handler(kind: str) -> Callable[[Handler], Handler]:
+    def register(func: Handler) -> Handler:
+        HANDLERS[kind] = func
+        return func
+
+    return register
+
+
+class JobFailed(Exception):
+    """Raised by a handler for errors that retrying cannot fix."""
+
+
+def enqueue(db: Session, workspace_id: str, kind: str, payload: dict, max_attempts: int | None = None) -> Job:
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job = Job(
+        workspace_id=workspace_id,
+        kind=kind,
+        payload=payload,
+        max_attempts=max_attempts or settings.jobs_max_attempts,
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+class Progress:
+    """Progress writer for a running job. Writes are throttled and double as lease renewal."""
+
+    def __init__(self, job_id: str, min_interval_s: float = 0.5) -> None:
+        self.job_id = job_id
+        self.min_interval_s = min_interval_s
+        self._last = 0.0
+
+    def __call__(self, current: int, total: int | None = None, message: str | None = None, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._last < self.min_interval_s:
+            return
+        self._last = now
+        values: dict = {"progress_current": current, "locked_until": _lease_deadline(), "updated_at": datetime.utcnow()}
+        if total is not None:
+            values["progress_total"] = total
+        if message is not None:
+            values["progress_message"] = message[:255]
+        # Own short transaction: the handler's session may hold uncommitted work.
+        with SessionLocal() as db:
+            db.execute(update(Job).where(Job.id == self.job_id).values(**values))
+            db.commit()
+
+
+def _lease_deadline() -> datetime:
+    return datetime.utcnow() + timedelta(seconds=settings.jobs_lease_seconds)
+
+
+def _claimable(now: datetime):
+    # Queued and due, or running with an expired lease (its worker died).
+    return or_(
+        (Job.status == QUEUED) & (Job.run_after <= now),
+        (Job.status == RUNNING) & (Job.locked_until < now),
+    )
+
+
+def claim(worker_id: str) -> str | None:
+    """Atomically take the next runnable job; returns its id."""
+    now = datetime.utcnow()
+    claimed = {
+        "status": RUNNING,
+        "locked_by": worker_id,
+        "locked_until": _lease_deadline(),
+        "attempts": Job.attempts + 1,
+        "started_at": now,
+        "updated_at": now,
+    }
+    with SessionLocal() as db:
+        if engine.dialect.name == "postgresql":
+            job_id = db.scalar(
+                select(Job.id)
+                .where(_claimable(now))
+                .order_by(Job.run_after, Job.created_at)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            )
+            if job_id is None:
+                return None
+            db.execute(update(Job).where(Job.id == job_id).values(**claimed))
+            db.commit()
+            return job_id
+
+        # SQLite has no row locks, but writes are serialized: re-checking the claimable
+        # condition in the UPDATE makes it a compare-and-set. Retry if another worker won.
+        for _ in range(5):
+            job_id = db.scalar(select(Job.id).where(_claimable(now)).order_by(Job.run_after, Job.created_at).limit(1))
+            if job_id is None:
+                return None
+            won = db.execute(update(Job).where(Job.id == job_id, _claimable(now)).values(**claimed)).rowcount
+            db.commit()
+            if won:
+                return job_id
+        return None
+
+
+def _backoff(attempts: int) -> timedelta:
+    delay = settings.jobs_retry_base_seconds * (2 ** (attempts - 1))
+    return timedelta(seconds=min(delay, settings.jobs_retry_max_seconds) * random.uniform(0.8, 1.2))
+
+
+def execute(job_id: str, worker_id: str) -> str:
+    """Run one claimed job to completion, failure or rescheduling. Returns the final status."""
+    with SessionLocal() as db:
+        job = db.get(Job, job_id)
+        if job is None or job.locked_by != worker_id:
+            return "lost"
+        run = HANDLERS.get(job.kind)
+        progress = Progress(job.id)
+        try:
+            if run is None:
+                raise JobFailed(f"No handler for job kind {job.kind!r}")
+            result = run(db, job, progress)
+        except Exception as exc:
+            db.rollback()
+            job = db.get(Job, job_id)
+            retry = not isinstance(exc, JobFailed) and job.attempts < job.max_attempts
+            job.error = f"{type(exc).__name__}: {exc}"[:2000]
+            job.locked_by = None
+            job.locked_until = None
+            job.updated_at = datetime.utcnow()
+            if retry:
+                job.status = QUEUED
+                job.run_after = datetime.utcnow() + _backoff(job.attempts)
+                logger.warning("job %s (%s) attempt %d failed, retrying: %s", job.id, job.kind, job.attempts, job.error)
+            else:
+                job.status = FAILED
+                job.finished_at = datetime.utcnow()
+                logger.error("job %s (%s) failed: %s", job.id, job.kind, job.error)
+            db.commit()
+            return job.status
+
+        job.status = SUCCEEDED
+        job.result = result
+        job.error = None
+        job.locked_by = None
+        job.locked_until = None
+        job.finished_at = job.updated_at = datetime.utcnow()
+        if job.progress_total:
+            job.progress_current = job.progress_total
+        db.commit()
+        return SUCCEEDED
+
+
+def _init_process() -> None:
+    # Pool initializer: a spawned process starts with its own, empty usage ledger.
+    usage.ledger.load()
+    atexit.register(usage.ledger.flush)
+
+
+class Worker:
+    """Claims jobs and runs them on an executor: threads in the API process, processes standalone."""
+
+    def __init__(self, concurrency: int, use_processes: bool, name: str | None = None) -> None:
+        self.concurrency = concurrency
+        self.use_processes = use_processes
+        self.worker_id = name or f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+
+    def _executor(self) -> Executor:
+        if self.use_processes:
+            return ProcessPoolExecutor(
+                max_workers=self.concurrency, mp_context=multiprocessing.get_context("spawn"), initializer=_init_process
+            )
+        return ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="researchos-job")
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run(self) -> None:
+        mode = "processes" if self.use_processes else "threads"
+        logger.info("job worker %s started (%d %s)", self.worker_id, self.concurrency, mode)
+        # Budget decisions in this process need the month-to-date spend recorded before it started.
+        usage.ledger.load()
+        try:
+            self._loop()
+        finally:
+            # Usage rows still queued for the background writer would be lost on exit.
+            usage.ledger.flush()
+
+    def _loop(self) -> None:
+        running: set[Future] = set()
+        with self._executor() as executor:
+            while not self._stop.is_set():
+                for future in [future for future in running if future.done()]:
+                    running.discard(future)
+                    if future.exception() is not None:
+                        # The lease expires and another claim picks the job up again.
+                        logger.error("job execution crashed: %r", future.exception())
+                claimed_any = False
+                while len(running) < self.concurrency:
+                    try:
+                        job_id = claim(self.worker_id)
+                    except Exception:
+                        logger.exception("job claim failed")
+                        break
+                    if job_id is None:
+                        break
+                    claimed_any = True
+                    running.add(executor.submit(execute, job_id, self.worker_id))
+                if not claimed_any:
+                    self._stop.wait(settings.jobs_poll_seconds)
+
+
+_inline: Worker | None = None
+
+
+def start_inline_worker() -> None:
+    """Background thread worker for single-process deployments (JOBS_INLINE_WORKER)."""
+    global _inline
+    if _inline is not None or not settings.jobs_inline_worker:
+        return
+    _inline = Worker(settings.jobs_inline_concurrency, use_processes=False, name=f"inline:{os.getpid()}")
+    threading.Thread(target=_inline.run, name="researchos-jobs", daemon=True).start()
+
+
+def stop_inline_worker() -> None:
+    if _inline is not None:
+        _inline.stop()
+
+
+@handler("bulk_ingest")
+def _bulk_ingest(db: Session, job: Job, progress: Progress) -> dict:
+    from .services import bulk_ingest_reports
+
+    reports_path = Path(job.payload["reports_dir"])
+    if not reports_path.exists():
+        raise JobFailed(f"Reports dir not found: {reports_path}")
+    imported = bulk_ingest_reports(
+        db, job.workspace_id, job.payload["idea_id"], reports_path, job.payload["pattern"], progress=progress
+    )
+    return {"imported_logs": imported}
+
+
+@handler("seed_import")
+def _seed_import(db: Session, job: Job, progress: Progress) -> dict:
+    from .services import import_seed
+
+    progress(0, message="importing seed", force=True)
+    ideas, tasks, deliverables = import_seed(db, job.workspace_id, Path(job.payload["path"]))
+    return {"imported_ideas": ideas, "imported_tasks": tasks, "imported_deliverables": deliverables}
+
+
+@handler("restore_workspace")
+def _restore_workspace(db: Session, job: Job, progress: Progress) -> dict:
+    from .restore import SnapshotError, read_snapshot, restore_workspace
+
+    path = Path(job.payload["path"])
+    if not path.exists():
+        raise JobFailed(f"Snapshot not found: {path}")
+    remove = job.payload.get("remove_after", False)
+    try:
+        counts = restore_workspace(
+            db,
+            job.workspace_id,
+            read_snapshot(path),
+            mode=job.payload.get("mode", "merge"),
+            batch_size=settings.restore_batch_size,
+            progress=progress,
+        )
+    except (SnapshotError, KeyError, ValueError) as exc:
+        # Not retried: the uploaded copy is of no further use either.
+        if remove:
+            path.unlink(missing_ok=True)
+        raise JobFailed(f"Invalid snapshot: {exc!r}") from exc
+    if remove:
+        path.unlink(missing_ok=True)
+    return {f"restored_{table}": count for table, count in counts.items()}
+
+
+@handler("purge_idea")
+def _purge_idea(db: Session, job: Job, progress: Progress) -> dict:
+    from .services import purge_idea
+
+    purged = purge_idea(
+        db, job.workspace_id, job.payload["idea_id"], batch_size=settings.idea_purge_batch_size, progress=progress
+    )
+    return {f"purged_{table}": count for table, count in purged.items()}
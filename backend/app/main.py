@@ -1,21 +1,51 @@
-﻿from datetime import datetime
+﻿from collections import Counter
+from datetime import date, datetime, timedelta
+import json
+import os
 from pathlib import Path
+import re
+import shutil
+import tempfile
 
-from fastapi import Depends, FastAPI, File, HTTPException, UploadFile
-from fastapi.responses import HTMLResponse
+from fastapi import Depends, FastAPI, File, HTTPException, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload, selectinload
+from starlette.background import BackgroundTask
 
 from .config import settings
-from .db import Base, SessionLocal, engine, get_db
+from . import activity, ai, bootstrap, columnar, jobs, priority, timeline, usage, watcher, writes
+from .db import SessionLocal, engine, get_db
 from .enums import ItemStatus
-from .models import Deliverable, Idea, Task, UpdateLog, User, WorkspaceMember
+from .changes import SyncCursor, changes_since
+from .events import stop_remote_poller, stream_changes
+from .instrumentation import InstrumentationMiddleware, configure_logging
+from .metrics import register_pool_gauges, registry
+from .models import (
+    ChecklistItem,
+    Deliverable,
+    Idea,
+    Job,
+    Task,
+    Tombstone,
+    UpdateLog,
+    UpdateLogTag,
+    User,
+    WorkspaceMember,
+    live_idea_ids,
+)
 from .schemas import (
     AISettingsResponse,
-    BulkIngestResponse,
+    AIUsageReport,
+    ActivityDay,
+    ChangesResponse,
+    ChecklistCompletionBucket,
+    ChecklistItemRead,
     DashboardOverview,
+    DeletedRecord,
     DeliverableCreate,
     DeliverableRead,
     DeliverableUpdate,
@@ -23,9 +53,9 @@ from .schemas import (
     IdeaCreate,
     IdeaRead,
     IdeaUpdate,
+    JobRead,
     LoginRequest,
     LoginResponse,
-    SeedImportResponse,
     TaskCreate,
     TaskRead,
     TaskReadWithIdea,
@@ -34,24 +64,40 @@ from .schemas import (
     TaskUpdate,
     NextActionsResponse,
     RiskItem,
+    SimilarUpdateLog,
+    TagFacet,
+    TimelineResponse,
     UpdateLogCreate,
     UpdateLogRead,
+    UploadFileResult,
+    UploadIngestResponse,
     UserProfile,
     WorkspaceExportResponse,
 )
+from .restore import MODES as RESTORE_MODES, SNAPSHOT_VERSION
 from .security import create_access_token, decode_access_token, verify_password
+from .uploads import iter_entries, read_report
 from .services import (
-    bulk_ingest_reports,
+    CHECKLIST_PERIODS,
+    TAG_FACET_PERIODS,
+    build_update_log,
+    checklist_completions,
     compute_idea_progress,
     dashboard_counts,
     detect_risks,
-    ensure_owner_context,
-    import_seed,
+    ingest_upload_entries,
+    normalize_tag,
+    purge_idea,
     recommend_next_actions,
-    summarize_markdown,
+    similar_update_logs,
+    tag_facets,
+    top_ideas,
+    top_tasks,
 )
 
+configure_logging()
 app = FastAPI(title=settings.app_name, version="0.2.0")
+app.add_middleware(InstrumentationMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origin_regex=r"https://.*\.vercel\.app|http://localhost:\d+",
@@ -60,6 +106,7 @@ app.add_middleware(
     allow_headers=["*"],
 )
 bearer = HTTPBearer(auto_error=False)
+register_pool_gauges(engine)
 APP_DIR = Path(__file__).resolve().parent
 BACKEND_DIR = APP_DIR.parent
 ROOT_DIR = BACKEND_DIR.parent
@@ -67,25 +114,36 @@ ROOT_DIR = BACKEND_DIR.parent
 
 @app.on_event("startup")
 def on_startup() -> None:
-    Base.metadata.create_all(bind=engine)
-    _run_migrations()
-    with SessionLocal() as db:
-        ensure_owner_context(db)
+    # Schema, owner bootstrap and warmup run in the background (see app/bootstrap.py);
+    # /health answers straight away and /ready reports when they are done.
+    bootstrap.start()
+
+
+@app.on_event("shutdown")
+def on_shutdown() -> None:
+    jobs.stop_inline_worker()
+    stop_remote_poller()
+    watcher.stop_inline_watcher()
+    usage.ledger.flush()
 
 
-def _run_migrations() -> None:
-    """Add columns that were introduced after the initial schema."""
-    from sqlalchemy import inspect as sa_inspect, text
+def require_ready() -> None:
+    if not bootstrap.readiness.wait(settings.startup_wait_seconds):
+        detail = "Service is starting up" if bootstrap.readiness.state == "starting" else "Startup failed"
+        raise HTTPException(status_code=503, detail=detail, headers={"Retry-After": "2"})
 
-    with engine.connect() as conn:
-        inspector = sa_inspect(engine)
 
-        # --- tasks.sort_order (added in PR#2) ---
-        if "tasks" in inspector.get_table_names():
-            cols = {c["name"] for c in inspector.get_columns("tasks")}
-            if "sort_order" not in cols:
-                conn.execute(text("ALTER TABLE tasks ADD COLUMN sort_order INTEGER NOT NULL DEFAULT 0"))
-                conn.commit()
+def commit_as(db: Session, obj, to_schema):
+    """Flush, convert, commit: every column is set by the flush, so no refresh SELECT follows.
+
+    Creates stay on this path rather than INSERT ... RETURNING: the flush already writes one
+    INSERT with nothing to read back, and its hooks derive the scores, bodies, checklist rows,
+    rollup and index entries a Core insert would have to repeat.
+    """
+    db.flush()
+    result = to_schema(obj)
+    db.commit()
+    return result
 
 
 def idea_to_schema(idea: Idea) -> IdeaRead:
@@ -99,6 +157,8 @@ def idea_to_schema(idea: Idea) -> IdeaRead:
         start_month=idea.start_month,
         target_month=idea.target_month,
         priority_inputs=idea.priority_inputs,
+        priority_score=idea.priority_score,
+        revision=idea.revision,
         created_at=idea.created_at,
         updated_at=idea.updated_at,
     )
@@ -117,6 +177,8 @@ def task_to_schema(task: Task) -> TaskRead:
         due_month=task.due_month,
         dependencies=task.dependencies,
         sort_order=task.sort_order,
+        priority_score=task.priority_score,
+        revision=task.revision,
         updated_at=task.updated_at,
     )
 
@@ -132,6 +194,7 @@ def log_to_schema(log: UpdateLog) -> UpdateLogRead:
         ai_summary=log.ai_summary,
         ai_tags=log.ai_tags,
         ai_risk_flags=log.ai_risk_flags,
+        revision=log.revision,
         created_at=log.created_at,
     )
 
@@ -145,17 +208,47 @@ def deliverable_to_schema(item: Deliverable) -> DeliverableRead:
         type=item.type,
         due_month=item.due_month,
         status=item.status,
+        revision=item.revision,
     )
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials | None = Depends(bearer),
-    db: Session = Depends(get_db),
-) -> tuple[User, str]:
-    if not credentials:
+def checklist_item_to_schema(item: ChecklistItem) -> ChecklistItemRead:
+    return ChecklistItemRead(
+        id=item.id,
+        log_id=item.log_id,
+        idea_id=item.idea_id,
+        position=item.position,
+        state=item.state,
+        text=item.text,
+        report_date=item.report_date,
+    )
+
+
+def job_to_schema(job: Job) -> JobRead:
+    return JobRead(
+        id=job.id,
+        kind=job.kind,
+        status=job.status,
+        attempts=job.attempts,
+        max_attempts=job.max_attempts,
+        progress_current=job.progress_current,
+        progress_total=job.progress_total,
+        progress_message=job.progress_message,
+        result=job.result,
+        error=job.error,
+        run_after=job.run_after,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+    )
+
+
+def _resolve_user(token: str | None, db: Session) -> tuple[User, str]:
+    if not token:
         raise HTTPException(status_code=401, detail="Missing authorization token")
+    require_ready()
 
-    user_id = decode_access_token(credentials.credentials)
+    user_id = decode_access_token(token)
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
 
@@ -169,11 +262,42 @@ def get_current_user(
     return user, member.workspace_id
 
 
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials | None = Depends(bearer),
+    db: Session = Depends(get_db),
+) -> tuple[User, str]:
+    return _resolve_user(credentials.credentials if credentials else None, db)
+
+
+def _stream_workspace_id(token: str | None) -> str:
+    # Short-lived session: a long-running stream must not pin a pooled connection.
+    with SessionLocal() as db:
+        _, workspace_id = _resolve_user(token, db)
+    return workspace_id
+
+
+def _live_child(db: Session, model: type, workspace_id: str, row_id: str, *options):
+    # A task, deliverable or update log of the workspace; None once its idea is deleted.
+    return db.scalar(
+        select(model)
+        .options(*options)
+        .where(model.id == row_id, model.workspace_id == workspace_id, model.idea_id.in_(live_idea_ids(workspace_id)))
+    )
+
+
 @app.get("/health")
 def health() -> dict[str, str]:
+    """Liveness: answers as soon as the process is up, before startup work finishes."""
     return {"status": "ok"}
 
 
+@app.get("/ready")
+def ready() -> JSONResponse:
+    """Readiness: 200 once bootstrap and warmup are done, 503 (with step timings) until then."""
+    payload = bootstrap.readiness.as_dict()
+    return JSONResponse(payload, status_code=200 if payload["status"] == "ready" else 503)
+
+
 @app.get("/", response_class=HTMLResponse)
 def home() -> str:
     return """
@@ -185,6 +309,7 @@ def home() -> str:
         <ul>
           <li><a href="/docs">/docs</a> (Swagger UI)</li>
           <li><a href="/health">/health</a> (health check)</li>
+          <li><a href="/ready">/ready</a> (readiness check)</li>
         </ul>
       </body>
     </html>
@@ -193,7 +318,7 @@ def home() -> str:
 
 @app.post("/auth/login", response_model=LoginResponse)
 def login(payload: LoginRequest, db: Session = Depends(get_db)) -> LoginResponse:
-    ensure_owner_context(db)
+    require_ready()
     user = db.scalar(select(User).where(User.email == payload.email))
     if not user or not verify_password(payload.password, user.password_hash):
         raise HTTPException(status_code=401, detail="Invalid credentials")
@@ -234,10 +359,23 @@ def list_ideas(
     db: Session = Depends(get_db),
 ) -> list[IdeaRead]:
     _, workspace_id = context
-    ideas = db.scalars(select(Idea).where(Idea.workspace_id == workspace_id).order_by(Idea.created_at.asc())).all()
+    ideas = db.scalars(
+        select(Idea).where(Idea.workspace_id == workspace_id, Idea.deleted_at.is_(None)).order_by(Idea.created_at.asc())
+    ).all()
     return [idea_to_schema(item) for item in ideas]
 
 
+@app.get("/ideas/top", response_model=list[IdeaRead])
+def list_top_ideas(
+    limit: int = 10,
+    context: tuple[User, str] = Depends(get_current_user),
+    db: Session = Depends(get_db),
+) -> list[IdeaRead]:
+    """Planned / in-progress ideas by priority score, highest first."""
+    _, workspace_id = context
+    return [idea_to_schema(item) for item in top_ideas(db, workspace_id, max(1, min(limit, 100)))]
+
+
 @app.post("/ideas", response_model=IdeaRead)
 def create_idea(
     payload: IdeaCreate,
@@ -256,9 +394,7 @@ def create_idea(
         priority_inputs=payload.priority_inputs.model_dump(),
     )
     db.add(idea)
-    db.commit()
-    db.refresh(idea)
-    return idea_to_schema(idea)
+    return commit_as(db, idea, idea_to_schema)
 
 
 @app.patch("/ideas/{idea_id}", response_model=IdeaRead)
@@ -269,7 +405,7 @@ def update_idea(
     db: Session = Depends(get_db),
 ) -> IdeaRead:
     _, workspace_id = context
-    idea = db.scalar(select(Idea).where(Idea.id == idea_id, Idea.workspace_id == workspace_id))
+    idea = db.scalar(select(Idea).where(Idea.id == idea_id, Idea.workspace_id == workspace_id, Idea.deleted_at.is_(None)))
     if not idea:
         raise HTTPException(status_code=404, detail="Idea not found")
 
@@ -282,9 +418,7 @@ def update_idea(
         setattr(idea, key, value)
     idea.updated_at = datetime.utcnow()
     db.add(idea)
-    db.commit()
-    db.refresh(idea)
-    return idea_to_schema(idea)
+    return commit_as(db, idea, idea_to_schema)
 
 
 @app.delete("/ideas/{idea_id}")
@@ -292,14 +426,20 @@ def delete_idea(
     idea_id: str,
     context: tuple[User, str] = Depends(get_current_user),
     db: Session = Depends(get_db),
-) -> dict[str, bool]:
+) -> dict[str, bool | str | None]:
+    """Hide the idea at once (tombstoned for sync) and purge its rows in bulk, by default in a job."""
     _, workspace_id = context
-    idea = db.scalar(select(Idea).where(Idea.id == idea_id, Idea.workspace_id == workspace_id))
+    idea = db.scalar(select(Idea).where(Idea.id == idea_id, Idea.workspace_id == workspace_id, Idea.deleted_at.is_(None)))
     if not idea:
         raise HTTPException(status_code=404, detail="Idea not found")
-    db.delete(idea)
-    db.commit()
-    return {"deleted": True}
+    idea.deleted_at = idea.updated_at = datetime.utcnow()
+    if settings.idea_delete_mode == "immediate":
+        db.commit()
+        purge_idea(db, workspace_id, idea_id, batch_size=settings.idea_purge_batch_size)
+        return {"deleted": True, "purge_job_id": None}
+    # enqueue commits the soft delete and the job together.
+    job = jobs.enqueue(db, workspace_id, "purge_idea", {"idea_id": idea_id})
+    return {"deleted": True, "purge_job_id": job.id}
 
 
 @app.get("/ideas/{idea_id}", response_model=IdeaRead)
@@ -309,7 +449,7 @@ def get_idea(
     db: Session = Depends(get_db),
 ) -> IdeaRead:
     _, workspace_id = context
-    idea = db.scalar(select(Idea).where(Idea.id == idea_id, Idea.workspace_id == workspace_id))
+    idea = db.scalar(select(Idea).where(Idea.id == idea_id, Idea.workspace_id == workspace_id, Idea.deleted_at.is_(None)))
     if not idea:
         raise HTTPException(status_code=404, detail="Idea not found")
     return idea_to_schema(idea)
@@ -322,7 +462,9 @@ def list_all_tasks(
 ) -> list[TaskReadWithIdea]:
     _, workspace_id = context
     tasks = db.scalars(
-        select(Task).where(Task.workspace_id == workspace_id).order_by(Task.sort_order.asc(), Task.updated_at.asc())
+        select(Task)
+        .where(Task.workspace_id == workspace_id, Task.idea_id.in_(live_idea_ids(workspace_id)))
+        .order_by(Task.sort_order.asc(), Task.updated_at.asc())
     ).all()
     idea_ids = {t.idea_id for t in tasks}
     ideas = db.scalars(select(Idea).where(Idea.id.in_(idea_ids))).all() if idea_ids else []
@@ -334,6 +476,53 @@ def list_all_tasks(
     return result
 
 
+@app.get("/tasks/top", response_model=list[TaskReadWithIdea])
+def list_top_tasks(
+    limit: int = 10,
+    idea_id: str | None = None,
+    context: tuple[User, str] = Depends(get_current_user),
+    db: Session = Depends(get_db),
+) -> list[TaskReadWithIdea]:
+    """The workspace's "do next" list: planned / in-progress tasks by priority score."""
+    _, workspace_id = context
+    tasks = top_tasks(db, workspace_id, max(1, min(limit, 100)), idea_id)
+    idea_ids = {t.idea_id for t in tasks}
+    idea_map = dict(db.execute(select(Idea.id, Idea.title).where(Idea.id.in_(idea_ids))).all()) if idea_ids else {}
+    return [
+        TaskReadWithIdea(**task_to_schema(t).model_dump(), idea_title=idea_map.get(t.idea_id, "")) for t in tasks
+    ]
+
+
+@app.get("/timeline", response_model=TimelineResponse)
+def get_timeline(
+    year: int | None = None,
+    start: str | None = None,
+    end: str | None = None,
+    month: str | None = None,
+    idea_id: str | None = None,
+    context: tuple[User, str] = Depends(get_current_user),
+    db: Session = Depends(get_db),
+) -> TimelineResponse:
+    """Gantt rows for one year (`year`, default the year of `month`) or a `start`..`end` window."""
+    _, workspace_id = context
+    current = timeline.month_index(month or datetime.utcnow().strftime("%Y-%m"))
+    if current is None:
+        raise HTTPException(status_code=400, detail=f"Invalid month: {month}")
+    if start or end:
+        first = timeline.month_index(start or "")
+        last = timeline.month_index(end or "")
+        if first is None or last is None or last < first:
+            raise HTTPException(status_code=400, detail="start and end must be YYYY-MM with start <= end")
+        if last - first + 1 > settings.timeline_max_months:
+            raise HTTPException(status_code=400, detail=f"Window is limited to {settings.timeline_max_months} months")
+    else:
+        window_year = year if year is not None else current // 12
+        if not 1 <= window_year <= 9999:
+            raise HTTPException(status_code=400, detail=f"Invalid year: {year}")
+        first, last = window_year * 12, window_year * 12 + 11
+    return TimelineResponse(**timeline.build_timeline(db, workspace_id, first, last, current, idea_id))
+
+
 @app.get("/ideas/{idea_id}/tasks", response_model=list[TaskRead])
 def list_tasks(
     idea_id: str,
@@ -342,7 +531,11 @@ def list_tasks(
 ) -> list[TaskRead]:
     _, workspace_id = context
     tasks = db.scalars(
-        select(Task).where(Task.workspace_id == workspace_id, Task.idea_id == idea_id).order_by(Task.sort_order.asc(), Task.updated_at.asc())
+        select(Task)
+        .where(
+            Task.workspace_id == workspace_id, Task.idea_id == idea_id, Task.idea_id.in_(live_idea_ids(workspace_id))
+        )
+        .order_by(Task.sort_order.asc(), Task.updated_at.asc())
     ).all()
     return [task_to_schema(item) for item in tasks]
 
@@ -354,7 +547,7 @@ def delete_task(
     db: Session = Depends(get_db),
 ) -> dict[str, bool]:
     _, workspace_id = context
-    task = db.scalar(select(Task).where(Task.id == task_id, Task.workspace_id == workspace_id))
+    task = _live_child(db, Task, workspace_id, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     db.delete(task)
@@ -371,7 +564,11 @@ def list_deliverables(
     _, workspace_id = context
     items = db.scalars(
         select(Deliverable)
-        .where(Deliverable.workspace_id == workspace_id, Deliverable.idea_id == idea_id)
+        .where(
+            Deliverable.workspace_id == workspace_id,
+            Deliverable.idea_id == idea_id,
+            Deliverable.idea_id.in_(live_idea_ids(workspace_id)),
+        )
         .order_by(Deliverable.due_month.asc())
     ).all()
     return [deliverable_to_schema(item) for item in items]
@@ -385,7 +582,7 @@ def create_deliverable(
     db: Session = Depends(get_db),
 ) -> DeliverableRead:
     _, workspace_id = context
-    idea = db.scalar(select(Idea).where(Idea.id == idea_id, Idea.workspace_id == workspace_id))
+    idea = db.scalar(select(Idea).where(Idea.id == idea_id, Idea.workspace_id == workspace_id, Idea.deleted_at.is_(None)))
     if not idea:
         raise HTTPException(status_code=404, detail="Idea not found")
     item = Deliverable(
@@ -397,9 +594,7 @@ def create_deliverable(
         status=payload.status.value,
     )
     db.add(item)
-    db.commit()
-    db.refresh(item)
-    return deliverable_to_schema(item)
+    return commit_as(db, item, deliverable_to_schema)
 
 
 @app.get("/ideas/{idea_id}/update_logs", response_model=list[UpdateLogRead])
@@ -412,7 +607,12 @@ def list_update_logs(
     _, workspace_id = context
     logs = db.scalars(
         select(UpdateLog)
-        .where(UpdateLog.workspace_id == workspace_id, UpdateLog.idea_id == idea_id)
+        .where(
+            UpdateLog.workspace_id == workspace_id,
+            UpdateLog.idea_id == idea_id,
+            UpdateLog.idea_id.in_(live_idea_ids(workspace_id)),
+        )
+        .options(selectinload(UpdateLog.body))
         .order_by(UpdateLog.created_at.desc())
         .limit(max(1, min(limit, 100)))
     ).all()
@@ -426,9 +626,7 @@ def delete_deliverable(
     db: Session = Depends(get_db),
 ) -> dict[str, bool]:
     _, workspace_id = context
-    item = db.scalar(
-        select(Deliverable).where(Deliverable.id == deliverable_id, Deliverable.workspace_id == workspace_id)
-    )
+    item = _live_child(db, Deliverable, workspace_id, deliverable_id)
     if not item:
         raise HTTPException(status_code=404, detail="Deliverable not found")
     db.delete(item)
@@ -443,7 +641,7 @@ def delete_update_log(
     db: Session = Depends(get_db),
 ) -> dict[str, bool]:
     _, workspace_id = context
-    item = db.scalar(select(UpdateLog).where(UpdateLog.id == update_log_id, UpdateLog.workspace_id == workspace_id))
+    item = _live_child(db, UpdateLog, workspace_id, update_log_id)
     if not item:
         raise HTTPException(status_code=404, detail="Update log not found")
     db.delete(item)
@@ -451,6 +649,31 @@ def delete_update_log(
     return {"deleted": True}
 
 
+@app.get("/update_logs/{update_log_id}/similar", response_model=list[SimilarUpdateLog])
+def get_similar_update_logs(
+    update_log_id: str,
+    k: int = 10,
+    context: tuple[User, str] = Depends(get_current_user),
+    db: Session = Depends(get_db),
+) -> list[SimilarUpdateLog]:
+    """Most similar past reports across all ideas (local TF-IDF index, cosine similarity)."""
+    _, workspace_id = context
+    item = _live_child(db, UpdateLog, workspace_id, update_log_id)
+    if not item:
+        raise HTTPException(status_code=404, detail="Update log not found")
+    return [
+        SimilarUpdateLog(
+            id=log.id,
+            idea_id=log.idea_id,
+            title=log.title,
+            ai_summary=log.ai_summary,
+            created_at=log.created_at,
+            score=round(score, 4),
+        )
+        for log, score in similar_update_logs(db, item, max(1, min(k, 50)))
+    ]
+
+
 @app.post("/ideas/{idea_id}/tasks", response_model=TaskRead)
 def create_task(
     idea_id: str,
@@ -459,7 +682,7 @@ def create_task(
     db: Session = Depends(get_db),
 ) -> TaskRead:
     _, workspace_id = context
-    idea = db.scalar(select(Idea).where(Idea.id == idea_id, Idea.workspace_id == workspace_id))
+    idea = db.scalar(select(Idea).where(Idea.id == idea_id, Idea.workspace_id == workspace_id, Idea.deleted_at.is_(None)))
     if not idea:
         raise HTTPException(status_code=404, detail="Idea not found")
 
@@ -476,9 +699,23 @@ def create_task(
         updated_at=datetime.utcnow(),
     )
     db.add(task)
+    return commit_as(db, task, task_to_schema)
+
+
+@app.patch("/tasks/reorder", response_model=TaskReorderResponse)
+def reorder_tasks(
+    payload: TaskReorderRequest,
+    context: tuple[User, str] = Depends(get_current_user),
+    db: Session = Depends(get_db),
+) -> TaskReorderResponse:
+    _, workspace_id = context
+    for idx, task_id in enumerate(payload.task_ids):
+        task = _live_child(db, Task, workspace_id, task_id)
+        if task:
+            task.sort_order = idx
+            db.add(task)
     db.commit()
-    db.refresh(task)
-    return task_to_schema(task)
+    return TaskReorderResponse(reordered=len(payload.task_ids))
 
 
 @app.patch("/tasks/{task_id}", response_model=TaskRead)
@@ -489,36 +726,26 @@ def update_task(
     db: Session = Depends(get_db),
 ) -> TaskRead:
     _, workspace_id = context
-    task = db.scalar(select(Task).where(Task.id == task_id, Task.workspace_id == workspace_id))
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-
     patch = payload.model_dump(exclude_none=True)
     if "status" in patch:
         patch["status"] = payload.status.value  # type: ignore[union-attr]
+    if writes.can_return(db) and not patch.keys() & priority.TASK_SCORE_FIELDS:
+        # Board / Gantt edits (status, title, months): one UPDATE ... RETURNING.
+        row = writes.update_returning(db, Task, workspace_id, task_id, {**patch, "updated_at": datetime.utcnow()})
+        if row is None:
+            raise HTTPException(status_code=404, detail="Task not found")
+        db.commit()
+        return task_to_schema(row)
+
+    # The idea is loaded with the task: re-scoring at flush reads its inputs from the session.
+    task = _live_child(db, Task, workspace_id, task_id, joinedload(Task.idea))
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
     for key, value in patch.items():
         setattr(task, key, value)
     task.updated_at = datetime.utcnow()
     db.add(task)
-    db.commit()
-    db.refresh(task)
-    return task_to_schema(task)
-
-
-@app.patch("/tasks/reorder", response_model=TaskReorderResponse)
-def reorder_tasks(
-    payload: TaskReorderRequest,
-    context: tuple[User, str] = Depends(get_current_user),
-    db: Session = Depends(get_db),
-) -> TaskReorderResponse:
-    _, workspace_id = context
-    for idx, task_id in enumerate(payload.task_ids):
-        task = db.scalar(select(Task).where(Task.id == task_id, Task.workspace_id == workspace_id))
-        if task:
-            task.sort_order = idx
-            db.add(task)
-    db.commit()
-    return TaskReorderResponse(reordered=len(payload.task_ids))
+    return commit_as(db, task, task_to_schema)
 
 
 @app.patch("/deliverables/{deliverable_id}", response_model=DeliverableRead)
@@ -529,21 +756,23 @@ def update_deliverable(
     db: Session = Depends(get_db),
 ) -> DeliverableRead:
     _, workspace_id = context
-    item = db.scalar(
-        select(Deliverable).where(Deliverable.id == deliverable_id, Deliverable.workspace_id == workspace_id)
-    )
-    if not item:
-        raise HTTPException(status_code=404, detail="Deliverable not found")
-
     patch = payload.model_dump(exclude_none=True)
     if "status" in patch:
         patch["status"] = payload.status.value  # type: ignore[union-attr]
+    if writes.can_return(db) and patch:
+        row = writes.update_returning(db, Deliverable, workspace_id, deliverable_id, patch)
+        if row is None:
+            raise HTTPException(status_code=404, detail="Deliverable not found")
+        db.commit()
+        return deliverable_to_schema(row)
+
+    item = _live_child(db, Deliverable, workspace_id, deliverable_id)
+    if not item:
+        raise HTTPException(status_code=404, detail="Deliverable not found")
     for key, value in patch.items():
         setattr(item, key, value)
     db.add(item)
-    db.commit()
-    db.refresh(item)
-    return deliverable_to_schema(item)
+    return commit_as(db, item, deliverable_to_schema)
 
 
 @app.get("/ideas/{idea_id}/progress", response_model=IdeaProgress)
@@ -553,7 +782,7 @@ def idea_progress(
     db: Session = Depends(get_db),
 ) -> IdeaProgress:
     _, workspace_id = context
-    idea = db.scalar(select(Idea).where(Idea.id == idea_id, Idea.workspace_id == workspace_id))
+    idea = db.scalar(select(Idea).where(Idea.id == idea_id, Idea.workspace_id == workspace_id, Idea.deleted_at.is_(None)))
     if not idea:
         raise HTTPException(status_code=404, detail="Idea not found")
     task_completion, deliverable_completion, progress = compute_idea_progress(db, workspace_id, idea_id)
@@ -573,7 +802,7 @@ def idea_risks(
     db: Session = Depends(get_db),
 ) -> list[RiskItem]:
     _, workspace_id = context
-    idea = db.scalar(select(Idea).where(Idea.id == idea_id, Idea.workspace_id == workspace_id))
+    idea = db.scalar(select(Idea).where(Idea.id == idea_id, Idea.workspace_id == workspace_id, Idea.deleted_at.is_(None)))
     if not idea:
         raise HTTPException(status_code=404, detail="Idea not found")
     items = detect_risks(db, workspace_id, idea_id, month)
@@ -588,7 +817,7 @@ def idea_next_actions(
     db: Session = Depends(get_db),
 ) -> NextActionsResponse:
     _, workspace_id = context
-    idea = db.scalar(select(Idea).where(Idea.id == idea_id, Idea.workspace_id == workspace_id))
+    idea = db.scalar(select(Idea).where(Idea.id == idea_id, Idea.workspace_id == workspace_id, Idea.deleted_at.is_(None)))
     if not idea:
         raise HTTPException(status_code=404, detail="Idea not found")
     actions = recommend_next_actions(db, workspace_id, idea_id, month)
@@ -601,12 +830,26 @@ def export_workspace(
     db: Session = Depends(get_db),
 ) -> WorkspaceExportResponse:
     _, workspace_id = context
-    ideas = db.scalars(select(Idea).where(Idea.workspace_id == workspace_id).order_by(Idea.created_at.asc())).all()
-    tasks = db.scalars(select(Task).where(Task.workspace_id == workspace_id).order_by(Task.sort_order.asc(), Task.updated_at.asc())).all()
+    ideas = db.scalars(
+        select(Idea).where(Idea.workspace_id == workspace_id, Idea.deleted_at.is_(None)).order_by(Idea.created_at.asc())
+    ).all()
+    live = live_idea_ids(workspace_id)
+    tasks = db.scalars(
+        select(Task)
+        .where(Task.workspace_id == workspace_id, Task.idea_id.in_(live))
+        .order_by(Task.sort_order.asc(), Task.updated_at.asc())
+    ).all()
     deliverables = db.scalars(
-        select(Deliverable).where(Deliverable.workspace_id == workspace_id).order_by(Deliverable.due_month.asc())
+        select(Deliverable)
+        .where(Deliverable.workspace_id == workspace_id, Deliverable.idea_id.in_(live))
+        .order_by(Deliverable.due_month.asc())
+    ).all()
+    logs = db.scalars(
+        select(UpdateLog)
+        .where(UpdateLog.workspace_id == workspace_id, UpdateLog.idea_id.in_(live))
+        .options(selectinload(UpdateLog.body))
+        .order_by(UpdateLog.created_at.desc())
     ).all()
-    logs = db.scalars(select(UpdateLog).where(UpdateLog.workspace_id == workspace_id).order_by(UpdateLog.created_at.desc())).all()
     return WorkspaceExportResponse(
         workspace_id=workspace_id,
         exported_at=datetime.utcnow(),
@@ -617,6 +860,130 @@ def export_workspace(
     )
 
 
+def _snapshot_lines(workspace_id: str):
+    # Own session: the response outlives the request's dependency-scoped one.
+    with SessionLocal() as db:
+        header = {"version": SNAPSHOT_VERSION, "workspace_id": workspace_id, "exported_at": datetime.utcnow().isoformat()}
+        yield json.dumps({"snapshot": header}) + "\n"
+        live = live_idea_ids(workspace_id)
+        sections = (
+            ("ideas", select(Idea).where(Idea.id.in_(live)), idea_to_schema),
+            ("tasks", select(Task).where(Task.idea_id.in_(live)), task_to_schema),
+            ("deliverables", select(Deliverable).where(Deliverable.idea_id.in_(live)), deliverable_to_schema),
+            (
+                "update_logs",
+                select(UpdateLog).where(UpdateLog.idea_id.in_(live)).options(selectinload(UpdateLog.body)),
+                log_to_schema,
+            ),
+        )
+        for table, query, to_schema in sections:
+            model = query.column_descriptions[0]["entity"]
+            query = query.where(model.workspace_id == workspace_id).order_by(model.id)
+            for item in db.scalars(query.execution_options(yield_per=1000)):
+                yield json.dumps({"table": table, "row": to_schema(item).model_dump(mode="json")}) + "\n"
+
+
+@app.get("/export/workspace/stream")
+def export_workspace_stream(context: tuple[User, str] = Depends(get_current_user)) -> StreamingResponse:
+    """The workspace export as NDJSON: a `snapshot` header line, then one `{table, row}` per line.
+
+    Rows are read in chunks and written as they are serialized, so memory stays flat however
+    large the workspace; `POST /restore/workspace` reads this form (or the JSON export) back.
+    """
+    _, workspace_id = context
+    return StreamingResponse(
+        _snapshot_lines(workspace_id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="workspace.ndjson"'},
+    )
+
+
+@app.get("/export/workspace/columnar")
+def export_workspace_columnar(
+    format: str = "parquet",
+    table: str | None = None,
+    context: tuple[User, str] = Depends(get_current_user),
+    db: Session = Depends(get_db),
+) -> FileResponse:
+    """The workspace as Parquet or Arrow IPC tables: one `table` as a single file, or all of them as a zip.
+
+    Tables are ideas, tasks, deliverables, update_logs, checklist_items and update_log_tags,
+    written batch by batch from streamed queries. Needs the optional `pyarrow` package (501 without it).
+    """
+    _, workspace_id = context
+    if format not in columnar.FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(columnar.FORMATS)}")
+    if table is not None and table not in columnar.TABLES:
+        raise HTTPException(status_code=400, detail=f"table must be one of: {', '.join(columnar.TABLES)}")
+    filename = f"{table}{columnar.FORMATS[format]}" if table else f"workspace-{format}.zip"
+    handle, path = tempfile.mkstemp(prefix="researchos-columnar-", suffix=Path(filename).suffix)
+    os.close(handle)
+    try:
+        columnar.export_workspace(db, workspace_id, Path(path), format, table, settings.columnar_batch_size)
+    except columnar.ColumnarUnavailable as exc:
+        os.unlink(path)
+        raise HTTPException(status_code=501, detail=str(exc)) from exc
+    except BaseException:
+        os.unlink(path)
+        raise
+    media_type = "application/zip" if table is None else "application/octet-stream"
+    return FileResponse(path, media_type=media_type, filename=filename, background=BackgroundTask(os.unlink, path))
+
+
+@app.post("/restore/workspace", response_model=JobRead, status_code=202)
+def restore_workspace(
+    file: UploadFile = File(...),
+    mode: str = "merge",
+    context: tuple[User, str] = Depends(get_current_user),
+    db: Session = Depends(get_db),
+) -> JobRead:
+    """Queue a restore of an export snapshot (JSON or NDJSON, optionally .gz) into this workspace.
+
+    Ids are kept. `merge` upserts the snapshot over the workspace; `replace` removes the
+    workspace's ideas, tasks, deliverables and logs first. Poll `/jobs/{id}` for the counts.
+    """
+    _, workspace_id = context
+    if mode not in RESTORE_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of: {', '.join(RESTORE_MODES)}")
+    spool_dir = Path(settings.restore_dir) if settings.restore_dir else Path(tempfile.gettempdir()) / "researchos-restore"
+    spool_dir.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=spool_dir, prefix="snapshot-", delete=False) as spool:
+        shutil.copyfileobj(file.file, spool, 1024 * 1024)
+    job = jobs.enqueue(db, workspace_id, "restore_workspace", {"path": spool.name, "mode": mode, "remove_after": True})
+    return job_to_schema(job)
+
+
+@app.get("/changes", response_model=ChangesResponse)
+def list_changes(
+    since: str = "0",
+    limit: int = 500,
+    context: tuple[User, str] = Depends(get_current_user),
+    db: Session = Depends(get_db),
+) -> ChangesResponse:
+    """Delta sync: rows upserted or deleted after the `since` cursor (a revision or a `next_cursor`)."""
+    _, workspace_id = context
+    try:
+        cursor = SyncCursor.parse(since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {since}")
+
+    changes = changes_since(db, workspace_id, cursor, max(1, min(limit, 5000)))
+    return ChangesResponse(
+        since=since,
+        next_cursor=str(changes.next_cursor),
+        has_more=changes.has_more,
+        revision=changes.revision,
+        ideas=[idea_to_schema(item) for item in changes.rows[Idea]],
+        tasks=[task_to_schema(item) for item in changes.rows[Task]],
+        deliverables=[deliverable_to_schema(item) for item in changes.rows[Deliverable]],
+        update_logs=[log_to_schema(item) for item in changes.rows[UpdateLog]],
+        deleted=[
+            DeletedRecord(type=item.entity_type, id=item.entity_id, revision=item.revision, deleted_at=item.deleted_at)
+            for item in changes.rows[Tombstone]
+        ],
+    )
+
+
 @app.post("/ideas/{idea_id}/update_logs", response_model=UpdateLogRead)
 def create_update_log(
     idea_id: str,
@@ -625,42 +992,33 @@ def create_update_log(
     db: Session = Depends(get_db),
 ) -> UpdateLogRead:
     _, workspace_id = context
-    idea = db.scalar(select(Idea).where(Idea.id == idea_id, Idea.workspace_id == workspace_id))
+    idea = db.scalar(select(Idea).where(Idea.id == idea_id, Idea.workspace_id == workspace_id, Idea.deleted_at.is_(None)))
     if not idea:
         raise HTTPException(status_code=404, detail="Idea not found")
 
-    summary, tags = summarize_markdown(payload.body_md)
-    log = UpdateLog(
-        workspace_id=workspace_id,
-        idea_id=idea_id,
-        source=payload.source,
-        title=payload.title,
-        body_md=payload.body_md,
-        ai_summary=summary,
-        ai_tags=tags,
-        ai_risk_flags=[],
-    )
+    log = build_update_log(workspace_id, idea_id, payload.source, payload.title, payload.body_md)
     db.add(log)
-    db.commit()
-    db.refresh(log)
-    return log_to_schema(log)
+    return commit_as(db, log, log_to_schema)
 
 
 @app.post("/ingest/daily_report", response_model=UpdateLogRead)
-async def ingest_daily_report(
+def ingest_daily_report(
     idea_id: str,
     file: UploadFile = File(...),
     context: tuple[User, str] = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> UpdateLogRead:
     _, workspace_id = context
-    idea = db.scalar(select(Idea).where(Idea.id == idea_id, Idea.workspace_id == workspace_id))
+    idea = db.scalar(select(Idea).where(Idea.id == idea_id, Idea.workspace_id == workspace_id, Idea.deleted_at.is_(None)))
     if not idea:
         raise HTTPException(status_code=404, detail="Idea not found")
 
-    raw = await file.read()
-    body_md = raw.decode("utf-8", errors="replace")
-    summary, tags = summarize_markdown(body_md)
+    # Same capped reader as /ingest/daily_reports/upload: the spooled upload is read once, and
+    # never past UPLOAD_MAX_ENTRY_BYTES.
+    entry = read_report(file.filename or "daily_report.md", file.file, settings.upload_max_entry_bytes)
+    if entry.body is None:
+        raise HTTPException(status_code=413, detail=f"Report is {entry.skipped}")
+    body_md = entry.body.decode("utf-8", errors="replace")
 
     created_at = datetime.utcnow()
     if file.filename:
@@ -669,29 +1027,54 @@ async def ingest_daily_report(
         except ValueError:
             pass
 
-    log = UpdateLog(
-        workspace_id=workspace_id,
-        idea_id=idea_id,
-        source="daily_report",
-        title=file.filename or "daily_report.md",
-        body_md=body_md,
-        ai_summary=summary,
-        ai_tags=tags,
-        ai_risk_flags=[],
-        created_at=created_at,
+    log = build_update_log(
+        workspace_id, idea_id, "daily_report", file.filename or "daily_report.md", body_md, created_at
     )
     db.add(log)
-    db.commit()
-    db.refresh(log)
-    return log_to_schema(log)
+    return commit_as(db, log, log_to_schema)
+
+
+@app.post("/ingest/daily_reports/upload", response_model=UploadIngestResponse)
+def upload_daily_reports(
+    idea_id: str,
+    files: list[UploadFile] = File(...),
+    pattern: str = settings.reports_pattern,
+    context: tuple[User, str] = Depends(get_current_user),
+    db: Session = Depends(get_db),
+) -> UploadIngestResponse:
+    """Ingest several report files and/or .zip / .tar.gz archives of them in one request.
 
+    Archive members are decompressed one at a time and must match `pattern`; every file goes
+    through the same title dedup, summarize and insert path as bulk ingest.
+    """
+    _, workspace_id = context
+    idea = db.scalar(select(Idea).where(Idea.id == idea_id, Idea.workspace_id == workspace_id, Idea.deleted_at.is_(None)))
+    if not idea:
+        raise HTTPException(status_code=404, detail="Idea not found")
+
+    entries = (
+        entry
+        for upload in files
+        for entry in iter_entries(upload.filename or "upload.md", upload.file, pattern, settings.upload_max_entry_bytes)
+    )
+    results = ingest_upload_entries(db, workspace_id, idea_id, entries, settings.upload_batch_size)
+    counts = Counter(result["status"] for result in results)
+    return UploadIngestResponse(
+        imported=counts["imported"],
+        duplicates=counts["duplicate"],
+        skipped=counts["skipped"],
+        errors=counts["error"],
+        results=[UploadFileResult(**result) for result in results],
+    )
 
-@app.post("/seed/import", response_model=SeedImportResponse)
+
+@app.post("/seed/import", response_model=JobRead, status_code=202)
 def seed_import(
     path: str = "../seed/mvp_seed_plan_2026.json",
     context: tuple[User, str] = Depends(get_current_user),
     db: Session = Depends(get_db),
-) -> SeedImportResponse:
+) -> JobRead:
+    """Queue a seed import; poll `/jobs/{id}` for the imported counts."""
     _, workspace_id = context
     seed_path = Path(path)
     if not seed_path.exists():
@@ -701,24 +1084,21 @@ def seed_import(
     if not seed_path.exists():
         raise HTTPException(status_code=404, detail=f"Seed file not found: {seed_path}")
 
-    imported_ideas, imported_tasks, imported_deliverables = import_seed(db, workspace_id, seed_path)
-    return SeedImportResponse(
-        imported_ideas=imported_ideas,
-        imported_tasks=imported_tasks,
-        imported_deliverables=imported_deliverables,
-    )
+    job = jobs.enqueue(db, workspace_id, "seed_import", {"path": str(seed_path)})
+    return job_to_schema(job)
 
 
-@app.post("/ingest/daily_reports/bulk", response_model=BulkIngestResponse)
+@app.post("/ingest/daily_reports/bulk", response_model=JobRead, status_code=202)
 def ingest_daily_reports_bulk(
     idea_id: str,
     reports_dir: str = settings.reports_dir,
     pattern: str = settings.reports_pattern,
     context: tuple[User, str] = Depends(get_current_user),
     db: Session = Depends(get_db),
-) -> BulkIngestResponse:
+) -> JobRead:
+    """Queue a bulk ingest of report files; poll `/jobs/{id}` for progress and the result."""
     _, workspace_id = context
-    idea = db.scalar(select(Idea).where(Idea.id == idea_id, Idea.workspace_id == workspace_id))
+    idea = db.scalar(select(Idea).where(Idea.id == idea_id, Idea.workspace_id == workspace_id, Idea.deleted_at.is_(None)))
     if not idea:
         raise HTTPException(status_code=404, detail="Idea not found")
 
@@ -726,8 +1106,26 @@ def ingest_daily_reports_bulk(
     if not report_path.exists():
         raise HTTPException(status_code=404, detail=f"Reports dir not found: {reports_dir}")
 
-    imported = bulk_ingest_reports(db, workspace_id, idea_id, report_path, pattern)
-    return BulkIngestResponse(imported_logs=imported)
+    job = jobs.enqueue(
+        db,
+        workspace_id,
+        "bulk_ingest",
+        {"idea_id": idea_id, "reports_dir": str(report_path.resolve()), "pattern": pattern},
+    )
+    return job_to_schema(job)
+
+
+@app.get("/jobs/{job_id}", response_model=JobRead)
+def get_job(
+    job_id: str,
+    context: tuple[User, str] = Depends(get_current_user),
+    db: Session = Depends(get_db),
+) -> JobRead:
+    _, workspace_id = context
+    job = db.scalar(select(Job).where(Job.id == job_id, Job.workspace_id == workspace_id))
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_to_schema(job)
 
 
 @app.get("/settings/sync")
@@ -748,7 +1146,7 @@ def ingest_direct_report(
     db: Session = Depends(get_db),
 ) -> UpdateLogRead:
     _, workspace_id = context
-    idea = db.scalar(select(Idea).where(Idea.id == payload.idea_id, Idea.workspace_id == workspace_id))
+    idea = db.scalar(select(Idea).where(Idea.id == payload.idea_id, Idea.workspace_id == workspace_id, Idea.deleted_at.is_(None)))
     if not idea:
         raise HTTPException(status_code=404, detail="Idea not found")
 
@@ -763,63 +1161,85 @@ def ingest_direct_report(
     if exists:
         return log_to_schema(exists)
 
-    summary, tags = summarize_markdown(payload.body_md)
-    log = UpdateLog(
-        workspace_id=workspace_id,
-        idea_id=payload.idea_id,
-        source=payload.source or "direct_ingest",
-        title=payload.title,
-        body_md=payload.body_md,
-        ai_summary=summary,
-        ai_tags=tags,
-        ai_risk_flags=[],
+    log = build_update_log(
+        workspace_id, payload.idea_id, payload.source or "direct_ingest", payload.title, payload.body_md
     )
     db.add(log)
-    db.commit()
-    db.refresh(log)
-    return log_to_schema(log)
+    return commit_as(db, log, log_to_schema)
+
+
+@app.get("/events/stream")
+async def stream_events(
+    request: Request,
+    last_event_id: str | None = None,
+    access_token: str | None = None,
+    credentials: HTTPAuthorizationCredentials | None = Depends(bearer),
+) -> StreamingResponse:
+    """Stream workspace change events (type, id, op, revision) as server-sent events.
+
+    EventSource can't set headers, so the token may be passed as `access_token`.
+    Reconnects resume from the `Last-Event-ID` header (or `last_event_id`).
+    """
+    token = credentials.credentials if credentials else access_token
+    workspace_id = await run_in_threadpool(_stream_workspace_id, token)
+    last_event_id = request.headers.get("last-event-id") or last_event_id
+
+    return StreamingResponse(
+        stream_changes(workspace_id, last_event_id, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics(
+    token: str | None = None,
+    credentials: HTTPAuthorizationCredentials | None = Depends(bearer),
+) -> PlainTextResponse:
+    """Prometheus text exposition. Protected by METRICS_TOKEN when it is set."""
+    if settings.metrics_token:
+        supplied = credentials.credentials if credentials else token
+        if supplied != settings.metrics_token:
+            raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
 
 
 @app.get("/settings/ai", response_model=AISettingsResponse)
 def ai_settings(
     context: tuple[User, str] = Depends(get_current_user),
 ) -> AISettingsResponse:
-    """Check OpenAI API configuration and connectivity status."""
+    """AI provider configuration and connectivity status.
+
+    The connectivity probe runs in a background thread every AI_HEALTH_REFRESH_SECONDS;
+    this endpoint only reads the cached result.
+    """
     _ = context  # auth required
-    key = settings.openai_api_key
-    model = settings.openai_model
-    budget = settings.ai_monthly_budget_usd
-
-    if not key:
-        return AISettingsResponse(
-            configured=False,
-            model=model,
-            status="inactive",
-            message="No API key configured. Using local fallback summarization.",
-            monthly_budget_usd=budget,
-        )
+    health = ai.health.current()
+    return AISettingsResponse(
+        configured=ai.get_provider() is not None,
+        model=settings.openai_model,
+        status=health.status,
+        message=health.message,
+        monthly_budget_usd=settings.ai_monthly_budget_usd,
+        provider=settings.ai_provider,
+        circuit_state=ai.breaker.state,
+        checked_at=health.checked_at,
+        probe_latency_ms=health.latency_ms,
+    )
 
-    # Validate key by making a lightweight API call
-    try:
-        import openai
-
-        client = openai.OpenAI(api_key=key)
-        client.models.list()
-        return AISettingsResponse(
-            configured=True,
-            model=model,
-            status="active",
-            message="OpenAI API is connected and working.",
-            monthly_budget_usd=budget,
-        )
-    except Exception as exc:
-        return AISettingsResponse(
-            configured=True,
-            model=model,
-            status="error",
-            message=f"API key set but validation failed: {exc}",
-            monthly_budget_usd=budget,
-        )
+
+@app.get("/ai/usage", response_model=AIUsageReport)
+def ai_usage_report(
+    month: str | None = None,
+    context: tuple[User, str] = Depends(get_current_user),
+    db: Session = Depends(get_db),
+) -> AIUsageReport:
+    """AI calls, tokens, cost and latency for one month (default: current) from the usage ledger."""
+    _ = context  # auth required
+    month = month or usage.current_month()
+    if not re.fullmatch(r"\d{4}-\d{2}", month):
+        raise HTTPException(status_code=400, detail="month must be YYYY-MM")
+    return AIUsageReport(**usage.monthly_report(db, month))
 
 
 @app.get("/update_logs", response_model=list[UpdateLogRead])
@@ -828,16 +1248,104 @@ def list_update_logs(
     offset: int = 0,
     idea_id: str | None = None,
     source: str | None = None,
+    tag: str | None = None,
     context: tuple[User, str] = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> list[UpdateLogRead]:
     """List workspace-wide update logs with optional filters."""
     _, workspace_id = context
-    q = select(UpdateLog).where(UpdateLog.workspace_id == workspace_id)
+    q = select(UpdateLog).where(
+        UpdateLog.workspace_id == workspace_id, UpdateLog.idea_id.in_(live_idea_ids(workspace_id))
+    )
     if idea_id:
         q = q.where(UpdateLog.idea_id == idea_id)
     if source:
         q = q.where(UpdateLog.source == source)
-    q = q.order_by(UpdateLog.created_at.desc()).offset(offset).limit(limit)
+    if tag:
+        q = q.join(UpdateLogTag, UpdateLogTag.log_id == UpdateLog.id).where(
+            UpdateLogTag.workspace_id == workspace_id, UpdateLogTag.tag == normalize_tag(tag)
+        )
+    q = q.options(selectinload(UpdateLog.body)).order_by(UpdateLog.created_at.desc()).offset(offset).limit(limit)
     logs = db.scalars(q).all()
     return [log_to_schema(log) for log in logs]
+
+
+@app.get("/update_logs/tags", response_model=list[TagFacet])
+def get_tag_facets(
+    period: str | None = None,
+    by_idea: bool = False,
+    idea_id: str | None = None,
+    start: date | None = None,
+    end: date | None = None,
+    context: tuple[User, str] = Depends(get_current_user),
+    db: Session = Depends(get_db),
+) -> list[TagFacet]:
+    """Tag counts, optionally split `by_idea` and per `period` (day, week or month)."""
+    _, workspace_id = context
+    if period and period not in TAG_FACET_PERIODS:
+        raise HTTPException(status_code=400, detail="period must be day, week or month")
+    return [TagFacet(**facet) for facet in tag_facets(db, workspace_id, period, by_idea, idea_id, start, end)]
+
+
+@app.get("/checklist/items", response_model=list[ChecklistItemRead])
+def list_checklist_items(
+    state: str | None = None,
+    idea_id: str | None = None,
+    start: date | None = None,
+    end: date | None = None,
+    limit: int = 100,
+    offset: int = 0,
+    context: tuple[User, str] = Depends(get_current_user),
+    db: Session = Depends(get_db),
+) -> list[ChecklistItemRead]:
+    """Checklist items extracted from update logs, newest report first (e.g. `state=done`)."""
+    _, workspace_id = context
+    q = select(ChecklistItem).where(
+        ChecklistItem.workspace_id == workspace_id, ChecklistItem.idea_id.in_(live_idea_ids(workspace_id))
+    )
+    if state:
+        q = q.where(ChecklistItem.state == state)
+    if idea_id:
+        q = q.where(ChecklistItem.idea_id == idea_id)
+    if start:
+        q = q.where(ChecklistItem.report_date >= start)
+    if end:
+        q = q.where(ChecklistItem.report_date <= end)
+    q = q.order_by(ChecklistItem.report_date.desc(), ChecklistItem.log_id, ChecklistItem.position)
+    items = db.scalars(q.offset(offset).limit(max(1, min(limit, 1000)))).all()
+    return [checklist_item_to_schema(item) for item in items]
+
+
+@app.get("/checklist/completions", response_model=list[ChecklistCompletionBucket])
+def get_checklist_completions(
+    period: str = "month",
+    idea_id: str | None = None,
+    start: date | None = None,
+    end: date | None = None,
+    context: tuple[User, str] = Depends(get_current_user),
+    db: Session = Depends(get_db),
+) -> list[ChecklistCompletionBucket]:
+    """Done / in-progress / todo checklist counts per `day`, `week` (ISO) or `month`."""
+    _, workspace_id = context
+    if period not in CHECKLIST_PERIODS:
+        raise HTTPException(status_code=400, detail="period must be day, week or month")
+    rows = checklist_completions(db, workspace_id, period, idea_id, start, end)
+    return [ChecklistCompletionBucket(**row) for row in rows]
+
+
+@app.get("/activity/heatmap", response_model=list[ActivityDay])
+def get_activity_heatmap(
+    start: date | None = None,
+    end: date | None = None,
+    idea_id: str | None = None,
+    by_idea: bool = False,
+    context: tuple[User, str] = Depends(get_current_user),
+    db: Session = Depends(get_db),
+) -> list[ActivityDay]:
+    """Update logs and completed checklist items per day; days without activity are omitted."""
+    _, workspace_id = context
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=364)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    return [ActivityDay(**row) for row in activity.heatmap(db, workspace_id, start, end, idea_id, by_idea)]
@@ -0,0 +1,223 @@
+﻿from __future__ import annotations
+
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+import math
+import threading
+import time
+
+LabelValues = tuple[str, ...]
+
+# Seconds. Prometheus convention; the +Inf bucket is implicit.
+LATENCY_BUCKETS: tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._lock = threading.Lock()
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = ()) -> None:
+        super().__init__(name, help_text, labels)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values: str) -> float:
+        with self._lock:
+            return self._values.get(label_values, 0.0)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """Gauge whose samples are read from a callback at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        collect: Callable[[], Iterable[tuple[LabelValues, float]]],
+        labels: tuple[str, ...] = (),
+    ) -> None:
+        super().__init__(name, help_text, labels)
+        self._collect = collect
+
+    def render(self) -> list[str]:
+        try:
+            samples = list(self._collect())
+        except Exception:
+            return []
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in samples]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, labels)
+        self.buckets = buckets
+        # Per label set: [per-bucket counts (+Inf last), sum, count]
+        self._series: dict[LabelValues, list] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted((key, [list(counts), total, count]) for key, (counts, total, count) in self._series.items())
+        lines: list[str] = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, math.inf), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: list[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(
+    Counter("researchos_http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status"))
+)
+http_duration = registry.register(
+    Histogram("researchos_http_request_duration_seconds", "End-to-end request latency.", ("method", "route"))
+)
+http_db_duration = registry.register(
+    Histogram("researchos_http_request_db_seconds", "Time spent in SQL per request.", ("method", "route"))
+)
+http_queries = registry.register(
+    Counter("researchos_http_request_queries_total", "SQL statements executed by route.", ("method", "route"))
+)
+summarize_calls = registry.register(
+    Counter("researchos_summarize_calls_total", "Summarization calls by provider and outcome.", ("provider", "outcome"))
+)
+summarize_duration = registry.register(
+    Histogram("researchos_summarize_duration_seconds", "Summarization latency by provider.", ("provider",))
+)
+summarize_fallbacks = registry.register(
+    Counter(
+        "researchos_summarize_fallbacks_total",
+        "Calls served by the local summarizer instead of the AI provider.",
+        ("reason",),
+    )
+)
+ai_tokens = registry.register(Counter("researchos_ai_tokens_total", "AI tokens consumed.", ("kind",)))
+cache_requests = registry.register(
+    Counter("researchos_cache_requests_total", "In-process cache lookups.", ("cache", "result"))
+)
+
+
+def observe_request(method: str, route: str, status_code: int, total_s: float, db_s: float, queries: int) -> None:
+    http_requests.inc(method, route, str(status_code))
+    http_duration.observe(total_s, method, route)
+    http_db_duration.observe(db_s, method, route)
+    if queries:
+        http_queries.inc(method, route, amount=queries)
+
+
+def record_summarize(provider: str, outcome: str, started: float) -> None:
+    summarize_calls.inc(provider, outcome)
+    summarize_duration.observe(time.perf_counter() - started, provider)
+
+
+def record_fallback(reason: str) -> None:
+    summarize_fallbacks.inc(reason)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    cache_requests.inc(cache, "hit" if hit else "miss")
+
+
+def record_ai_tokens(input_tokens: int, output_tokens: int) -> None:
+    ai_tokens.inc("input", amount=input_tokens)
+    ai_tokens.inc("output", amount=output_tokens)
+
+
+def register_pool_gauges(engine) -> None:
+    """Expose SQLAlchemy pool occupancy. Pools without these counters (e.g. StaticPool) report nothing."""
+    pool = engine.pool
+
+    def sample(method: str) -> Callable[[], list[tuple[LabelValues, float]]]:
+        def collect() -> list[tuple[LabelValues, float]]:
+            reader = getattr(pool, method, None)
+            return [((), float(reader()))] if callable(reader) else []
+
+        return collect
+
+    registry.register(Gauge("researchos_db_pool_size", "Configured pool size.", sample("size")))
+    registry.register(Gauge("researchos_db_pool_checked_out", "Connections currently checked out.", sample("checkedout")))
+    registry.register(Gauge("researchos_db_pool_checked_in", "Idle connections in the pool.", sample("checkedin")))
+    registry.register(Gauge("researchos_db_pool_overflow", "Connections opened beyond pool_size.", sample("overflow")))
@@ -1,9 +1,25 @@
 ﻿from __future__ import annotations
 
-from datetime import datetime
+from datetime import date, datetime
 from uuid import uuid4
 
-from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, JSON, String, Text, UniqueConstraint
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Date,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    JSON,
+    LargeBinary,
+    Select,
+    String,
+    Text,
+    UniqueConstraint,
+    select,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .db import Base
@@ -18,6 +34,7 @@ class Workspace(Base):
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=new_id)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
+    revision: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
 
 
@@ -42,6 +59,10 @@ class WorkspaceMember(Base):
 
 class Idea(Base):
     __tablename__ = "ideas"
+    __table_args__ = (
+        Index("ix_ideas_workspace_revision", "workspace_id", "revision", "id"),
+        Index("ix_ideas_workspace_priority", "workspace_id", "priority_score"),
+    )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=new_id)
     workspace_id: Mapped[str] = mapped_column(String(36), ForeignKey("workspaces.id"), index=True, nullable=False)
@@ -52,18 +73,36 @@ class Idea(Base):
     start_month: Mapped[str] = mapped_column(String(7), nullable=False)
     target_month: Mapped[str] = mapped_column(String(7), nullable=False)
     priority_inputs: Mapped[dict] = mapped_column(JSON, default=dict, nullable=False)
+    # Maintained by app/priority.py on every write; ranks ideas with an index-ordered LIMIT.
+    priority_score: Mapped[float] = mapped_column(Float, default=0.0, nullable=False)
+    revision: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    # Set when the idea is deleted; its rows are then removed by a background purge.
+    deleted_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
 
-    tasks: Mapped[list[Task]] = relationship(back_populates="idea", cascade="all,delete")
+    # Children are removed by ON DELETE CASCADE in the database, not loaded and deleted one by one.
+    tasks: Mapped[list[Task]] = relationship(back_populates="idea", cascade="all,delete", passive_deletes=True)
+
+
+def live_idea_ids(workspace_id: str) -> Select:
+    """Ids of the workspace's ideas that are not deleted, for `Child.idea_id.in_(...)` filters.
+
+    A deleted idea's tasks, deliverables and logs remain until its purge job removes them.
+    """
+    return select(Idea.id).where(Idea.workspace_id == workspace_id, Idea.deleted_at.is_(None))
 
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_tasks_workspace_revision", "workspace_id", "revision", "id"),
+        Index("ix_tasks_workspace_priority", "workspace_id", "priority_score"),
+    )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=new_id)
     workspace_id: Mapped[str] = mapped_column(String(36), ForeignKey("workspaces.id"), index=True, nullable=False)
-    idea_id: Mapped[str] = mapped_column(String(36), ForeignKey("ideas.id"), index=True, nullable=False)
+    idea_id: Mapped[str] = mapped_column(String(36), ForeignKey("ideas.id", ondelete="CASCADE"), index=True, nullable=False)
     phase_id: Mapped[str | None] = mapped_column(String(36), nullable=True)
     title: Mapped[str] = mapped_column(String(255), nullable=False)
     status: Mapped[str] = mapped_column(String(32), nullable=False)
@@ -73,6 +112,8 @@ class Task(Base):
     due_month: Mapped[str] = mapped_column(String(7), nullable=False)
     dependencies: Mapped[list[str]] = mapped_column(JSON, default=list, nullable=False)
     sort_order: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    priority_score: Mapped[float] = mapped_column(Float, default=0.0, nullable=False)
+    revision: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
 
     idea: Mapped[Idea] = relationship(back_populates="tasks")
@@ -80,26 +121,243 @@ class Task(Base):
 
 class Deliverable(Base):
     __tablename__ = "deliverables"
+    __table_args__ = (Index("ix_deliverables_workspace_revision", "workspace_id", "revision", "id"),)
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=new_id)
     workspace_id: Mapped[str] = mapped_column(String(36), ForeignKey("workspaces.id"), index=True, nullable=False)
-    idea_id: Mapped[str] = mapped_column(String(36), ForeignKey("ideas.id"), index=True, nullable=False)
+    idea_id: Mapped[str] = mapped_column(String(36), ForeignKey("ideas.id", ondelete="CASCADE"), index=True, nullable=False)
     title: Mapped[str] = mapped_column(String(255), nullable=False)
     type: Mapped[str] = mapped_column(String(64), nullable=False)
     due_month: Mapped[str] = mapped_column(String(7), nullable=False)
     status: Mapped[str] = mapped_column(String(32), nullable=False)
+    revision: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
 
 
 class UpdateLog(Base):
     __tablename__ = "update_logs"
+    __table_args__ = (Index("ix_update_logs_workspace_revision", "workspace_id", "revision", "id"),)
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=new_id)
     workspace_id: Mapped[str] = mapped_column(String(36), ForeignKey("workspaces.id"), index=True, nullable=False)
-    idea_id: Mapped[str] = mapped_column(String(36), ForeignKey("ideas.id"), index=True, nullable=False)
+    idea_id: Mapped[str] = mapped_column(String(36), ForeignKey("ideas.id", ondelete="CASCADE"), index=True, nullable=False)
     source: Mapped[str] = mapped_column(String(32), nullable=False)
     title: Mapped[str] = mapped_column(String(255), nullable=False)
-    body_md: Mapped[str] = mapped_column(Text, nullable=False)
+    # SHA-256 of the markdown body, stored once in report_bodies (see app/bodies.py).
+    body_hash: Mapped[str] = mapped_column(String(64), index=True, nullable=False)
     ai_summary: Mapped[str | None] = mapped_column(Text, nullable=True)
     ai_tags: Mapped[list[str]] = mapped_column(JSON, default=list, nullable=False)
     ai_risk_flags: Mapped[list[str]] = mapped_column(JSON, default=list, nullable=False)
+    revision: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+    checklist_items: Mapped[list[ChecklistItem]] = relationship(
+        back_populates="log", cascade="all,delete-orphan", order_by="ChecklistItem.position", passive_deletes=True
+    )
+    tag_rows: Mapped[list[UpdateLogTag]] = relationship(
+        back_populates="log", cascade="all,delete-orphan", passive_deletes=True
+    )
+    # No foreign key: blobs are shared between logs and pruned separately.
+    body: Mapped[ReportBody] = relationship(
+        primaryjoin="foreign(UpdateLog.body_hash) == ReportBody.hash", viewonly=True, lazy="select"
+    )
+
+    @property
+    def body_md(self) -> str:
+        """The markdown body, read and decompressed on first access."""
+        cached = self.__dict__.get("_body_text")
+        if cached is not None and cached[0] == self.body_hash:
+            return cached[1]
+        body = self.body
+        if body is None:
+            raise LookupError(f"update log {self.id}: report body {self.body_hash} is missing")
+        text = body.text
+        self.__dict__["_body_text"] = (self.body_hash, text)
+        return text
+
+    @body_md.setter
+    def body_md(self, text: str) -> None:
+        from .bodies import body_hash
+
+        digest = body_hash(text)
+        self.body_hash = digest
+        self.__dict__["_body_text"] = (digest, text)
+        self.__dict__["_body_pending"] = (digest, text)  # stored by the flush hook
+
+
+class ReportBody(Base):
+    """A distinct update log body, compressed and keyed by the SHA-256 of its text."""
+
+    __tablename__ = "report_bodies"
+
+    hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    codec: Mapped[str] = mapped_column(String(8), nullable=False)  # raw | zlib | zstd
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    size: Mapped[int] = mapped_column(Integer, nullable=False)  # characters, uncompressed
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+    @property
+    def text(self) -> str:
+        from .bodies import decode
+
+        return decode(self.codec, self.data)
+
+
+class ChecklistItem(Base):
+    """A `- [x]` / `- [/]` / `- [ ]` line of an update log, extracted at ingest time.
+
+    `report_week` (ISO, `2026-W03`) and `report_month` (`2026-01`) are stored next to
+    `report_date` so per-period counts are plain indexed GROUP BYs on every dialect.
+    """
+
+    __tablename__ = "checklist_items"
+    __table_args__ = (
+        Index("ix_checklist_items_workspace_state_date", "workspace_id", "state", "report_date"),
+        Index("ix_checklist_items_workspace_idea_date", "workspace_id", "idea_id", "report_date"),
+    )
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=new_id)
+    workspace_id: Mapped[str] = mapped_column(String(36), ForeignKey("workspaces.id"), nullable=False)
+    log_id: Mapped[str] = mapped_column(String(36), ForeignKey("update_logs.id", ondelete="CASCADE"), index=True, nullable=False)
+    idea_id: Mapped[str] = mapped_column(String(36), ForeignKey("ideas.id", ondelete="CASCADE"), nullable=False)
+    position: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    state: Mapped[str] = mapped_column(String(16), nullable=False)
+    text: Mapped[str] = mapped_column(Text, nullable=False)
+    report_date: Mapped[date] = mapped_column(Date, nullable=False)
+    report_week: Mapped[str] = mapped_column(String(8), nullable=False)
+    report_month: Mapped[str] = mapped_column(String(7), nullable=False)
+
+    log: Mapped[UpdateLog] = relationship(back_populates="checklist_items")
+
+
+class UpdateLogTag(Base):
+    """One row per (update log, tag): the indexed form of `UpdateLog.ai_tags`."""
+
+    __tablename__ = "update_log_tags"
+    __table_args__ = (
+        Index("ix_update_log_tags_workspace_tag_date", "workspace_id", "tag", "report_date"),
+        Index("ix_update_log_tags_workspace_idea_date", "workspace_id", "idea_id", "report_date"),
+    )
+
+    log_id: Mapped[str] = mapped_column(String(36), ForeignKey("update_logs.id", ondelete="CASCADE"), primary_key=True)
+    tag: Mapped[str] = mapped_column(String(64), primary_key=True)
+    workspace_id: Mapped[str] = mapped_column(String(36), ForeignKey("workspaces.id"), nullable=False)
+    idea_id: Mapped[str] = mapped_column(String(36), ForeignKey("ideas.id", ondelete="CASCADE"), nullable=False)
+    report_date: Mapped[date] = mapped_column(Date, nullable=False)
+    report_week: Mapped[str] = mapped_column(String(8), nullable=False)
+    report_month: Mapped[str] = mapped_column(String(7), nullable=False)
+
+    log: Mapped[UpdateLog] = relationship(back_populates="tag_rows")
+
+
+class Tombstone(Base):
+    """Marker left behind by a deleted row so delta sync can report the deletion."""
+
+    __tablename__ = "tombstones"
+    __table_args__ = (Index("ix_tombstones_workspace_revision", "workspace_id", "revision", "id"),)
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=new_id)
+    workspace_id: Mapped[str] = mapped_column(String(36), ForeignKey("workspaces.id"), nullable=False)
+    entity_type: Mapped[str] = mapped_column(String(32), nullable=False)
+    entity_id: Mapped[str] = mapped_column(String(36), nullable=False)
+    revision: Mapped[int] = mapped_column(Integer, nullable=False)
+    deleted_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class AIUsage(Base):
+    """One AI provider call: tokens, estimated cost and latency."""
+
+    __tablename__ = "ai_usage"
+    __table_args__ = (Index("ix_ai_usage_month_created", "month", "created_at"),)
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=new_id)
+    month: Mapped[str] = mapped_column(String(7), nullable=False)
+    provider: Mapped[str] = mapped_column(String(32), nullable=False)
+    model: Mapped[str] = mapped_column(String(64), nullable=False)
+    operation: Mapped[str] = mapped_column(String(32), nullable=False)
+    outcome: Mapped[str] = mapped_column(String(32), nullable=False)
+    input_tokens: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    output_tokens: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    cost_usd: Mapped[float] = mapped_column(Float, default=0.0, nullable=False)
+    latency_ms: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class Job(Base):
+    """Durable background job (see app/jobs.py)."""
+
+    __tablename__ = "jobs"
+    __table_args__ = (Index("ix_jobs_status_run_after", "status", "run_after"),)
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=new_id)
+    workspace_id: Mapped[str] = mapped_column(String(36), ForeignKey("workspaces.id"), index=True, nullable=False)
+    kind: Mapped[str] = mapped_column(String(64), nullable=False)
+    status: Mapped[str] = mapped_column(String(16), default="queued", nullable=False)
+    payload: Mapped[dict] = mapped_column(JSON, default=dict, nullable=False)
+    result: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    max_attempts: Mapped[int] = mapped_column(Integer, default=3, nullable=False)
+    progress_current: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    progress_total: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    progress_message: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    run_after: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    locked_by: Mapped[str | None] = mapped_column(String(128), nullable=True)
+    locked_until: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class SummaryChunk(Base):
+    """Cached AI summary of a report section (or whole report), keyed by content hash."""
+
+    __tablename__ = "summary_chunks"
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    model: Mapped[str] = mapped_column(String(64), nullable=False)
+    summary: Mapped[str] = mapped_column(Text, nullable=False)
+    tags: Mapped[list[str]] = mapped_column(JSON, default=list, nullable=False)
+    input_tokens: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    output_tokens: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ActivityDaily(Base):
+    """Per (workspace, idea, day) count of update logs and completed checklist items.
+
+    Maintained incrementally by app/activity.py as logs and items are written or deleted.
+    """
+
+    __tablename__ = "activity_daily"
+    __table_args__ = (Index("ix_activity_daily_workspace_day", "workspace_id", "day"),)
+
+    workspace_id: Mapped[str] = mapped_column(String(36), ForeignKey("workspaces.id"), primary_key=True)
+    idea_id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    log_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    done_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+
+class WatchedFile(Base):
+    """Report file seen by the watcher: the stat it had when last ingested (restart checkpoint)."""
+
+    __tablename__ = "watched_files"
+
+    path: Mapped[str] = mapped_column(String(512), primary_key=True)
+    idea_id: Mapped[str] = mapped_column(ForeignKey("ideas.id", ondelete="CASCADE"), index=True, nullable=False)
+    mtime_ns: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    log_id: Mapped[str | None] = mapped_column(String(36), nullable=True)
+    ingested_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class BootstrapStep(Base):
+    """Startup step that has been applied, keyed by a fingerprint of what it depends on."""
+
+    __tablename__ = "bootstrap_steps"
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    fingerprint: Mapped[str] = mapped_column(String(64), nullable=False)
+    duration_ms: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    applied_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
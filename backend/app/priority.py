@@ -0,0 +1,97 @@
+﻿from __future__ import annotations
+
+import hashlib
+import json
+
+from sqlalchemy import event, inspect, select, update
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .models import Idea, Task
+from .timeline import month_index
+
+INPUT_KEYS = ("impact", "effort", "risk", "urgency")
+# Task columns its score is computed from (besides its idea's inputs).
+TASK_SCORE_FIELDS = frozenset({"idea_id", "importance", "due_month"})
+
+
+def _inputs_part(inputs: dict | None) -> float:
+    weights = settings.priority_weights
+    inputs = inputs or {}
+    return sum(weights.get(key, 0.0) * float(inputs.get(key) or 0) for key in INPUT_KEYS)
+
+
+def _due_part(month: str) -> float:
+    # Linear in the due month: every score moves by the same amount as months pass, so the
+    # ranking never goes stale and the stored column needs no periodic refresh.
+    due = month_index(month)
+    epoch = month_index(settings.priority_epoch)
+    if due is None or epoch is None:
+        return 0.0
+    return -settings.priority_due_weight * (due - epoch)
+
+
+def idea_score(idea: Idea) -> float:
+    return round(_inputs_part(idea.priority_inputs) + _due_part(idea.target_month), 4)
+
+
+def task_score(task: Task, idea_inputs: dict | None) -> float:
+    importance = settings.priority_weights.get("importance", 0.0) * (task.importance or 0)
+    return round(_inputs_part(idea_inputs) + importance + _due_part(task.due_month), 4)
+
+
+def formula_fingerprint() -> str:
+    material = json.dumps(
+        [settings.priority_weights, settings.priority_due_weight, settings.priority_epoch], sort_keys=True
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+@event.listens_for(Session, "before_flush")
+def _score_on_flush(session: Session, flush_context, instances) -> None:
+    changed = [
+        obj for obj in (*session.new, *session.dirty) if isinstance(obj, (Idea, Task)) and obj not in session.deleted
+    ]
+    if not changed:
+        return
+    with session.no_autoflush:
+        rescored_ideas: dict[str, dict] = {}
+        for obj in changed:
+            if isinstance(obj, Idea):
+                obj.priority_score = idea_score(obj)
+                if obj not in session.new and inspect(obj).attrs.priority_inputs.history.has_changes():
+                    rescored_ideas[obj.id] = obj.priority_inputs
+        for obj in changed:
+            if isinstance(obj, Task):
+                idea = session.get(Idea, obj.idea_id)
+                obj.priority_score = task_score(obj, idea.priority_inputs if idea else None)
+        # Tasks inherit their idea's inputs: an idea edit re-scores its tasks in the same flush.
+        for idea_id, inputs in rescored_ideas.items():
+            for task in session.scalars(select(Task).where(Task.idea_id == idea_id)):
+                task.priority_score = task_score(task, inputs)
+
+
+def rescore(db: Session, batch_size: int = 1000) -> int:
+    """Recompute every stored score (after a formula change). Returns rows updated.
+
+    Uses bulk UPDATEs by primary key, so rows keep their revision: this is not a user edit.
+    """
+    inputs_by_idea: dict[str, dict] = {}
+    updated = 0
+    rows = []
+    for idea in db.scalars(select(Idea)):
+        inputs_by_idea[idea.id] = idea.priority_inputs
+        rows.append({"id": idea.id, "priority_score": idea_score(idea)})
+    for start in range(0, len(rows), batch_size):
+        db.execute(update(Idea), rows[start : start + batch_size])
+    updated += len(rows)
+    db.expunge_all()
+    rows = [
+        {"id": task.id, "priority_score": task_score(task, inputs_by_idea.get(task.idea_id))}
+        for task in db.scalars(select(Task))
+    ]
+    for start in range(0, len(rows), batch_size):
+        db.execute(update(Task), rows[start : start + batch_size])
+    updated += len(rows)
+    db.commit()
+    return updated
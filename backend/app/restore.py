@@ -0,0 +1,400 @@
+﻿from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Iterator
+from datetime import date, datetime
+import gzip
+import io
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+from sqlalchemy import Table, delete, insert, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from . import activity, bodies, changes, priority, similarity
+from .config import settings
+from .models import ActivityDaily, ChecklistItem, Deliverable, Idea, Task, Tombstone, UpdateLog, UpdateLogTag, new_id
+from .services import _report_periods, normalize_tag
+from .tagger import parse_checklist
+
+SNAPSHOT_VERSION = 1
+# Snapshot sections in restore order: every child table comes after ideas.
+SECTIONS: dict[str, type] = {"ideas": Idea, "tasks": Task, "deliverables": Deliverable, "update_logs": UpdateLog}
+MODES = ("replace", "merge")
+
+
+class SnapshotError(ValueError):
+    """The file is not a workspace export this version can read."""
+
+
+def _datetime(value: str | None) -> datetime | None:
+    if value is None:
+        return None
+    # Exports are naive UTC; a trailing Z (other serializers) is dropped, not converted.
+    return datetime.fromisoformat(value.removesuffix("Z"))
+
+
+def read_snapshot(path: Path) -> Iterator[tuple[str, dict]]:
+    """(section, row) pairs from a `/export/workspace` JSON file or its NDJSON stream form.
+
+    NDJSON is read line by line, so the file is never held in memory; the JSON form is
+    loaded whole. Either may be gzip-compressed.
+    """
+    with open(path, "rb") as probe:
+        compressed = probe.read(2) == b"\x1f\x8b"
+    opener = gzip.open if compressed else open
+    with opener(path, "rt", encoding="utf-8") as handle:
+        first = handle.readline()
+        try:
+            head = json.loads(first)
+        except json.JSONDecodeError:
+            head = None  # pretty-printed JSON spans lines
+        if isinstance(head, dict) and ("snapshot" in head or "table" in head):
+            lines = [first] if "table" in head else []
+            for number, line in enumerate(_chain(lines, handle), start=1):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record.get("table") not in SECTIONS:
+                    raise SnapshotError(f"line {number}: unknown table {record.get('table')!r}")
+                yield record["table"], record["row"]
+            return
+        if head is None:
+            handle.seek(0)
+            head = json.load(handle)
+    if not isinstance(head, dict) or not any(section in head for section in SECTIONS):
+        raise SnapshotError("not a workspace export (expected ideas / tasks / deliverables / update_logs)")
+    for section in SECTIONS:
+        for row in head.get(section) or []:
+            yield section, row
+
+
+def _chain(first: list[str], rest: Iterable[str]) -> Iterator[str]:
+    yield from first
+    yield from rest
+
+
+def _idea_row(row: dict, workspace_id: str, revision: int) -> dict:
+    idea = {
+        "id": row["id"],
+        "workspace_id": workspace_id,
+        "title": row["title"],
+        "description": row.get("description") or "",
+        "status": row.get("status") or "planned",
+        "main_topic_flag": bool(row.get("main_topic_flag")),
+        "start_month": row["start_month"],
+        "target_month": row["target_month"],
+        "priority_inputs": row.get("priority_inputs") or {},
+        "revision": revision,
+        "created_at": _datetime(row["created_at"]),
+        "updated_at": _datetime(row.get("updated_at") or row["created_at"]),
+        "deleted_at": None,
+    }
+    idea["priority_score"] = priority.idea_score(SimpleNamespace(**idea))
+    return idea
+
+
+def _task_row(row: dict, workspace_id: str, revision: int, idea_inputs: dict) -> dict:
+    task = {
+        "id": row["id"],
+        "workspace_id": workspace_id,
+        "idea_id": row["idea_id"],
+        "phase_id": row.get("phase_id"),
+        "title": row["title"],
+        "status": row.get("status") or "planned",
+        "importance": row.get("importance") or 3,
+        "start_month": row["start_month"],
+        "end_month": row["end_month"],
+        "due_month": row["due_month"],
+        "dependencies": row.get("dependencies") or [],
+        "sort_order": row.get("sort_order") or 0,
+        "revision": revision,
+        "updated_at": _datetime(row["updated_at"]),
+    }
+    task["priority_score"] = priority.task_score(SimpleNamespace(**task), idea_inputs)
+    return task
+
+
+def _deliverable_row(row: dict, workspace_id: str, revision: int) -> dict:
+    return {
+        "id": row["id"],
+        "workspace_id": workspace_id,
+        "idea_id": row["idea_id"],
+        "title": row["title"],
+        "type": row["type"],
+        "due_month": row["due_month"],
+        "status": row.get("status") or "planned",
+        "revision": revision,
+    }
+
+
+def _log_row(row: dict, workspace_id: str, revision: int) -> dict:
+    return {
+        "id": row["id"],
+        "workspace_id": workspace_id,
+        "idea_id": row["idea_id"],
+        "source": row["source"],
+        "title": row["title"],
+        "body_hash": bodies.body_hash(row["body_md"]),
+        "ai_summary": row.get("ai_summary"),
+        "ai_tags": row.get("ai_tags") or [],
+        "ai_risk_flags": row.get("ai_risk_flags") or [],
+        "revision": revision,
+        "created_at": _datetime(row["created_at"]),
+    }
+
+
+def _derived_rows(log: dict, body_md: str) -> tuple[list[dict], list[dict]]:
+    """Checklist items and tag index rows of a restored log, as build_update_log derives them."""
+    periods = _report_periods(SimpleNamespace(created_at=log["created_at"]))
+    owner = {"workspace_id": log["workspace_id"], "log_id": log["id"], "idea_id": log["idea_id"], **periods}
+    items = [
+        {"id": new_id(), "position": position, "state": item.state, "text": item.text, **owner}
+        for position, item in enumerate(parse_checklist(body_md))
+    ]
+    tags = dict.fromkeys(normalize_tag(tag) for tag in log["ai_tags"])
+    return items, [{"tag": tag, **owner} for tag in tags if tag]
+
+
+def _copy_value(value) -> str:
+    # PostgreSQL COPY text format: tab-separated, \N for NULL, backslash escapes.
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        value = value.isoformat(sep=" ")
+    elif isinstance(value, date):
+        value = value.isoformat()
+    else:
+        value = str(value)
+    return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def _copy_rows(connection: Connection, table_name: str, columns: list[str], rows: list[tuple]) -> None:
+    data = "".join("\t".join(_copy_value(value) for value in row) + "\n" for row in rows)
+    quote = connection.dialect.identifier_preparer.quote
+    sql = f"COPY {table_name} ({', '.join(quote(column) for column in columns)}) FROM STDIN"
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        if hasattr(cursor, "copy"):  # psycopg 3
+            with cursor.copy(sql) as copy:
+                copy.write(data)
+        else:  # psycopg2
+            cursor.copy_expert(sql, io.StringIO(data))
+    finally:
+        cursor.close()
+
+
+class _Writer:
+    """Upserts batches of rows by primary key with the fastest path the database offers.
+
+    PostgreSQL: COPY FROM STDIN into a session temp table, then one INSERT ... SELECT ...
+    ON CONFLICT DO UPDATE. SQLite (and PostgreSQL without COPY): one driver-level executemany
+    of a prebuilt INSERT ... ON CONFLICT DO UPDATE; values go through the column types' own
+    bind processors, so they are stored exactly as ORM writes store them. Anything else:
+    UPDATE by key, INSERT when nothing matched, row by row.
+    """
+
+    def __init__(self, connection: Connection, use_copy: bool) -> None:
+        self.dialect = connection.dialect
+        self.use_copy = use_copy and self.dialect.name == "postgresql"
+        self._statements: dict[str, tuple[list[str], list, str]] = {}
+
+    def _prepare(self, table: Table) -> tuple[list[str], list, str]:
+        prepared = self._statements.get(table.name)
+        if prepared is not None:
+            return prepared
+        quote = self.dialect.identifier_preparer.quote
+        columns = [column.name for column in table.columns]
+        processors = [column.type._cached_bind_processor(self.dialect) for column in table.columns]
+        keys = [column.name for column in table.primary_key.columns]
+        updates = ", ".join(f"{quote(name)} = excluded.{quote(name)}" for name in columns if name not in keys)
+        column_list = ", ".join(quote(name) for name in columns)
+        if self.use_copy:
+            staging = f"restore_{table.name}"
+            source = f"SELECT {column_list} FROM {staging}"
+        else:
+            marker = "?" if self.dialect.paramstyle == "qmark" else "%s"
+            source = f"VALUES ({', '.join([marker] * len(columns))})"
+        sql = f"INSERT INTO {table.name} ({column_list}) {source} ON CONFLICT ({', '.join(map(quote, keys))}) DO UPDATE SET {updates}"
+        prepared = self._statements[table.name] = (columns, processors, sql)
+        return prepared
+
+    def write(self, connection: Connection, table: Table, rows: list[dict]) -> None:
+        if not rows:
+            return
+        if self.dialect.name not in ("sqlite", "postgresql"):
+            keys = [column.name for column in table.primary_key.columns]
+            for row in rows:
+                key = [table.c[name] == row[name] for name in keys]
+                if not connection.execute(update(table).where(*key).values(**row)).rowcount:
+                    connection.execute(insert(table).values(**row))
+            return
+        columns, processors, sql = self._prepare(table)
+        params = [
+            tuple(row[name] if process is None else process(row[name]) for name, process in zip(columns, processors))
+            for row in rows
+        ]
+        if self.use_copy:
+            staging = f"restore_{table.name}"
+            connection.exec_driver_sql(
+                f"CREATE TEMP TABLE IF NOT EXISTS {staging} (LIKE {table.name} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+            )
+            _copy_rows(connection, staging, columns, params)
+            connection.exec_driver_sql(sql)
+            connection.exec_driver_sql(f"TRUNCATE {staging}")
+        else:
+            connection.exec_driver_sql(sql, params)
+
+
+def _clear_workspace(db: Session, workspace_id: str, batch_size: int) -> int:
+    """Replace mode: tombstone and delete every idea, task, deliverable and log of the workspace."""
+    revision = changes.allocate_revision(db.connection(), workspace_id)
+    now = datetime.utcnow()
+    removed = 0
+    for model in (UpdateLog, Task, Deliverable, Idea):
+        ids = db.scalars(select(model.id).where(model.workspace_id == workspace_id)).all()
+        entity_type = changes.TRACKED_ENTITIES[model]
+        for start in range(0, len(ids), batch_size):
+            db.execute(
+                insert(Tombstone),
+                [
+                    {
+                        "id": new_id(),
+                        "workspace_id": workspace_id,
+                        "entity_type": entity_type,
+                        "entity_id": entity_id,
+                        "revision": revision,
+                        "deleted_at": now,
+                    }
+                    for entity_id in ids[start : start + batch_size]
+                ],
+            )
+        # Checklist items, tags and watched files go with their parents (ON DELETE CASCADE).
+        db.execute(delete(model).where(model.workspace_id == workspace_id).execution_options(synchronize_session=False))
+        removed += len(ids)
+    db.execute(delete(ActivityDaily).where(ActivityDaily.workspace_id == workspace_id))
+    db.commit()
+    return removed
+
+
+def restore_workspace(
+    db: Session,
+    workspace_id: str,
+    records: Iterable[tuple[str, dict]],
+    mode: str = "merge",
+    batch_size: int = 5000,
+    progress: Callable[..., None] | None = None,
+) -> dict[str, int]:
+    """Load export rows into `workspace_id`, keeping their ids. Returns counts per table.
+
+    `replace` first removes the workspace's ideas, tasks, deliverables and logs (with
+    tombstones for sync clients); `merge` upserts over what is there. Rows are written in
+    set-based batches of `batch_size` with one commit each, all stamped with one new
+    revision. Rows whose id belongs to another workspace, deleted ideas still waiting for their
+    purge, and children of ideas that are not in this workspace, are skipped. Derived data (bodies, checklist items, tags, priority
+    scores, the activity rollup and the similarity index) is rebuilt for the restored rows.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown restore mode: {mode}")
+    counts = {section: 0 for section in SECTIONS} | {"skipped": 0}
+    if mode == "replace":
+        counts["removed"] = _clear_workspace(db, workspace_id, batch_size)
+    revision = changes.allocate_revision(db.connection(), workspace_id)
+    db.commit()
+    writer = _Writer(db.connection(), settings.restore_use_copy)
+    # Ideas children may attach to, with the inputs their task scores are derived from.
+    inputs: dict[str, dict] = {
+        idea_id: idea_inputs
+        for idea_id, idea_inputs in db.execute(
+            select(Idea.id, Idea.priority_inputs).where(Idea.workspace_id == workspace_id, Idea.deleted_at.is_(None))
+        )
+    }
+    # Deleted ideas waiting for their purge job stay deleted: a merged copy would be removed by
+    # that purge, children and all. Their children are skipped with them (not in `inputs`).
+    deleted = set(
+        db.scalars(select(Idea.id).where(Idea.workspace_id == workspace_id, Idea.deleted_at.is_not(None)))
+    )
+    pending: list[dict] = []
+    section: str | None = None
+    restored = 0
+
+    def flush() -> None:
+        nonlocal restored
+        if not pending:
+            return
+        model = SECTIONS[section]
+        ids = [row["id"] for row in pending]
+        foreign = set(db.scalars(select(model.id).where(model.id.in_(ids), model.workspace_id != workspace_id)))
+        rows = [row for row in pending if row["id"] not in foreign]
+        counts["skipped"] += len(pending) - len(rows)
+        connection = db.connection()
+        if model is UpdateLog:
+            _write_logs(db, connection, writer, rows)
+        else:
+            writer.write(connection, model.__table__, rows)
+        if model is Idea:
+            inputs.update((row["id"], row["priority_inputs"]) for row in rows)
+        db.commit()
+        counts[section] += len(rows)
+        restored += len(pending)
+        pending.clear()
+        if progress is not None:
+            progress(restored, message=f"restoring {section}")
+
+    for name, raw in records:
+        if name != section:
+            flush()
+            section = name
+        if name == "ideas":
+            if raw["id"] in deleted:
+                counts["skipped"] += 1
+            else:
+                pending.append(_idea_row(raw, workspace_id, revision))
+        elif raw.get("idea_id") not in inputs:
+            counts["skipped"] += 1
+        elif name == "tasks":
+            pending.append(_task_row(raw, workspace_id, revision, inputs[raw["idea_id"]]))
+        elif name == "deliverables":
+            pending.append(_deliverable_row(raw, workspace_id, revision))
+        else:
+            row = _log_row(raw, workspace_id, revision)
+            row["body_md"] = raw["body_md"]
+            pending.append(row)
+        if len(pending) >= batch_size:
+            flush()
+    flush()
+
+    activity.rebuild(db, workspace_id)
+    if mode == "replace":
+        counts["report_bodies_pruned"] = bodies.prune(db)
+    if progress is not None:
+        progress(restored, message="restored", force=True)
+    return counts
+
+
+def _write_logs(db: Session, connection: Connection, writer: _Writer, rows: list[dict]) -> None:
+    texts: dict[str, str] = {}
+    items: list[dict] = []
+    tags: list[dict] = []
+    docs: list[tuple[str, str, str]] = []
+    for row in rows:
+        body_md = row.pop("body_md")
+        texts[row["body_hash"]] = body_md
+        log_items, log_tags = _derived_rows(row, body_md)
+        items.extend(log_items)
+        tags.extend(log_tags)
+        docs.append((row["id"], row["workspace_id"], similarity.log_text(SimpleNamespace(**row, body_md=body_md))))
+    bodies.store(connection, texts)
+    writer.write(connection, UpdateLog.__table__, rows)
+    # Merged logs may have had other items and tags: re-derive them from the restored body.
+    ids = [row["id"] for row in rows]
+    connection.execute(delete(ChecklistItem.__table__).where(ChecklistItem.__table__.c.log_id.in_(ids)))
+    connection.execute(delete(UpdateLogTag.__table__).where(UpdateLogTag.__table__.c.log_id.in_(ids)))
+    writer.write(connection, ChecklistItem.__table__, items)
+    writer.write(connection, UpdateLogTag.__table__, tags)
+    if settings.similarity_enabled:
+        # Indexed at commit, like rows written through the ORM.
+        db.info.setdefault(similarity._PENDING_KEY, []).extend(docs)
@@ -1,4 +1,4 @@
-﻿from datetime import datetime
+﻿from datetime import date, datetime
 
 from pydantic import BaseModel, Field
 
@@ -29,6 +29,8 @@ class IdeaCreate(IdeaBase):
 class IdeaRead(IdeaBase):
     id: str
     workspace_id: str
+    priority_score: float = 0.0
+    revision: int = 0
     created_at: datetime
     updated_at: datetime
 
@@ -62,6 +64,8 @@ class TaskRead(TaskBase):
     workspace_id: str
     idea_id: str
     sort_order: int = 0
+    priority_score: float = 0.0
+    revision: int = 0
     updated_at: datetime
 
 
@@ -89,6 +93,7 @@ class DeliverableRead(DeliverableBase):
     id: str
     workspace_id: str
     idea_id: str
+    revision: int = 0
 
 
 class DeliverableCreate(DeliverableBase):
@@ -127,9 +132,114 @@ class UpdateLogRead(BaseModel):
     ai_summary: str | None = None
     ai_tags: list[str] = Field(default_factory=list)
     ai_risk_flags: list[str] = Field(default_factory=list)
+    revision: int = 0
     created_at: datetime
 
 
+class SimilarUpdateLog(BaseModel):
+    id: str
+    idea_id: str
+    title: str
+    ai_summary: str | None = None
+    created_at: datetime
+    score: float
+
+
+class UploadFileResult(BaseModel):
+    name: str
+    status: str  # imported | duplicate | skipped | error
+    log_id: str | None = None
+    detail: str | None = None
+
+
+class UploadIngestResponse(BaseModel):
+    imported: int
+    duplicates: int
+    skipped: int
+    errors: int
+    results: list[UploadFileResult]
+
+
+class ChecklistItemRead(BaseModel):
+    id: str
+    log_id: str
+    idea_id: str
+    position: int
+    state: str
+    text: str
+    report_date: date
+
+
+class ChecklistCompletionBucket(BaseModel):
+    period: str
+    done: int = 0
+    in_progress: int = 0
+    todo: int = 0
+
+
+class TagFacet(BaseModel):
+    tag: str
+    count: int
+    idea_id: str | None = None
+    period: str | None = None
+
+
+class TimelineBar(BaseModel):
+    start: int
+    end: int
+    continues_before: bool = False
+    continues_after: bool = False
+
+
+class TimelineTask(BaseModel):
+    id: str
+    title: str
+    status: str
+    importance: int
+    bar: TimelineBar | None = None
+    due: int | None = None
+    delayed: bool = False
+
+
+class TimelineIdea(BaseModel):
+    id: str
+    title: str
+    status: str
+    bar: TimelineBar | None = None
+    tasks: list[TimelineTask]
+
+
+class TimelineBucket(BaseModel):
+    month: str
+    active: int = 0
+    due: int = 0
+    delayed: int = 0
+
+
+class TimelineEdge(BaseModel):
+    from_task_id: str
+    to_task_id: str
+    conflict: bool = False
+
+
+class TimelineResponse(BaseModel):
+    revision: int
+    start: str
+    end: str
+    months: list[str]
+    current: int | None = None
+    buckets: list[TimelineBucket]
+    ideas: list[TimelineIdea]
+    edges: list[TimelineEdge]
+
+
+class ActivityDay(BaseModel):
+    day: date
+    logs: int = 0
+    done: int = 0
+    idea_id: str | None = None
+
+
 class DashboardOverview(BaseModel):
     total_ideas: int
     idea_status_counts: dict[str, int]
@@ -154,14 +264,21 @@ class UserProfile(BaseModel):
     workspace_id: str
 
 
-class SeedImportResponse(BaseModel):
-    imported_ideas: int
-    imported_tasks: int
-    imported_deliverables: int
-
-
-class BulkIngestResponse(BaseModel):
-    imported_logs: int
+class JobRead(BaseModel):
+    id: str
+    kind: str
+    status: str
+    attempts: int
+    max_attempts: int
+    progress_current: int
+    progress_total: int | None = None
+    progress_message: str | None = None
+    result: dict | None = None
+    error: str | None = None
+    run_after: datetime
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
 
 
 class IdeaProgress(BaseModel):
@@ -193,9 +310,54 @@ class WorkspaceExportResponse(BaseModel):
     update_logs: list[UpdateLogRead]
 
 
+class DeletedRecord(BaseModel):
+    type: str
+    id: str
+    revision: int
+    deleted_at: datetime
+
+
+class ChangesResponse(BaseModel):
+    since: str
+    next_cursor: str
+    has_more: bool
+    revision: int
+    ideas: list[IdeaRead]
+    tasks: list[TaskRead]
+    deliverables: list[DeliverableRead]
+    update_logs: list[UpdateLogRead]
+    deleted: list[DeletedRecord]
+
+
 class AISettingsResponse(BaseModel):
     configured: bool
     model: str
     status: str
     message: str
     monthly_budget_usd: float
+    provider: str = "openai"
+    circuit_state: str = "closed"
+    checked_at: datetime | None = None
+    probe_latency_ms: float | None = None
+
+
+class AIUsageBucket(BaseModel):
+    key: str
+    calls: int
+    input_tokens: int
+    output_tokens: int
+    cost_usd: float
+    avg_latency_ms: float
+
+
+class AIUsageReport(BaseModel):
+    month: str
+    budget_usd: float
+    spent_usd: float
+    remaining_usd: float
+    degradation: str
+    concurrency_limit: int
+    totals: AIUsageBucket
+    by_model: list[AIUsageBucket]
+    by_outcome: list[AIUsageBucket]
+    by_day: list[AIUsageBucket]
@@ -3,8 +3,6 @@ import hashlib
 import hmac
 import os
 
-from jose import JWTError, jwt
-
 from .config import settings
 
 
@@ -32,12 +30,17 @@ def verify_password(password: str, password_hash: str) -> bool:
 
 
 def create_access_token(subject: str) -> str:
+    # jose (and its crypto backends) is imported on first use; startup warmup preloads it.
+    from jose import jwt
+
     expire = datetime.now(timezone.utc) + timedelta(minutes=settings.jwt_expire_minutes)
     payload = {"sub": subject, "exp": expire}
     return jwt.encode(payload, settings.jwt_secret, algorithm=settings.jwt_algorithm)
 
 
 def decode_access_token(token: str) -> str | None:
+    from jose import JWTError, jwt
+
     try:
         payload = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
         sub = payload.get("sub")
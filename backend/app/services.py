@@ -1,112 +1,216 @@
 ﻿from __future__ import annotations
 
-from datetime import datetime, timedelta
+from collections.abc import Callable, Iterable
+from datetime import date, datetime, timedelta
 from pathlib import Path
 import json
 import re
+import time
 
-from sqlalchemy import func, select
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session, selectinload
 
+from . import activity, ai, bodies, changes, metrics, priority, similarity, summarizer, tagger, usage
 from .config import settings
 from .enums import DeliverableStatus, ItemStatus
-from .models import Deliverable, Idea, Task, UpdateLog, User, Workspace, WorkspaceMember
+from .instrumentation import timed
+from .models import (
+    ActivityDaily,
+    ChecklistItem,
+    Deliverable,
+    Idea,
+    Task,
+    Tombstone,
+    UpdateLog,
+    UpdateLogTag,
+    User,
+    Workspace,
+    WorkspaceMember,
+    live_idea_ids,
+    new_id,
+)
 from .schemas import PriorityInputs
 from .security import hash_password, verify_password
+from .uploads import UploadEntry
 
 
 def _local_summarize_markdown(body_md: str) -> tuple[str, list[str]]:
-    lines = [line.strip() for line in body_md.splitlines() if line.strip()]
-
-    # Collect completed and in-progress items, skip generic section headings
-    completed: list[str] = []
-    in_progress: list[str] = []
-    for line in lines:
-        if line.startswith("- [x]"):
-            text = line[5:].strip().strip("*").strip()
-            if len(text.split()) >= 2 or len(text) > 20:
-                completed.append(text)
-        elif line.startswith("- [/]") or line.startswith("- [ ]"):
-            text = line[5:].strip().strip("*").strip()
-            if len(text.split()) >= 2 or len(text) > 20:
-                in_progress.append(text)
-
-    parts: list[str] = []
-    if completed:
-        items = "; ".join(completed[:4])
-        parts.append(f"Completed ({len(completed)}): {items}")
-    if in_progress:
-        items = "; ".join(in_progress[:3])
-        parts.append(f"In progress: {items}")
-
-    if parts:
-        summary = " | ".join(parts)
-    else:
-        bullet_lines = [line for line in lines if line.startswith("- ")][:5]
-        summary = "\n".join(bullet_lines) if bullet_lines else "\n".join(lines[:5])
-
-    tags: list[str] = []
-    lowered = body_md.lower()
-    if "rtl" in lowered:
-        tags.append("rtl")
-    if "simulation" in lowered:
-        tags.append("simulation")
-    if "debug" in lowered:
-        tags.append("debug")
-    if "vivado" in lowered:
-        tags.append("vivado")
-    if "matlab" in lowered:
-        tags.append("matlab")
-    return summary[:1200], tags[:5]
+    return tagger.summarize(body_md)
 
 
-def summarize_markdown(body_md: str) -> tuple[str, list[str]]:
-    if not settings.openai_api_key:
-        return _local_summarize_markdown(body_md)
+def _local_tags(body_md: str) -> list[str]:
+    return tagger.tagger.tags(body_md)
 
-    try:
-        from openai import OpenAI
 
-        client = OpenAI(api_key=settings.openai_api_key)
-        response = client.responses.create(
-            model=settings.openai_model,
-            input=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You summarize research logs. Return plain text only.\n"
-                        "Format:\n"
-                        "SUMMARY:\n"
-                        "- line 1\n- line 2\n- line 3\n- line 4\n- line 5\n"
-                        "TAGS: tag1, tag2, tag3"
-                    ),
-                },
-                {"role": "user", "content": body_md[:15000]},
-            ],
-            max_output_tokens=300,
+def _local_fallback(body_md: str, reason: str) -> tuple[str, list[str]]:
+    metrics.record_fallback(reason)
+    started = time.perf_counter()
+    result = _local_summarize_markdown(body_md)
+    metrics.record_summarize("local", "ok", started)
+    return result
+
+
+@timed("summarize")
+def summarize_markdown(body_md: str) -> tuple[str, list[str]]:
+    provider = ai.get_provider()
+    if provider is None:
+        return _local_fallback(body_md, "disabled" if settings.ai_provider == "local" else "no_api_key")
+    budget = usage.budget_decision()
+    if budget.action == "local":
+        return _local_fallback(body_md, "budget")
+
+    started = time.perf_counter()
+    try:
+        summary, tags = summarizer.summarize(provider, body_md, budget.model, _local_tags)
+    except summarizer.EmptyOutput:
+        metrics.record_summarize(provider.name, "empty_output", started)
+        return _local_fallback(body_md, "empty_output")
+    except ai.CircuitOpenError:
+        return _local_fallback(body_md, "circuit_open")
+    except ai.RateLimited:
+        return _local_fallback(body_md, "rate_limited")
+    except ai.ProviderTimeout:
+        metrics.record_summarize(provider.name, "timeout", started)
+        return _local_fallback(body_md, "timeout")
+    except ai.ProviderError:
+        metrics.record_summarize(provider.name, "error", started)
+        return _local_fallback(body_md, "error")
+
+    metrics.record_summarize(provider.name, "ok", started)
+    return summary, tags
+
+
+def _report_periods(log: UpdateLog) -> dict:
+    """Day, ISO week and month of the report (its `created_at`), stored on derived rows."""
+    report_date = log.created_at.date()
+    year, week, _ = report_date.isocalendar()
+    return {
+        "report_date": report_date,
+        "report_week": f"{year}-W{week:02d}",
+        "report_month": report_date.strftime("%Y-%m"),
+    }
+
+
+def checklist_items_for(log: UpdateLog) -> list[ChecklistItem]:
+    periods = _report_periods(log)
+    return [
+        ChecklistItem(
+            workspace_id=log.workspace_id,
+            log_id=log.id,
+            idea_id=log.idea_id,
+            position=position,
+            state=item.state,
+            text=item.text,
+            **periods,
         )
-        output_text = (response.output_text or "").strip()
-        if not output_text:
-            return _local_summarize_markdown(body_md)
-
-        lines = [line.strip() for line in output_text.splitlines() if line.strip()]
-        summary_lines = [line for line in lines if line.startswith("- ")][:5]
-        if not summary_lines:
-            summary_lines = lines[:5]
-        summary = "\n".join(summary_lines)[:1200]
-
-        tags: list[str] = []
-        for line in lines:
-            if line.lower().startswith("tags:"):
-                raw = line.split(":", 1)[1]
-                tags = [item.strip().lower() for item in raw.split(",") if item.strip()]
-                break
-        if not tags:
-            _, tags = _local_summarize_markdown(body_md)
+        for position, item in enumerate(tagger.parse_checklist(log.body_md))
+    ]
 
-        return summary, tags[:5]
-    except Exception:
-        return _local_summarize_markdown(body_md)
+
+def normalize_tag(tag: str) -> str:
+    return tag.strip().lower()[:64]
+
+
+def tag_rows_for(log: UpdateLog) -> list[UpdateLogTag]:
+    periods = _report_periods(log)
+    tags = dict.fromkeys(normalize_tag(tag) for tag in log.ai_tags or [])
+    return [
+        UpdateLogTag(log_id=log.id, tag=tag, workspace_id=log.workspace_id, idea_id=log.idea_id, **periods)
+        for tag in tags
+        if tag
+    ]
+
+
+def build_update_log(
+    workspace_id: str,
+    idea_id: str,
+    source: str,
+    title: str,
+    body_md: str,
+    created_at: datetime | None = None,
+) -> UpdateLog:
+    """A new update log with its summary, tags, tag index and checklist rows; the caller adds and commits it."""
+    summary, tags = summarize_markdown(body_md)
+    log = UpdateLog(
+        workspace_id=workspace_id,
+        idea_id=idea_id,
+        source=source,
+        title=title,
+        body_md=body_md,
+        ai_summary=summary,
+        ai_tags=tags,
+        ai_risk_flags=[],
+        created_at=created_at or datetime.utcnow(),
+    )
+    log.checklist_items = checklist_items_for(log)
+    log.tag_rows = tag_rows_for(log)
+    return log
+
+
+def refresh_update_log(log: UpdateLog, body_md: str) -> None:
+    """Replace an existing log's body and everything derived from it (a report edited in place)."""
+    summary, tags = summarize_markdown(body_md)
+    log.body_md = body_md
+    log.ai_summary = summary
+    log.ai_tags = tags
+    log.checklist_items = checklist_items_for(log)
+    log.tag_rows = tag_rows_for(log)
+
+
+def ingest_upload_entries(
+    db: Session, workspace_id: str, idea_id: str, entries: Iterable[UploadEntry], batch_size: int = 25
+) -> list[dict]:
+    """Dedup, summarize and insert uploaded report files, committing every `batch_size` entries.
+
+    `entries` is consumed lazily, so only one batch of file bodies is in memory at a time.
+    Returns one result per entry: imported, duplicate (title already logged), skipped or error.
+    """
+    results: list[dict] = []
+    batch: list[UploadEntry] = []
+
+    def flush() -> None:
+        titles = {entry.name for entry in batch}
+        seen = set(
+            db.scalars(
+                select(UpdateLog.title).where(
+                    UpdateLog.workspace_id == workspace_id,
+                    UpdateLog.idea_id == idea_id,
+                    UpdateLog.title.in_(titles),
+                )
+            )
+        )
+        created: list[tuple[dict, UpdateLog]] = []
+        for entry in batch:
+            if entry.name in seen:
+                results.append({"name": entry.name, "status": "duplicate"})
+                continue
+            seen.add(entry.name)
+            body_md = entry.body.decode("utf-8", errors="replace")
+            log = build_update_log(
+                workspace_id, idea_id, "daily_report", entry.name, body_md, extract_report_date(entry.name)
+            )
+            db.add(log)
+            result = {"name": entry.name, "status": "imported"}
+            results.append(result)
+            created.append((result, log))
+        db.flush()
+        for result, log in created:
+            result["log_id"] = log.id
+        db.commit()
+        batch.clear()
+
+    for entry in entries:
+        if entry.error is not None:
+            results.append({"name": entry.name, "status": "error", "detail": entry.error})
+        elif entry.skipped is not None:
+            results.append({"name": entry.name, "status": "skipped", "detail": entry.skipped})
+        else:
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                flush()
+    if batch:
+        flush()
+    return results
 
 
 def extract_report_date(filename: str) -> datetime | None:
@@ -156,21 +260,17 @@ def low_activity_task_count(db: Session, workspace_id: str) -> int:
     cutoff = datetime.utcnow() - timedelta(days=14)
 
     active_tasks = db.scalars(
-        select(Task).where(Task.workspace_id == workspace_id, Task.status == ItemStatus.IN_PROGRESS.value)
+        select(Task).where(
+            Task.workspace_id == workspace_id,
+            Task.status == ItemStatus.IN_PROGRESS.value,
+            Task.idea_id.in_(live_idea_ids(workspace_id)),
+        )
     ).all()
     if not active_tasks:
         return 0
 
-    active_idea_ids = {task.idea_id for task in active_tasks}
-    recent_idea_ids = set(
-        db.scalars(
-            select(UpdateLog.idea_id)
-            .where(UpdateLog.workspace_id == workspace_id, UpdateLog.created_at >= cutoff)
-            .distinct()
-        ).all()
-    )
-
-    return sum(1 for task in active_tasks if task.idea_id in active_idea_ids and task.idea_id not in recent_idea_ids)
+    recent_idea_ids = activity.active_idea_ids(db, workspace_id, cutoff.date())
+    return sum(1 for task in active_tasks if task.idea_id not in recent_idea_ids)
 
 
 def import_seed(db: Session, workspace_id: str, seed_path: Path) -> tuple[int, int, int]:
@@ -183,7 +283,7 @@ def import_seed(db: Session, workspace_id: str, seed_path: Path) -> tuple[int, i
 
     for item in data.get("ideas", []):
         existing = db.scalar(
-            select(Idea).where(Idea.workspace_id == workspace_id, Idea.title == item["title"])
+            select(Idea).where(Idea.workspace_id == workspace_id, Idea.title == item["title"], Idea.deleted_at.is_(None))
         )
         if existing:
             idea_slug_map[item["slug"]] = existing.id
@@ -266,9 +366,19 @@ def bulk_ingest_reports(
     idea_id: str,
     reports_path: Path,
     pattern: str = "Daily_Report_2026-*.md",
+    progress: Callable[..., None] | None = None,
+    commit_every: int = 25,
 ) -> int:
+    """Ingest matching report files not yet logged for the idea.
+
+    Commits every `commit_every` files so an interrupted run (e.g. a retried job) resumes
+    where it stopped; `progress(done, total)` is called after each file.
+    """
     imported = 0
-    for report_path in sorted(reports_path.glob(pattern)):
+    report_paths = sorted(reports_path.glob(pattern))
+    for done, report_path in enumerate(report_paths, start=1):
+        if progress is not None:
+            progress(done - 1, len(report_paths))
         title = report_path.name
         exists = db.scalar(
             select(UpdateLog).where(
@@ -281,32 +391,221 @@ def bulk_ingest_reports(
             continue
 
         body_md = report_path.read_text(encoding="utf-8", errors="replace")
-        summary, tags = summarize_markdown(body_md)
-        created_at = extract_report_date(title) or datetime.utcnow()
-
-        log = UpdateLog(
-            workspace_id=workspace_id,
-            idea_id=idea_id,
-            source="daily_report",
-            title=title,
-            body_md=body_md,
-            ai_summary=summary,
-            ai_tags=tags,
-            ai_risk_flags=[],
-            created_at=created_at,
-        )
-        db.add(log)
+        db.add(build_update_log(workspace_id, idea_id, "daily_report", title, body_md, extract_report_date(title)))
         imported += 1
+        if imported % commit_every == 0:
+            db.commit()
 
     db.commit()
+    if progress is not None:
+        progress(len(report_paths), len(report_paths), force=True)
     return imported
 
 
+def purge_idea(
+    db: Session,
+    workspace_id: str,
+    idea_id: str,
+    batch_size: int = 500,
+    progress: Callable[..., None] | None = None,
+) -> dict[str, int]:
+    """Delete an idea and everything under it with set-based DELETEs, `batch_size` rows per commit.
+
+    Update logs, tasks and deliverables go by primary key in batches, each with one revision
+    and one executemany of tombstones for sync clients. Checklist items, tags and watched files
+    are removed by ON DELETE CASCADE, not loaded into the session. Short batches keep write
+    locks brief, and a purge that is interrupted resumes where it stopped when run again.
+    """
+    if db.scalar(select(Idea.id).where(Idea.id == idea_id, Idea.deleted_at.is_(None))) is not None:
+        # Live again: a replace-mode restore brought the idea back after it was deleted.
+        return {}
+    counts: dict[str, int] = {}
+    for model in (UpdateLog, Task, Deliverable):
+        entity_type = changes.TRACKED_ENTITIES[model]
+        counts[model.__tablename__] = 0
+        while True:
+            ids = db.scalars(select(model.id).where(model.idea_id == idea_id).limit(batch_size)).all()
+            if not ids:
+                break
+            revision = changes.allocate_revision(db.connection(), workspace_id)
+            now = datetime.utcnow()
+            db.execute(
+                insert(Tombstone),
+                [
+                    {
+                        "id": new_id(),
+                        "workspace_id": workspace_id,
+                        "entity_type": entity_type,
+                        "entity_id": row_id,
+                        "revision": revision,
+                        "deleted_at": now,
+                    }
+                    for row_id in ids
+                ],
+            )
+            db.execute(delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False))
+            db.commit()
+            counts[model.__tablename__] += len(ids)
+            if progress is not None:
+                progress(sum(counts.values()), message=f"purging {entity_type}s")
+    # The rollup is maintained by ORM events, which bulk deletes bypass.
+    db.execute(delete(ActivityDaily).where(ActivityDaily.idea_id == idea_id))
+    # Its tombstone was written when the idea was soft-deleted.
+    db.execute(delete(Idea).where(Idea.id == idea_id).execution_options(synchronize_session=False))
+    db.commit()
+    counts["report_bodies"] = bodies.prune(db)
+    if progress is not None:
+        progress(sum(counts.values()), message="purged", force=True)
+    return counts
+
+
+def _backfill_log_rows(
+    db: Session, model: type, rows_for: Callable[[UpdateLog], list], rebuild: bool, batch_size: int
+) -> tuple[int, int]:
+    """Derive `model` rows for update logs ingested before the table existed.
+
+    Only logs without rows are processed unless `rebuild` is set (e.g. after a parser change).
+    Walks the logs in id order and commits per batch. Returns (logs scanned, rows written).
+    """
+    scanned = written = 0
+    last_id = ""
+    while True:
+        q = select(UpdateLog).where(UpdateLog.id > last_id).order_by(UpdateLog.id).limit(batch_size)
+        if not rebuild:
+            q = q.where(~select(model.log_id).where(model.log_id == UpdateLog.id).exists())
+        logs = db.scalars(q.options(selectinload(UpdateLog.body))).all()
+        if not logs:
+            return scanned, written
+        if rebuild:
+            db.execute(delete(model).where(model.log_id.in_([log.id for log in logs])))
+        for log in logs:
+            rows = rows_for(log)
+            db.add_all(rows)
+            written += len(rows)
+        scanned += len(logs)
+        last_id = logs[-1].id
+        db.commit()
+        db.expunge_all()
+
+
+def backfill_checklist_items(db: Session, rebuild: bool = False, batch_size: int = 500) -> tuple[int, int]:
+    result = _backfill_log_rows(db, ChecklistItem, checklist_items_for, rebuild, batch_size)
+    if rebuild:
+        # The bulk delete above bypasses the rollup's per-row bookkeeping.
+        activity.rebuild(db)
+    return result
+
+
+def backfill_log_tags(db: Session, rebuild: bool = False, batch_size: int = 500) -> tuple[int, int]:
+    return _backfill_log_rows(db, UpdateLogTag, tag_rows_for, rebuild, batch_size)
+
+
+def similar_update_logs(db: Session, log: UpdateLog, k: int = 10) -> list[tuple[UpdateLog, float]]:
+    """Most similar update logs to `log` across all ideas of its workspace, best first."""
+    # Over-fetch: ids of deleted logs stay in the index until it is rebuilt.
+    ranked = similarity.index.similar(log.id, log.workspace_id, similarity.log_text(log), k * 2 + 5)
+    if not ranked:
+        return []
+    found = {
+        item.id: item
+        for item in db.scalars(
+            select(UpdateLog).where(
+                UpdateLog.workspace_id == log.workspace_id,
+                UpdateLog.id.in_([log_id for log_id, _ in ranked]),
+                UpdateLog.idea_id.in_(live_idea_ids(log.workspace_id)),
+            )
+        )
+    }
+    return [(found[log_id], score) for log_id, score in ranked if log_id in found][:k]
+
+
+CHECKLIST_PERIODS = {
+    "day": ChecklistItem.report_date,
+    "week": ChecklistItem.report_week,
+    "month": ChecklistItem.report_month,
+}
+
+
+def checklist_completions(
+    db: Session,
+    workspace_id: str,
+    period: str,
+    idea_id: str | None = None,
+    start: date | None = None,
+    end: date | None = None,
+) -> list[dict]:
+    """Checklist item counts per state for each day, ISO week or month, oldest first."""
+    bucket = CHECKLIST_PERIODS[period]
+    q = select(bucket, ChecklistItem.state, func.count(ChecklistItem.id)).where(
+        ChecklistItem.workspace_id == workspace_id, ChecklistItem.idea_id.in_(live_idea_ids(workspace_id))
+    )
+    if idea_id:
+        q = q.where(ChecklistItem.idea_id == idea_id)
+    if start:
+        q = q.where(ChecklistItem.report_date >= start)
+    if end:
+        q = q.where(ChecklistItem.report_date <= end)
+    rows: dict[str, dict] = {}
+    for key, state, count in db.execute(q.group_by(bucket, ChecklistItem.state).order_by(bucket)).all():
+        row = rows.setdefault(str(key), {"period": str(key)})
+        row[state] = count
+    return list(rows.values())
+
+
+TAG_FACET_PERIODS = {
+    "day": UpdateLogTag.report_date,
+    "week": UpdateLogTag.report_week,
+    "month": UpdateLogTag.report_month,
+}
+
+
+def tag_facets(
+    db: Session,
+    workspace_id: str,
+    period: str | None = None,
+    by_idea: bool = False,
+    idea_id: str | None = None,
+    start: date | None = None,
+    end: date | None = None,
+) -> list[dict]:
+    """Tag counts from the tag index, optionally per idea and per day / ISO week / month."""
+    keys = []
+    if by_idea:
+        keys.append(UpdateLogTag.idea_id)
+    if period:
+        keys.append(TAG_FACET_PERIODS[period])
+    keys.append(UpdateLogTag.tag)
+    count = func.count(UpdateLogTag.log_id)
+    q = select(*keys, count).where(
+        UpdateLogTag.workspace_id == workspace_id, UpdateLogTag.idea_id.in_(live_idea_ids(workspace_id))
+    )
+    if idea_id:
+        q = q.where(UpdateLogTag.idea_id == idea_id)
+    if start:
+        q = q.where(UpdateLogTag.report_date >= start)
+    if end:
+        q = q.where(UpdateLogTag.report_date <= end)
+    q = q.group_by(*keys).order_by(*keys[:-1], count.desc(), UpdateLogTag.tag)
+    facets: list[dict] = []
+    for row in db.execute(q).all():
+        values = list(row)
+        facet = {"count": values.pop()}
+        facet["tag"] = values.pop()
+        if period:
+            facet["period"] = str(values.pop())
+        if by_idea:
+            facet["idea_id"] = values.pop()
+        facets.append(facet)
+    return facets
+
+
 def dashboard_counts(db: Session, workspace_id: str, month: str) -> tuple[dict[str, int], int, int, int]:
     status_counts = {status.value: 0 for status in ItemStatus}
 
     status_rows = db.execute(
-        select(Idea.status, func.count(Idea.id)).where(Idea.workspace_id == workspace_id).group_by(Idea.status)
+        select(Idea.status, func.count(Idea.id))
+        .where(Idea.workspace_id == workspace_id, Idea.deleted_at.is_(None))
+        .group_by(Idea.status)
     ).all()
     for status, count in status_rows:
         if status in status_counts:
@@ -314,17 +613,24 @@ def dashboard_counts(db: Session, workspace_id: str, month: str) -> tuple[dict[s
 
     total_ideas = sum(status_counts.values())
 
-    tasks = db.scalars(select(Task).where(Task.workspace_id == workspace_id)).all()
+    tasks = db.scalars(
+        select(Task).where(Task.workspace_id == workspace_id, Task.idea_id.in_(live_idea_ids(workspace_id)))
+    ).all()
     delayed = sum(1 for task in tasks if is_delayed(task, month))
     low_activity = low_activity_task_count(db, workspace_id)
     return status_counts, total_ideas, delayed, low_activity
 
 
+def _idea_children(model: type, workspace_id: str, idea_id: str):
+    # Nothing while the idea is deleted and waiting for its purge.
+    return select(model).where(
+        model.workspace_id == workspace_id, model.idea_id == idea_id, model.idea_id.in_(live_idea_ids(workspace_id))
+    )
+
+
 def compute_idea_progress(db: Session, workspace_id: str, idea_id: str) -> tuple[float, float, float]:
-    tasks = db.scalars(select(Task).where(Task.workspace_id == workspace_id, Task.idea_id == idea_id)).all()
-    deliverables = db.scalars(
-        select(Deliverable).where(Deliverable.workspace_id == workspace_id, Deliverable.idea_id == idea_id)
-    ).all()
+    tasks = db.scalars(_idea_children(Task, workspace_id, idea_id)).all()
+    deliverables = db.scalars(_idea_children(Deliverable, workspace_id, idea_id)).all()
 
     task_pool = [t for t in tasks if t.status != ItemStatus.DISCARDED.value]
     completed_tasks = [t for t in task_pool if t.status == ItemStatus.COMPLETED.value]
@@ -339,8 +645,7 @@ def compute_idea_progress(db: Session, workspace_id: str, idea_id: str) -> tuple
 
 def detect_risks(db: Session, workspace_id: str, idea_id: str, month: str) -> list[dict]:
     risks: list[dict] = []
-    tasks = db.scalars(select(Task).where(Task.workspace_id == workspace_id, Task.idea_id == idea_id)).all()
-    logs = db.scalars(select(UpdateLog).where(UpdateLog.workspace_id == workspace_id, UpdateLog.idea_id == idea_id)).all()
+    tasks = db.scalars(_idea_children(Task, workspace_id, idea_id)).all()
 
     for task in tasks:
         if task.due_month < month and task.status != ItemStatus.COMPLETED.value:
@@ -354,8 +659,8 @@ def detect_risks(db: Session, workspace_id: str, idea_id: str, month: str) -> li
                 }
             )
 
-    latest_log_at = max([l.created_at for l in logs], default=None)
-    if latest_log_at and latest_log_at < datetime.utcnow() - timedelta(days=14):
+    latest_log_day = activity.last_log_day(db, workspace_id, idea_id)
+    if latest_log_day and latest_log_day < (datetime.utcnow() - timedelta(days=14)).date():
         risks.append(
             {
                 "code": "LOW_ACTIVITY",
@@ -365,7 +670,7 @@ def detect_risks(db: Session, workspace_id: str, idea_id: str, month: str) -> li
                 "related_id": idea_id,
             }
         )
-    elif not latest_log_at:
+    elif not latest_log_day:
         risks.append(
             {
                 "code": "NO_LOG",
@@ -400,12 +705,32 @@ def detect_risks(db: Session, workspace_id: str, idea_id: str, month: str) -> li
     return list(unique.values())
 
 
+OPEN_STATUSES = (ItemStatus.PLANNED.value, ItemStatus.IN_PROGRESS.value)
+
+
+def top_tasks(db: Session, workspace_id: str, limit: int, idea_id: str | None = None) -> list[Task]:
+    """Open tasks by stored priority score, highest first: an index-ordered LIMIT."""
+    q = select(Task).where(
+        Task.workspace_id == workspace_id,
+        Task.status.in_(OPEN_STATUSES),
+        Task.idea_id.in_(live_idea_ids(workspace_id)),
+    )
+    if idea_id:
+        q = q.where(Task.idea_id == idea_id)
+    return db.scalars(q.order_by(Task.priority_score.desc(), Task.id).limit(limit)).all()
+
+
+def top_ideas(db: Session, workspace_id: str, limit: int) -> list[Idea]:
+    q = select(Idea).where(
+        Idea.workspace_id == workspace_id, Idea.status.in_(OPEN_STATUSES), Idea.deleted_at.is_(None)
+    )
+    return db.scalars(q.order_by(Idea.priority_score.desc(), Idea.id).limit(limit)).all()
+
+
 def recommend_next_actions(db: Session, workspace_id: str, idea_id: str, month: str) -> list[str]:
     actions: list[str] = []
-    tasks = db.scalars(select(Task).where(Task.workspace_id == workspace_id, Task.idea_id == idea_id)).all()
-    deliverables = db.scalars(
-        select(Deliverable).where(Deliverable.workspace_id == workspace_id, Deliverable.idea_id == idea_id)
-    ).all()
+    tasks = db.scalars(_idea_children(Task, workspace_id, idea_id).order_by(Task.priority_score.desc(), Task.id)).all()
+    deliverables = db.scalars(_idea_children(Deliverable, workspace_id, idea_id)).all()
 
     in_progress = [t for t in tasks if t.status == ItemStatus.IN_PROGRESS.value]
     planned = [t for t in tasks if t.status == ItemStatus.PLANNED.value]
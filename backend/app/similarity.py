@@ -0,0 +1,383 @@
+﻿from __future__ import annotations
+
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+import json
+import logging
+import math
+import os
+from pathlib import Path
+import re
+import threading
+import zlib
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .models import UpdateLog
+
+logger = logging.getLogger("researchos.similarity")
+
+# Bump when tokenization or weighting changes: a mismatching index on disk is discarded.
+INDEX_VERSION = 2
+
+_TOKEN = re.compile(r"[a-z0-9_]{2,}")
+_PENDING_KEY = "similarity_pending"
+# docs.tsv records are fixed width (ids are String(36)), so record n starts at n * _DOC_RECORD.
+_DOC_RECORD = 36 + 1 + 36 + 1
+
+
+def hashed_tf(text: str, dim: int) -> tuple[list[int], list[float]]:
+    """Sparse sublinear term frequencies (1 + ln tf) of `text`, hashed into `dim` buckets."""
+    buckets: dict[int, float] = {}
+    for token, count in Counter(_TOKEN.findall(text.lower())).items():
+        bucket = zlib.crc32(token.encode("utf-8")) % dim
+        buckets[bucket] = buckets.get(bucket, 0.0) + count
+    indices = sorted(buckets)
+    return indices, [1.0 + math.log(buckets[index]) for index in indices]
+
+
+def _idf(df, count: int):
+    import numpy as np
+
+    return (np.log((1 + count) / (1 + df)) + 1).astype(np.float32)
+
+
+def log_text(log: UpdateLog) -> str:
+    return f"{log.title}\n{log.ai_summary or ''}\n{log.body_md}"
+
+
+@contextmanager
+def _file_lock(path: Path):
+    # API and standalone worker may both append; the lock serializes writers across processes.
+    with open(path, "a+b") as handle:
+        if os.name == "nt":
+            import msvcrt
+
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        yield
+
+
+@dataclass
+class _Snapshot:
+    count: int
+    ids: list[str]
+    positions: dict[str, int]
+    workspaces: object  # np.ndarray[int32], index into workspace_codes
+    workspace_codes: dict[str, int]
+    indptr: object
+    empty: object  # bool per position: the document has no entries
+    indices: object
+    tf: object
+    norms: object  # per document, weighted with the IDF at the time it was appended
+    idf: object
+    superseded: object  # bool per position: the log was appended again later
+
+
+class SimilarityIndex:
+    """Hashing TF-IDF vectors of update logs, stored as append-only memory-mapped arrays.
+
+    Layout of `directory`: `indices.i32` and `tf.f32` hold every document's sparse entries
+    back to back, `docs.tsv` holds a fixed-width `log_id<TAB>workspace_id` record per document
+    and `indptr.i64` holds each document's end offset. Appending to `indptr.i64` is the commit
+    point: an interrupted append leaves a tail in the other files that the next append cuts off.
+    `norms.f32` holds each document's TF-IDF norm and `df.i64` the document frequencies, headed
+    by the document count they cover; both are updated by the append, so reloading after new
+    documents reads only the new records. IDF is applied to the stored term frequencies at query
+    time. A norm keeps the IDF of its append, which drifts slowly as the corpus grows; `rebuild`
+    recomputes them. An edited log is appended again and only its latest document is scored.
+    Deleted logs stay in the arrays until `rebuild`; queries drop ids that no longer exist.
+    """
+
+    def __init__(self, directory: Path, dim: int) -> None:
+        self.directory = directory
+        self.dim = dim
+        self._lock = threading.Lock()
+        self._snapshot: _Snapshot | None = None
+
+    def _path(self, name: str) -> Path:
+        return self.directory / name
+
+    def _ensure_layout(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        meta_path = self._path("meta.json")
+        meta = {"version": INDEX_VERSION, "dim": self.dim}
+        if meta_path.exists() and json.loads(meta_path.read_text(encoding="utf-8")) == meta:
+            return
+        if meta_path.exists():
+            logger.warning("similarity index at %s has other settings; starting a new one", self.directory)
+        for name in ("indices.i32", "tf.f32", "indptr.i64", "docs.tsv", "norms.f32", "df.i64"):
+            self._path(name).unlink(missing_ok=True)
+        meta_path.write_text(json.dumps(meta), encoding="utf-8")
+
+    def add(self, docs: list[tuple[str, str, str]]) -> None:
+        """Append (log_id, workspace_id, text) documents."""
+        if not docs:
+            return
+        import numpy as np
+
+        with self._lock:
+            self._ensure_layout()
+            with _file_lock(self._path("write.lock")):
+                count = self._stored_count()
+                end = self._end_offset(count)
+                tails = (
+                    ("indices.i32", end * 4),
+                    ("tf.f32", end * 4),
+                    ("norms.f32", count * 4),
+                    ("docs.tsv", count * _DOC_RECORD),
+                )
+                for name, size in tails:
+                    with open(self._path(name), "ab") as handle:
+                        handle.truncate(size)
+                count, df = self._document_frequencies(count)
+                all_indices: list[int] = []
+                all_tf: list[float] = []
+                lengths: list[int] = []
+                for _, _, text in docs:
+                    indices, tf = hashed_tf(text, self.dim)
+                    all_indices.extend(indices)
+                    all_tf.extend(tf)
+                    lengths.append(len(indices))
+                offsets = end + np.cumsum(lengths, dtype=np.int64)
+                new_indices = np.asarray(all_indices, dtype=np.int32)
+                new_tf = np.asarray(all_tf, dtype=np.float32)
+                df += np.bincount(new_indices, minlength=self.dim)
+                weighted = new_tf * _idf(df, count + len(docs))[new_indices]
+                rows = np.repeat(np.arange(len(docs)), lengths)
+                norms = np.sqrt(np.bincount(rows, weights=weighted * weighted, minlength=len(docs)))
+                with open(self._path("indices.i32"), "ab") as handle:
+                    handle.write(new_indices.tobytes())
+                with open(self._path("tf.f32"), "ab") as handle:
+                    handle.write(new_tf.tobytes())
+                with open(self._path("norms.f32"), "ab") as handle:
+                    handle.write(norms.astype(np.float32).tobytes())
+                with open(self._path("docs.tsv"), "ab") as handle:
+                    handle.write(
+                        "".join(f"{log_id:<36}\t{workspace_id:<36}\n" for log_id, workspace_id, _ in docs).encode("ascii")
+                    )
+                with open(self._path("indptr.i64"), "ab") as handle:
+                    handle.write(offsets.tobytes())
+                # Written after the commit point: a crash here leaves `df.i64` behind, and the
+                # next reader or append catches up from the stored indices.
+                scratch = self._path("df.i64.tmp")
+                np.concatenate(([count + len(docs)], df)).astype(np.int64).tofile(scratch)
+                os.replace(scratch, self._path("df.i64"))
+
+    def _stored_count(self) -> int:
+        path = self._path("indptr.i64")
+        return path.stat().st_size // 8 if path.exists() else 0
+
+    def _end_offset(self, count: int) -> int:
+        """Number of stored entries of the first `count` documents."""
+        import numpy as np
+
+        if not count:
+            return 0
+        with open(self._path("indptr.i64"), "rb") as handle:
+            handle.seek((count - 1) * 8)
+            return int(np.frombuffer(handle.read(8), dtype=np.int64)[0])
+
+    def _document_frequencies(self, count: int):
+        """(count, df) from `df.i64`, caught up to at least `count` committed documents."""
+        import numpy as np
+
+        covered, df = 0, np.zeros(self.dim, dtype=np.int64)
+        path = self._path("df.i64")
+        if path.exists():
+            stored = np.fromfile(path, dtype=np.int64)
+            if len(stored) == self.dim + 1:
+                covered, df = int(stored[0]), stored[1:]
+        if covered > count:
+            # An append committed after `count` was read; its documents are complete on disk.
+            return covered, df
+        start, end = self._end_offset(covered), self._end_offset(count)
+        if end > start:
+            missing = np.fromfile(
+                self._path("indices.i32"), dtype=np.int32, count=end - start, offset=start * 4
+            )
+            df = df + np.bincount(missing, minlength=self.dim)
+        return count, df
+
+    def _load(self) -> _Snapshot | None:
+        import numpy as np
+
+        with self._lock:
+            count = self._stored_count()
+            previous = self._snapshot
+            if previous is not None and previous.count == count:
+                return previous
+            if not count or not self._path("meta.json").exists():
+                return None
+            count, df = self._document_frequencies(count)
+            if previous is None or previous.count > count:
+                previous = _Snapshot(
+                    count=0,
+                    ids=[],
+                    positions={},
+                    workspaces=np.zeros(0, dtype=np.int32),
+                    workspace_codes={},
+                    indptr=None,
+                    empty=None,
+                    indices=None,
+                    tf=None,
+                    norms=None,
+                    idf=None,
+                    superseded=np.zeros(0, dtype=bool),
+                )
+            # Only the records appended since the previous snapshot are read and decoded.
+            with open(self._path("docs.tsv"), "rb") as handle:
+                handle.seek(previous.count * _DOC_RECORD)
+                raw = handle.read((count - previous.count) * _DOC_RECORD).decode("ascii")
+            docs = [line.split("\t") for line in raw.splitlines()]
+            docs = [(log_id.rstrip(), workspace_id.rstrip()) for log_id, workspace_id in docs]
+            workspace_codes = dict(previous.workspace_codes)
+            workspaces = np.concatenate((
+                previous.workspaces,
+                np.fromiter(
+                    (workspace_codes.setdefault(workspace_id, len(workspace_codes)) for _, workspace_id in docs),
+                    dtype=np.int32,
+                    count=len(docs),
+                ),
+            ))
+            ids = previous.ids + [log_id for log_id, _ in docs]
+            positions = dict(previous.positions)
+            superseded = np.concatenate((previous.superseded, np.zeros(len(docs), dtype=bool)))
+            for position, (log_id, _) in enumerate(docs, start=previous.count):
+                if log_id in positions:
+                    superseded[positions[log_id]] = True
+                positions[log_id] = position
+
+            ends = np.memmap(self._path("indptr.i64"), dtype=np.int64, mode="r", shape=(count,))
+            nnz = int(ends[-1])
+            if nnz:
+                indices = np.memmap(self._path("indices.i32"), dtype=np.int32, mode="r", shape=(nnz,))
+                tf = np.memmap(self._path("tf.f32"), dtype=np.float32, mode="r", shape=(nnz,))
+            else:
+                indices, tf = np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+            indptr = np.concatenate(([0], ends)).astype(np.int64)
+            self._snapshot = _Snapshot(
+                count=count,
+                ids=ids,
+                positions=positions,
+                workspaces=workspaces,
+                workspace_codes=workspace_codes,
+                indptr=indptr,
+                empty=indptr[1:] == indptr[:-1],
+                indices=indices,
+                tf=tf,
+                norms=np.memmap(self._path("norms.f32"), dtype=np.float32, mode="r", shape=(count,)),
+                idf=_idf(df, count),
+                superseded=superseded,
+            )
+            return self._snapshot
+
+    def similar(self, log_id: str, workspace_id: str, text: str, k: int) -> list[tuple[str, float]]:
+        """Top-`k` (log_id, cosine) in `workspace_id`, excluding `log_id` itself."""
+        import numpy as np
+
+        snapshot = self._load()
+        if snapshot is None or workspace_id not in snapshot.workspace_codes:
+            return []
+        position = snapshot.positions.get(log_id)
+        query = np.zeros(self.dim, dtype=np.float32)
+        if position is not None:
+            start, end = snapshot.indptr[position], snapshot.indptr[position + 1]
+            query[snapshot.indices[start:end]] = snapshot.tf[start:end]
+        else:
+            indices, tf = hashed_tf(text, self.dim)
+            query[indices] = tf
+        query *= snapshot.idf
+        query_norm = float(np.linalg.norm(query))
+        if not query_norm:
+            return []
+
+        # Weighting the query twice applies the documents' IDF without materializing their vectors.
+        products = snapshot.tf * (query * snapshot.idf)[snapshot.indices]
+        dots = np.add.reduceat(np.concatenate((products, np.zeros(1, dtype=products.dtype))), snapshot.indptr[:-1])
+        dots[snapshot.empty] = 0.0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = np.where(snapshot.norms > 0, dots / (snapshot.norms * query_norm), 0.0)
+        np.minimum(scores, 1.0, out=scores)
+        scores[snapshot.workspaces != snapshot.workspace_codes[workspace_id]] = -1.0
+        scores[snapshot.superseded] = -1.0
+        if position is not None:
+            scores[position] = -1.0
+        k = min(k, snapshot.count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(snapshot.ids[i], float(scores[i])) for i in top if scores[i] > 0]
+
+    def rebuild(self, docs) -> int:
+        """Replace the index with `docs`, an iterable of (log_id, workspace_id, text)."""
+        with self._lock:
+            if self._path("meta.json").exists():
+                self._path("meta.json").unlink()
+            self._snapshot = None
+        count = 0
+        batch: list[tuple[str, str, str]] = []
+        for doc in docs:
+            batch.append(doc)
+            if len(batch) >= 500:
+                self.add(batch)
+                count += len(batch)
+                batch = []
+        self.add(batch)
+        self._renormalize()
+        return count + len(batch)
+
+    def _renormalize(self) -> None:
+        """Rewrite every stored norm with the current IDF."""
+        import numpy as np
+
+        with self._lock, _file_lock(self._path("write.lock")):
+            count = self._stored_count()
+            if not count:
+                return
+            count, df = self._document_frequencies(count)
+            nnz = self._end_offset(count)
+            indices = np.fromfile(self._path("indices.i32"), dtype=np.int32, count=nnz)
+            weighted = np.fromfile(self._path("tf.f32"), dtype=np.float32, count=nnz) * _idf(df, count)[indices]
+            ends = np.fromfile(self._path("indptr.i64"), dtype=np.int64, count=count)
+            rows = np.repeat(np.arange(count), np.diff(ends, prepend=0))
+            norms = np.sqrt(np.bincount(rows, weights=weighted * weighted, minlength=count))
+            # In place, so snapshots that already map the file see the new values.
+            with open(self._path("norms.f32"), "r+b") as handle:
+                handle.write(norms.astype(np.float32).tobytes())
+
+
+index = SimilarityIndex(Path(settings.similarity_index_dir), settings.similarity_dim)
+
+
+def _after_write(mapper, connection, target: UpdateLog) -> None:
+    session = Session.object_session(target)
+    if session is not None and settings.similarity_enabled:
+        session.info.setdefault(_PENDING_KEY, []).append((target.id, target.workspace_id, log_text(target)))
+
+
+event.listen(UpdateLog, "after_insert", _after_write)
+event.listen(UpdateLog, "after_update", _after_write)
+
+
+@event.listens_for(Session, "after_commit")
+def _index_on_commit(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    try:
+        index.add(pending)
+    except Exception:
+        # The log itself is committed; `scripts.rebuild_similarity` restores a missed document.
+        logger.exception("similarity index append failed for %d logs", len(pending))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,248 @@
+﻿from __future__ import annotations
+
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import hashlib
+import logging
+import re
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+
+from . import ai, metrics
+from .config import settings
+
+logger = logging.getLogger("researchos.ai")
+
+# Part of every cache key: bump when the prompts or the output parsing change.
+PROMPT_VERSION = 1
+
+SUMMARIZE_SYSTEM_PROMPT = (
+    "You summarize research logs. Return plain text only.\n"
+    "Format:\n"
+    "SUMMARY:\n"
+    "- line 1\n- line 2\n- line 3\n- line 4\n- line 5\n"
+    "TAGS: tag1, tag2, tag3"
+)
+SECTION_SYSTEM_PROMPT = (
+    "You summarize one section of a longer research log. Return plain text only.\n"
+    "Format:\n"
+    "SUMMARY:\n"
+    "- line 1\n- line 2\n- line 3\n"
+    "TAGS: tag1, tag2, tag3"
+)
+REDUCE_SYSTEM_PROMPT = (
+    "You combine section summaries of one research log into a summary of the whole log. "
+    "Return plain text only.\n"
+    "Format:\n"
+    "SUMMARY:\n"
+    "- line 1\n- line 2\n- line 3\n- line 4\n- line 5\n"
+    "TAGS: tag1, tag2, tag3"
+)
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*)$")
+
+
+@dataclass
+class Chunk:
+    heading: str
+    text: str
+
+    def key(self, model: str, kind: str) -> str:
+        material = f"v{PROMPT_VERSION}\n{kind}\n{model}\n{self.text.strip()}"
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _sections(lines: list[str], max_level: int) -> list[tuple[str, list[str]]]:
+    sections: list[tuple[str, list[str]]] = [("", [])]
+    for line in lines:
+        match = _HEADING.match(line)
+        if match and len(match.group(1)) <= max_level:
+            sections.append((match.group(2).strip(), [line]))
+        else:
+            sections[-1][1].append(line)
+    return [(heading, body) for heading, body in sections if any(part.strip() for part in body)]
+
+
+def _split_paragraphs(heading: str, lines: list[str], max_chars: int) -> list[Chunk]:
+    chunks: list[Chunk] = []
+    current: list[str] = []
+    size = 0
+    for line in lines:
+        # Prefer breaking on a blank line once the chunk is half full; hard-break at max_chars.
+        if current and (size + len(line) > max_chars or (not line.strip() and size > max_chars // 2)):
+            chunks.append(Chunk(heading, "\n".join(current)))
+            current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        chunks.append(Chunk(heading, "\n".join(current)))
+    return chunks
+
+
+def split_markdown(body_md: str, max_chars: int, min_chars: int) -> list[Chunk]:
+    """Split on heading boundaries (levels 1-2 first, deeper headings and paragraphs for big sections).
+
+    A section shorter than `min_chars` is merged into the following one. The decision depends
+    only on that section's size, so editing one section changes at most that chunk and its
+    neighbour, and the other chunk keys stay cached.
+    """
+    chunks: list[Chunk] = []
+    for heading, body in _sections(body_md.splitlines(), max_level=2):
+        if sum(len(line) + 1 for line in body) <= max_chars:
+            chunks.append(Chunk(heading, "\n".join(body)))
+            continue
+        for sub_heading, sub_body in _sections(body, max_level=6):
+            chunks.extend(_split_paragraphs(sub_heading or heading, sub_body, max_chars))
+
+    merged: list[Chunk] = []
+    carry: Chunk | None = None
+    for chunk in chunks:
+        if carry is not None:
+            chunk = Chunk(carry.heading, carry.text + "\n" + chunk.text)
+            carry = None
+        if len(chunk.text) < min_chars and len(chunk.text) < max_chars:
+            carry = chunk
+        else:
+            merged.append(chunk)
+    if carry is not None:
+        merged.append(carry)
+    return merged
+
+
+def parse_output(output_text: str, max_lines: int = 5) -> tuple[str, list[str]]:
+    lines = [line.strip() for line in output_text.splitlines() if line.strip()]
+    summary_lines = [line for line in lines if line.startswith("- ")][:max_lines]
+    if not summary_lines:
+        summary_lines = [line for line in lines if not line.lower().startswith(("summary:", "tags:"))][:max_lines]
+    tags: list[str] = []
+    for line in lines:
+        if line.lower().startswith("tags:"):
+            raw = line.split(":", 1)[1]
+            tags = [item.strip().lower() for item in raw.split(",") if item.strip()]
+            break
+    return "\n".join(summary_lines)[:1200], tags
+
+
+class EmptyOutput(Exception):
+    pass
+
+
+def _cached(keys: list[str]) -> dict[str, tuple[str, list[str]]]:
+    if not settings.ai_summary_cache_enabled or not keys:
+        return {}
+    from .db import SessionLocal
+    from .models import SummaryChunk
+
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(SummaryChunk.key, SummaryChunk.summary, SummaryChunk.tags).where(SummaryChunk.key.in_(keys))
+        ).all()
+    return {key: (summary, tags) for key, summary, tags in rows}
+
+
+def _store(rows: list[dict]) -> None:
+    if not settings.ai_summary_cache_enabled or not rows:
+        return
+    from .db import SessionLocal
+    from .models import SummaryChunk
+
+    # Best effort: a cache write must never fail the summary (e.g. SQLite busy, racing insert).
+    try:
+        with SessionLocal() as db:
+            existing = set(db.scalars(select(SummaryChunk.key).where(SummaryChunk.key.in_([r["key"] for r in rows]))))
+            db.add_all(SummaryChunk(**row) for row in rows if row["key"] not in existing)
+            db.commit()
+    except SQLAlchemyError as exc:
+        logger.warning("summary cache write skipped: %s", exc)
+
+
+def _call(
+    provider: ai.Provider, system: str, text: str, model: str, max_output_tokens: int
+) -> tuple[str, list[str], int, int]:
+    completion = ai.complete(provider, system, text, max_output_tokens, model)
+    if not completion.text:
+        raise EmptyOutput()
+    summary, tags = parse_output(completion.text)
+    return summary, tags, completion.input_tokens, completion.output_tokens
+
+
+def summarize(
+    provider: ai.Provider,
+    body_md: str,
+    model: str,
+    local_tags: Callable[[str], list[str]],
+) -> tuple[str, list[str]]:
+    """Summarize `body_md` with `provider`; long reports go through map-reduce over cached chunks.
+
+    Raises ai.ProviderError subclasses or EmptyOutput; the caller decides on the fallback.
+    """
+    if len(body_md) <= settings.ai_single_call_chars:
+        chunks = [Chunk("", body_md)]
+    else:
+        chunks = split_markdown(body_md, settings.ai_chunk_chars, settings.ai_chunk_min_chars)
+
+    if len(chunks) == 1:
+        key = chunks[0].key(model, "document")
+        hit = _cached([key]).get(key)
+        metrics.record_cache("summary_chunks", hit is not None)
+        if hit is not None:
+            return hit[0], hit[1] or local_tags(body_md)
+        summary, tags, input_tokens, output_tokens = _call(provider, SUMMARIZE_SYSTEM_PROMPT, body_md, model, 300)
+        _store([_row(key, model, summary, tags, input_tokens, output_tokens)])
+        return summary, (tags or local_tags(body_md))[:5]
+
+    # Map: only sections whose content hash is not cached go to the provider.
+    keys = [chunk.key(model, "section") for chunk in chunks]
+    cached = _cached(keys)
+    for key in keys:
+        metrics.record_cache("summary_chunks", key in cached)
+    missing = {key: chunk for key, chunk in zip(keys, chunks) if key not in cached}
+    if missing:
+        fresh: list[dict] = []
+        error: Exception | None = None
+        with ThreadPoolExecutor(max_workers=min(settings.ai_map_concurrency, len(missing))) as pool:
+            futures = {
+                key: pool.submit(_call, provider, SECTION_SYSTEM_PROMPT, chunk.text, model, 200)
+                for key, chunk in missing.items()
+            }
+            for key, future in futures.items():
+                try:
+                    summary, tags, input_tokens, output_tokens = future.result()
+                except Exception as exc:
+                    error = error or exc
+                    continue
+                cached[key] = (summary, tags)
+                fresh.append(_row(key, model, summary, tags, input_tokens, output_tokens))
+        # Keep the sections that did succeed: a retry after a failure only pays for the rest.
+        _store(fresh)
+        if error is not None:
+            raise error
+
+    # Reduce: the section summaries are small, so one call combines them. Its result is cached
+    # under the sequence of chunk keys, so an unchanged report costs no provider calls at all.
+    reduce_key = hashlib.sha256(f"reduce\n{model}\n{''.join(keys)}".encode("utf-8")).hexdigest()
+    hit = _cached([reduce_key]).get(reduce_key)
+    metrics.record_cache("summary_chunks", hit is not None)
+    if hit is not None:
+        return hit[0], hit[1][:5]
+    reduce_input = "\n\n".join(
+        f"## {chunk.heading or 'Section'}\n{cached[key][0]}" for chunk, key in zip(chunks, keys)
+    )
+    summary, tags, input_tokens, output_tokens = _call(provider, REDUCE_SYSTEM_PROMPT, reduce_input, model, 300)
+    if not tags:
+        tags = sorted({tag for key in keys for tag in cached[key][1]}) or local_tags(body_md)
+    _store([_row(reduce_key, model, summary, tags, input_tokens, output_tokens)])
+    return summary, tags[:5]
+
+
+def _row(key: str, model: str, summary: str, tags: list[str], input_tokens: int, output_tokens: int) -> dict:
+    return {
+        "key": key,
+        "model": model,
+        "summary": summary,
+        "tags": tags,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+    }
@@ -0,0 +1,96 @@
+﻿from __future__ import annotations
+
+from collections.abc import Mapping
+from dataclasses import dataclass
+import re
+
+from .config import settings
+
+# `- [x] text`, `- [/] text`, `- [ ] text`, optionally indented. One scan over the whole body;
+# the text group already skips the leading whitespace and `**` emphasis marker.
+_CHECKLIST = re.compile(r"^[ \t]*- \[([x/ ])\][ \t]*\**[ \t]*(.*)", re.MULTILINE)
+
+DONE = "done"
+IN_PROGRESS = "in_progress"
+TODO = "todo"
+_STATES = {"x": DONE, "/": IN_PROGRESS, " ": TODO}
+
+
+@dataclass
+class ChecklistItem:
+    state: str  # done | in_progress | todo
+    text: str
+
+
+def _checklist(body_md: str) -> list[tuple[str, str]]:
+    items: list[tuple[str, str]] = []
+    for mark, text in _CHECKLIST.findall(body_md):
+        text = text.rstrip().rstrip("*").rstrip()
+        if text:
+            items.append((mark, text))
+    return items
+
+
+def _is_label(text: str) -> bool:
+    # A single short word is usually a section label ("- [x] **RTL**"), not a work item.
+    return len(text) <= 20 and len(text.split()) < 2
+
+
+def parse_checklist(body_md: str) -> list[ChecklistItem]:
+    """Every checklist item in document order, single-word ones ("- [x] Synthesis") included."""
+    return [ChecklistItem(_STATES[mark], text) for mark, text in _checklist(body_md)]
+
+
+class Tagger:
+    """Keyword tagger: tag -> keywords/aliases, matched as case-insensitive substrings.
+
+    The text is lowered once and each keyword is a substring search over it. For dictionaries
+    of up to a few dozen keywords this beats a compiled alternation regex in CPython by 2-3x
+    (see benchmarks/local_summarizer.py). Tags come back in dictionary order, and the scan
+    stops once `limit` tags are found.
+    """
+
+    def __init__(self, tags: Mapping[str, list[str]]) -> None:
+        self.entries: list[tuple[str, tuple[str, ...]]] = [
+            (tag, tuple(dict.fromkeys(keyword.lower() for keyword in keywords or [tag])))
+            for tag, keywords in tags.items()
+        ]
+
+    def tags(self, text: str, limit: int = 5) -> list[str]:
+        lowered = text.lower()
+        found: list[str] = []
+        for tag, keywords in self.entries:
+            for keyword in keywords:
+                if keyword in lowered:
+                    found.append(tag)
+                    break
+            if len(found) >= limit:
+                break
+        return found
+
+
+tagger = Tagger(settings.local_tags)
+
+
+def summarize(body_md: str) -> tuple[str, list[str]]:
+    """Local (no-AI) summary: completed / in-progress checklist items, else the first bullets."""
+    completed: list[str] = []
+    in_progress: list[str] = []
+    for mark, text in _checklist(body_md):
+        if _is_label(text):
+            continue
+        (completed if mark == "x" else in_progress).append(text)
+
+    parts: list[str] = []
+    if completed:
+        parts.append(f"Completed ({len(completed)}): {'; '.join(completed[:4])}")
+    if in_progress:
+        parts.append(f"In progress: {'; '.join(in_progress[:3])}")
+
+    if parts:
+        summary = " | ".join(parts)
+    else:
+        lines = [line.strip() for line in body_md.splitlines() if line.strip()]
+        bullet_lines = [line for line in lines if line.startswith("- ")][:5]
+        summary = "\n".join(bullet_lines) if bullet_lines else "\n".join(lines[:5])
+    return summary[:1200], tagger.tags(body_md)
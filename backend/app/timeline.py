@@ -0,0 +1,226 @@
+﻿from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+import threading
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import metrics
+from .config import settings
+from .enums import ItemStatus
+from .models import Idea, Task, Workspace, live_idea_ids
+
+
+def month_index(month: str) -> int | None:
+    """`YYYY-MM` -> months since year 0 (year * 12 + month - 1); None when malformed."""
+    try:
+        year, mm = month.split("-")
+        year_value, month_value = int(year), int(mm)
+    except (AttributeError, ValueError):
+        return None
+    if len(year) != 4 or not 1 <= month_value <= 12:
+        return None
+    return year_value * 12 + month_value - 1
+
+
+def month_label(index: int) -> str:
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+@dataclass(frozen=True)
+class _TimelineTask:
+    id: str
+    idea_id: str
+    title: str
+    status: str
+    importance: int
+    start: int | None
+    end: int | None
+    due: int | None
+    dependencies: tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class _TimelineIdea:
+    id: str
+    title: str
+    status: str
+    start: int | None
+    target: int | None
+
+
+@dataclass(frozen=True)
+class _Plan:
+    """Every idea and task of a workspace with months as integers, in Gantt row order."""
+
+    revision: int
+    ideas: tuple[_TimelineIdea, ...]
+    tasks: tuple[_TimelineTask, ...]
+
+
+def _load_plan(db: Session, workspace_id: str, revision: int) -> _Plan:
+    ideas = db.execute(
+        select(Idea.id, Idea.title, Idea.status, Idea.start_month, Idea.target_month)
+        .where(Idea.workspace_id == workspace_id, Idea.deleted_at.is_(None))
+        .order_by(Idea.created_at.asc())
+    ).all()
+    tasks = db.execute(
+        select(
+            Task.id,
+            Task.idea_id,
+            Task.title,
+            Task.status,
+            Task.importance,
+            Task.start_month,
+            Task.end_month,
+            Task.due_month,
+            Task.dependencies,
+        )
+        .where(Task.workspace_id == workspace_id, Task.idea_id.in_(live_idea_ids(workspace_id)))
+        .order_by(Task.sort_order.asc(), Task.updated_at.asc())
+    ).all()
+    return _Plan(
+        revision=revision,
+        ideas=tuple(
+            _TimelineIdea(id, title, status, month_index(start), month_index(target))
+            for id, title, status, start, target in ideas
+        ),
+        tasks=tuple(
+            _TimelineTask(
+                id,
+                idea_id,
+                title,
+                status,
+                importance,
+                month_index(start),
+                month_index(end),
+                month_index(due),
+                tuple(dependencies or ()),
+            )
+            for id, idea_id, title, status, importance, start, end, due, dependencies in tasks
+        ),
+    )
+
+
+class PlanCache:
+    """Per-workspace `_Plan`, reused while the workspace revision is unchanged.
+
+    Every idea/task write bumps `Workspace.revision` (see app/changes.py), so a matching
+    revision means the cached plan is current. Holds at most `size` workspaces (LRU).
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self._plans: OrderedDict[str, _Plan] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, workspace_id: str) -> _Plan:
+        revision = db.scalar(select(Workspace.revision).where(Workspace.id == workspace_id)) or 0
+        with self._lock:
+            plan = self._plans.get(workspace_id)
+            if plan is not None and plan.revision == revision:
+                self._plans.move_to_end(workspace_id)
+                metrics.record_cache("timeline", True)
+                return plan
+        metrics.record_cache("timeline", False)
+        plan = _load_plan(db, workspace_id, revision)
+        with self._lock:
+            self._plans[workspace_id] = plan
+            self._plans.move_to_end(workspace_id)
+            while len(self._plans) > self.size:
+                self._plans.popitem(last=False)
+        return plan
+
+
+plans = PlanCache(settings.timeline_cache_size)
+
+
+def _bar(start: int | None, end: int | None, first: int, last: int) -> dict | None:
+    # Window-relative [start, end] clipped to the window; None when the bar is outside it.
+    if start is None or end is None or end < start or end < first or start > last:
+        return None
+    return {
+        "start": max(start, first) - first,
+        "end": min(end, last) - first,
+        "continues_before": start < first,
+        "continues_after": end > last,
+    }
+
+
+def build_timeline(
+    db: Session, workspace_id: str, first: int, last: int, current: int, idea_id: str | None = None
+) -> dict:
+    """Gantt rows for months `first`..`last` (inclusive month indices), grouped per idea.
+
+    Only ideas and tasks whose bar or due month falls in the window are returned. Positions
+    are month offsets from `first`. `buckets` holds per-month counts of active, due and delayed
+    tasks; a task is delayed when its due month is before `current` and it is not completed.
+    """
+    plan = plans.get(db, workspace_id)
+    width = last - first + 1
+    active = [0] * width
+    due = [0] * width
+    delayed = [0] * width
+    rows: dict[str, list[dict]] = {}
+    visible: dict[str, _TimelineTask] = {}
+    for task in plan.tasks:
+        if idea_id and task.idea_id != idea_id:
+            continue
+        bar = _bar(task.start, task.end, first, last)
+        due_offset = task.due - first if task.due is not None and first <= task.due <= last else None
+        if bar is None and due_offset is None:
+            continue
+        is_delayed = task.due is not None and task.due < current and task.status != ItemStatus.COMPLETED.value
+        if bar is not None:
+            for offset in range(bar["start"], bar["end"] + 1):
+                active[offset] += 1
+        if due_offset is not None:
+            due[due_offset] += 1
+            if is_delayed:
+                delayed[due_offset] += 1
+        visible[task.id] = task
+        rows.setdefault(task.idea_id, []).append(
+            {
+                "id": task.id,
+                "title": task.title,
+                "status": task.status,
+                "importance": task.importance,
+                "bar": bar,
+                "due": due_offset,
+                "delayed": is_delayed,
+            }
+        )
+
+    edges: list[dict] = []
+    for task in visible.values():
+        for dependency_id in task.dependencies:
+            dependency = visible.get(dependency_id)
+            if dependency is None:
+                continue
+            # The dependent task starts before its prerequisite ends.
+            conflict = None not in (task.start, dependency.end) and task.start <= dependency.end
+            edges.append({"from_task_id": dependency_id, "to_task_id": task.id, "conflict": conflict})
+
+    ideas: list[dict] = []
+    for idea in plan.ideas:
+        if idea_id and idea.id != idea_id:
+            continue
+        bar = _bar(idea.start, idea.target, first, last)
+        if bar is None and idea.id not in rows:
+            continue
+        ideas.append({"id": idea.id, "title": idea.title, "status": idea.status, "bar": bar, "tasks": rows.get(idea.id, [])})
+    return {
+        "revision": plan.revision,
+        "start": month_label(first),
+        "end": month_label(last),
+        "months": [month_label(index) for index in range(first, last + 1)],
+        "current": current - first if first <= current <= last else None,
+        "buckets": [
+            {"month": month_label(first + offset), "active": active[offset], "due": due[offset], "delayed": delayed[offset]}
+            for offset in range(width)
+        ],
+        "ideas": ideas,
+        "edges": edges,
+    }
@@ -0,0 +1,83 @@
+﻿from __future__ import annotations
+
+from collections.abc import Iterator
+from dataclasses import dataclass
+import fnmatch
+from pathlib import PurePosixPath
+import tarfile
+from typing import BinaryIO
+import zipfile
+
+
+@dataclass
+class UploadEntry:
+    name: str  # base name, used as the update log title
+    body: bytes | None = None
+    skipped: str | None = None  # reason the entry was not read
+    error: str | None = None  # the upload itself could not be read (e.g. a corrupt archive)
+
+
+def _read_capped(handle: BinaryIO, max_bytes: int) -> bytes | None:
+    # Reads at most max_bytes + 1 so an oversized (or zip-bomb) entry is never fully inflated.
+    data = handle.read(max_bytes + 1)
+    return None if len(data) > max_bytes else data
+
+
+def _entry(path: str, handle_factory, pattern: str, max_bytes: int) -> UploadEntry:
+    name = PurePosixPath(path.replace("\\", "/")).name
+    if not fnmatch.fnmatch(name, pattern):
+        return UploadEntry(name or path, skipped="name does not match pattern")
+    with handle_factory() as handle:
+        body = _read_capped(handle, max_bytes)
+    if body is None:
+        return UploadEntry(name, skipped=f"larger than {max_bytes} bytes")
+    return UploadEntry(name, body)
+
+
+def read_report(filename: str, fileobj: BinaryIO, max_bytes: int) -> UploadEntry:
+    """A single uploaded report, read in one capped read (`skipped` when over `max_bytes`)."""
+    return _entry(filename, lambda: _NoClose(fileobj), "*", max_bytes)
+
+
+def iter_entries(filename: str, fileobj: BinaryIO, pattern: str, max_bytes: int) -> Iterator[UploadEntry]:
+    """Report files in one upload: the file itself, or the archive members matching `pattern`.
+
+    Members are decompressed one at a time while iterating; at most one entry (capped at
+    `max_bytes`) is held in memory. `.tar.gz` is read as a forward-only stream. `.zip` needs
+    its central directory, which the spooled upload file provides by seeking. A corrupt
+    archive ends the iteration with an `error` entry.
+    """
+    lowered = filename.lower()
+    try:
+        if lowered.endswith(".zip"):
+            with zipfile.ZipFile(fileobj) as archive:
+                for info in archive.infolist():
+                    if info.is_dir():
+                        continue
+                    yield _entry(info.filename, lambda info=info: archive.open(info), pattern, max_bytes)
+        elif lowered.endswith((".tar.gz", ".tgz")):
+            with tarfile.open(fileobj=fileobj, mode="r|gz") as archive:
+                for member in archive:
+                    if member.isdir():
+                        continue
+                    if not member.isfile():
+                        yield UploadEntry(PurePosixPath(member.name).name, skipped="not a regular file")
+                        continue
+                    yield _entry(member.name, lambda member=member: archive.extractfile(member), pattern, max_bytes)
+        else:
+            yield read_report(filename, fileobj, max_bytes)
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError) as exc:
+        yield UploadEntry(filename, error=str(exc) or type(exc).__name__)
+
+
+class _NoClose:
+    """Context manager around the upload's own file object, which FastAPI closes."""
+
+    def __init__(self, handle: BinaryIO) -> None:
+        self.handle = handle
+
+    def __enter__(self) -> BinaryIO:
+        return self.handle
+
+    def __exit__(self, *exc) -> None:
+        return None
@@ -0,0 +1,337 @@
+﻿from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+import logging
+import math
+import queue
+import threading
+import time
+
+from sqlalchemy import func, insert, select
+
+from . import metrics
+from .config import settings
+
+logger = logging.getLogger("researchos.ai")
+
+
+def current_month() -> str:
+    return datetime.utcnow().strftime("%Y-%m")
+
+
+def price_per_1m(model: str) -> tuple[float, float]:
+    """(input, output) USD per 1M tokens for `model`."""
+    if model == settings.ai_cheap_model:
+        return settings.ai_cheap_input_usd_per_1m_tokens, settings.ai_cheap_output_usd_per_1m_tokens
+    return settings.ai_input_usd_per_1m_tokens, settings.ai_output_usd_per_1m_tokens
+
+
+def cost_usd(model: str, input_tokens: int, output_tokens: int) -> float:
+    input_price, output_price = price_per_1m(model)
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+class UsageLedger:
+    """Per-call AI usage, persisted to `ai_usage` by a background writer.
+
+    Request threads only enqueue: a summarize call made inside an open write transaction
+    (bulk ingest) must not wait on a second connection for the SQLite write lock.
+    Month-to-date spend is the table's total plus this process's unflushed calls. The total is
+    re-read every `ai_usage_refresh_seconds`, so the API and every job worker process see each
+    other's spend and enforce one shared budget.
+    """
+
+    def __init__(self, flush_interval_s: float = 2.0, batch_size: int = 200) -> None:
+        self.flush_interval_s = flush_interval_s
+        self.batch_size = batch_size
+        self._pending: queue.Queue[dict] = queue.Queue()
+        self._spent: dict[str, float] = {}
+        self._loaded_at: dict[str, float] = {}
+        self._flushing: list[dict] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def record(
+        self,
+        provider: str,
+        model: str,
+        outcome: str,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        latency_ms: float = 0.0,
+        operation: str = "summarize",
+    ) -> float:
+        cost = cost_usd(model, input_tokens, output_tokens)
+        now = datetime.utcnow()
+        month = now.strftime("%Y-%m")
+        with self._lock:
+            self._spent[month] = self._spent.get(month, 0.0) + cost
+        metrics.record_ai_tokens(input_tokens, output_tokens)
+        self._pending.put(
+            {
+                "month": month,
+                "provider": provider,
+                "model": model,
+                "operation": operation,
+                "outcome": outcome,
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "cost_usd": cost,
+                "latency_ms": int(latency_ms),
+                "created_at": now,
+            }
+        )
+        self._ensure_writer()
+        return cost
+
+    def month_to_date(self, month: str | None = None) -> float:
+        month = month or current_month()
+        with self._lock:
+            loaded_at = self._loaded_at.get(month)
+        if loaded_at is None or time.monotonic() - loaded_at >= settings.ai_usage_refresh_seconds:
+            try:
+                self.load(month)
+            except Exception:
+                # Keep deciding on the last known total; the next call retries.
+                logger.warning("ai usage refresh failed", exc_info=True)
+        with self._lock:
+            return self._spent.get(month, 0.0)
+
+    def load(self, month: str | None = None) -> None:
+        """(Re)read month-to-date spend from the table: every process's flushed calls."""
+        from .db import SessionLocal
+        from .models import AIUsage
+
+        month = month or current_month()
+        with SessionLocal() as db:
+            spent = db.scalar(select(func.coalesce(func.sum(AIUsage.cost_usd), 0.0)).where(AIUsage.month == month))
+        with self._lock:
+            # Entries recorded here but not committed yet are still only in memory. A batch committed
+            # between the SELECT and this point is counted twice until the next refresh.
+            unflushed = [*self._flushing, *list(self._pending.queue)]
+            pending = sum(row["cost_usd"] for row in unflushed if row["month"] == month)
+            self._spent[month] = float(spent or 0.0) + pending
+            self._loaded_at[month] = time.monotonic()
+
+    def flush(self) -> int:
+        from .db import SessionLocal
+        from .models import AIUsage, new_id
+
+        with self._flush_lock:
+            rows: list[dict] = []
+            while True:
+                try:
+                    rows.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            if not rows:
+                return 0
+            for row in rows:
+                row["id"] = new_id()
+            with self._lock:
+                self._flushing = rows
+            try:
+                with SessionLocal() as db:
+                    for offset in range(0, len(rows), self.batch_size):
+                        db.execute(insert(AIUsage), rows[offset : offset + self.batch_size])
+                    db.commit()
+            except Exception:
+                logger.exception("ai usage flush failed; %d rows re-queued", len(rows))
+                for row in rows:
+                    self._pending.put(row)
+                return 0
+            finally:
+                with self._lock:
+                    self._flushing = []
+            return len(rows)
+
+    def _loop(self) -> None:
+        while True:
+            time.sleep(self.flush_interval_s)
+            self.flush()
+
+    def _ensure_writer(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="researchos-ai-usage", daemon=True)
+                self._thread.start()
+
+
+ledger = UsageLedger()
+
+
+class TokenBucket:
+    """Requests-per-minute and tokens-per-minute budget; `acquire` waits for capacity.
+
+    A rate of 0 disables that dimension.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float) -> None:
+        self.request_rate = requests_per_minute / 60.0
+        self.token_rate = tokens_per_minute / 60.0
+        # 10 s worth of burst
+        self.request_capacity = max(1.0, requests_per_minute / 6) if requests_per_minute > 0 else math.inf
+        self.token_capacity = max(1.0, tokens_per_minute / 6) if tokens_per_minute > 0 else math.inf
+        self._requests = self.request_capacity
+        self._tokens = self.token_capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.request_capacity, self._requests + elapsed * self.request_rate)
+        self._tokens = min(self.token_capacity, self._tokens + elapsed * self.token_rate)
+
+    def acquire(self, tokens: int, timeout_s: float) -> bool:
+        tokens = min(tokens, self.token_capacity)
+        deadline = time.monotonic() + timeout_s
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return True
+                wait = max(
+                    (1 - self._requests) / self.request_rate if self.request_rate else 1.0,
+                    (tokens - self._tokens) / self.token_rate if self.token_rate else 1.0,
+                    0.01,
+                )
+            if now + wait > deadline:
+                return False
+            time.sleep(min(wait, 1.0))
+
+    def settle(self, estimated: int, actual: int) -> None:
+        """Correct the token balance once the real usage of a call is known."""
+        with self._lock:
+            self._tokens = min(self.token_capacity, self._tokens + estimated - actual)
+
+
+class AdaptiveConcurrency:
+    """AIMD limit on in-flight provider calls: halve on 429, grow by ~1 per window of successes."""
+
+    def __init__(self, maximum: int, minimum: int = 1) -> None:
+        self.maximum = maximum
+        self.minimum = minimum
+        self.limit = float(maximum)
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout_s: float) -> bool:
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.in_flight < int(self.limit), timeout_s):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, throttled: bool = False) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(float(self.minimum), self.limit / 2)
+            else:
+                self.limit = min(float(self.maximum), self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+
+bucket = TokenBucket(settings.ai_requests_per_minute, settings.ai_tokens_per_minute)
+concurrency = AdaptiveConcurrency(settings.ai_max_concurrency)
+
+
+@dataclass
+class BudgetDecision:
+    action: str  # full | cheap | local
+    model: str
+    spent_usd: float
+    budget_usd: float
+
+
+def budget_decision(usage_ledger: UsageLedger | None = None) -> BudgetDecision:
+    """Degrade as spend approaches AI_MONTHLY_BUDGET_USD: cheaper model first, then local only."""
+    spent = (usage_ledger or ledger).month_to_date()
+    budget = settings.ai_monthly_budget_usd
+    ratio = spent / budget if budget > 0 else float("inf")
+    if ratio >= settings.ai_budget_local_ratio:
+        return BudgetDecision("local", "", spent, budget)
+    if ratio >= settings.ai_budget_cheap_ratio and settings.ai_cheap_model:
+        return BudgetDecision("cheap", settings.ai_cheap_model, spent, budget)
+    return BudgetDecision("full", settings.openai_model, spent, budget)
+
+
+def _ai_budget_samples() -> list[tuple[metrics.LabelValues, float]]:
+    spent = ledger.month_to_date()
+    budget = settings.ai_monthly_budget_usd
+    return [
+        (("budget",), budget),
+        (("spent",), spent),
+        (("remaining",), max(0.0, budget - spent)),
+    ]
+
+
+metrics.registry.register(
+    metrics.Gauge(
+        "researchos_ai_budget_usd",
+        "Monthly AI budget, month-to-date spend from the usage ledger and remainder.",
+        _ai_budget_samples,
+        ("kind",),
+    )
+)
+metrics.registry.register(
+    metrics.Gauge(
+        "researchos_ai_concurrency_limit",
+        "Adaptive limit on in-flight AI provider calls.",
+        lambda: [((), float(int(concurrency.limit)))],
+    )
+)
+
+
+def monthly_report(db, month: str) -> dict:
+    """Totals for `month` from the ledger, broken down by model, outcome and day."""
+    from .models import AIUsage
+
+    ledger.flush()
+    columns = (
+        func.count(AIUsage.id),
+        func.coalesce(func.sum(AIUsage.input_tokens), 0),
+        func.coalesce(func.sum(AIUsage.output_tokens), 0),
+        func.coalesce(func.sum(AIUsage.cost_usd), 0.0),
+        func.coalesce(func.avg(AIUsage.latency_ms), 0.0),
+    )
+
+    def bucket(key, row) -> dict:
+        calls, input_tokens, output_tokens, cost, latency = row
+        return {
+            "key": str(key),
+            "calls": calls,
+            "input_tokens": int(input_tokens),
+            "output_tokens": int(output_tokens),
+            "cost_usd": round(float(cost), 6),
+            "avg_latency_ms": round(float(latency), 1),
+        }
+
+    def grouped(key_column) -> list[dict]:
+        rows = db.execute(
+            select(key_column, *columns).where(AIUsage.month == month).group_by(key_column).order_by(key_column)
+        ).all()
+        return [bucket(row[0], row[1:]) for row in rows]
+
+    totals = bucket(month, db.execute(select(*columns).where(AIUsage.month == month)).one())
+    budget = settings.ai_monthly_budget_usd
+    return {
+        "month": month,
+        "budget_usd": budget,
+        "spent_usd": totals["cost_usd"],
+        "remaining_usd": round(max(0.0, budget - totals["cost_usd"]), 6),
+        "degradation": budget_decision().action if month == current_month() else "full",
+        "concurrency_limit": int(concurrency.limit),
+        "totals": totals,
+        "by_model": grouped(AIUsage.model),
+        "by_outcome": grouped(AIUsage.outcome),
+        "by_day": grouped(func.date(AIUsage.created_at)),
+    }
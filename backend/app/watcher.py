@@ -0,0 +1,266 @@
+﻿from __future__ import annotations
+
+from collections import Counter
+from datetime import datetime
+import fnmatch
+import logging
+import os
+from pathlib import Path
+import stat as stat_module
+import threading
+import time
+
+from sqlalchemy import select
+
+from .bodies import body_hash
+from .config import settings
+from .db import SessionLocal
+from .models import Idea, UpdateLog, WatchedFile
+from .services import build_update_log, extract_report_date, refresh_update_log
+
+logger = logging.getLogger("researchos.watcher")
+
+_Stat = tuple[int, int]  # (st_mtime_ns, st_size)
+
+
+def _stat(path: str) -> _Stat | None:
+    try:
+        info = os.stat(path)
+    except OSError:
+        return None
+    if not stat_module.S_ISREG(info.st_mode):
+        return None
+    return info.st_mtime_ns, info.st_size
+
+
+class ReportWatcher:
+    """Ingests report files in `directory` as they are created or edited.
+
+    Change detection uses OS file events through `watchfiles` (inotify, FSEvents, ...) when it
+    is installed, and a stat scan every `poll_seconds` otherwise. Events for the same file are
+    coalesced, and a file is only read once its mtime is `debounce` seconds old, so a report
+    that is still being written is picked up once, after the last write.
+
+    The stat each file had when it was last ingested is stored in `watched_files`. On start,
+    a stat-only scan is compared against it and only new or changed files are read.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        pattern: str,
+        idea_id: str,
+        debounce: float = 2.0,
+        poll_seconds: float = 5.0,
+        force_polling: bool = False,
+        batch_size: int = 25,
+    ) -> None:
+        self.directory = str(directory.resolve())
+        self.pattern = pattern
+        self.idea_id = idea_id
+        self.debounce = debounce
+        self.poll_seconds = poll_seconds
+        self.force_polling = force_polling
+        self.batch_size = batch_size
+        self.counts: Counter[str] = Counter()
+        self._known: dict[str, _Stat] = {}  # stat as last ingested, mirrors watched_files
+        self._pending: set[str] = set()
+        self._workspace_id: str | None = None
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_settings(cls) -> ReportWatcher:
+        return cls(
+            Path(settings.reports_dir),
+            settings.reports_pattern,
+            settings.watch_idea_id,
+            debounce=settings.watch_debounce_seconds,
+            poll_seconds=settings.watch_poll_seconds,
+            force_polling=settings.watch_force_polling,
+            batch_size=settings.upload_batch_size,
+        )
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _matches(self, path: str) -> bool:
+        # Like the bulk ingest glob: files directly in the directory, matched on the base name.
+        parent, name = os.path.split(path)
+        return parent == self.directory and fnmatch.fnmatch(name, self.pattern)
+
+    def _scan(self) -> dict[str, _Stat]:
+        found: dict[str, _Stat] = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not fnmatch.fnmatch(entry.name, self.pattern) or not entry.is_file():
+                    continue
+                info = entry.stat()
+                found[os.path.join(self.directory, entry.name)] = (info.st_mtime_ns, info.st_size)
+        return found
+
+    def load_checkpoint(self) -> None:
+        with SessionLocal() as db:
+            idea = db.get(Idea, self.idea_id)
+            if idea is None:
+                raise ValueError(f"Idea not found: {self.idea_id}")
+            self._workspace_id = idea.workspace_id
+            rows = db.execute(
+                select(WatchedFile.path, WatchedFile.mtime_ns, WatchedFile.size).where(WatchedFile.idea_id == self.idea_id)
+            )
+            self._known = {path: (mtime_ns, size) for path, mtime_ns, size in rows if self._matches(path)}
+
+    def _observe(self, paths) -> None:
+        for path in paths:
+            if self._known.get(path) == _stat(path):
+                self._pending.discard(path)
+            else:
+                self._pending.add(path)
+
+    def _take_settled(self) -> list[str]:
+        settled: list[str] = []
+        cutoff_ns = time.time_ns() - int(self.debounce * 1e9)
+        for path in list(self._pending):
+            current = _stat(path)
+            if current is None or self._known.get(path) == current:
+                self._pending.discard(path)
+            elif current[0] <= cutoff_ns:
+                self._pending.discard(path)
+                settled.append(path)
+        return sorted(settled)
+
+    def sync(self, paths: list[str]) -> Counter[str]:
+        """Read `paths` and create or refresh their update logs; commits per `batch_size` files."""
+        counts: Counter[str] = Counter()
+        for start in range(0, len(paths), self.batch_size):
+            batch = paths[start : start + self.batch_size]
+            ingested: dict[str, _Stat] = {}
+            with SessionLocal() as db:
+                checkpoints = {row.path: row for row in db.scalars(select(WatchedFile).where(WatchedFile.path.in_(batch)))}
+                for path in batch:
+                    # Stat before reading: a write that lands mid-read changes the stat and is seen again.
+                    current = _stat(path)
+                    if current is None:
+                        continue
+                    try:
+                        body_md = Path(path).read_text(encoding="utf-8", errors="replace")
+                    except OSError as exc:
+                        logger.warning("could not read %s: %s", path, exc)
+                        continue
+                    title = os.path.basename(path)
+                    checkpoint = checkpoints.get(path)
+                    log = db.get(UpdateLog, checkpoint.log_id) if checkpoint and checkpoint.log_id else None
+                    if log is None or log.idea_id != self.idea_id:
+                        log = db.scalar(
+                            select(UpdateLog).where(
+                                UpdateLog.workspace_id == self._workspace_id,
+                                UpdateLog.idea_id == self.idea_id,
+                                UpdateLog.title == title,
+                            )
+                        )
+                    if log is None:
+                        log = build_update_log(
+                            self._workspace_id, self.idea_id, "daily_report", title, body_md, extract_report_date(title)
+                        )
+                        db.add(log)
+                        db.flush()
+                        counts["imported"] += 1
+                    elif log.body_hash != body_hash(body_md):
+                        refresh_update_log(log, body_md)
+                        counts["updated"] += 1
+                    else:
+                        counts["unchanged"] += 1
+                    if checkpoint is None:
+                        checkpoint = WatchedFile(path=path, idea_id=self.idea_id)
+                        db.add(checkpoint)
+                    checkpoint.idea_id = self.idea_id
+                    checkpoint.mtime_ns, checkpoint.size = current
+                    checkpoint.log_id = log.id
+                    checkpoint.ingested_at = datetime.utcnow()
+                    ingested[path] = current
+                db.commit()
+            self._known.update(ingested)
+        self.counts.update(counts)
+        return counts
+
+    def _flush(self) -> None:
+        settled = self._take_settled()
+        if not settled:
+            return
+        try:
+            counts = self.sync(settled)
+        except Exception:
+            # Not checkpointed: the files stay "changed" and are retried on the next pass.
+            logger.exception("report sync failed for %d files", len(settled))
+            self._pending.update(settled)
+            return
+        logger.info("reports synced: %s", dict(counts))
+
+    def catch_up(self) -> None:
+        """Stat-only comparison against the checkpoint; reads only what changed while stopped."""
+        self._observe(path for path, current in self._scan().items() if self._known.get(path) != current)
+        self._flush()
+
+    def _watch_events(self) -> bool:
+        try:
+            from watchfiles import watch
+        except ImportError:
+            return False
+        logger.info("watching %s for %s (file events)", self.directory, self.pattern)
+        try:
+            for changes in watch(
+                self.directory,
+                watch_filter=lambda _change, path: self._matches(path),
+                debounce=int(self.debounce * 1000),
+                stop_event=self._stop,
+                rust_timeout=int(self.poll_seconds * 1000),
+                yield_on_timeout=True,  # empty batches let deferred files settle
+                recursive=False,
+                raise_interrupt=False,
+            ):
+                self._observe(path for _change, path in changes)
+                self._flush()
+        except OSError as exc:
+            logger.warning("file events unavailable for %s (%s); polling instead", self.directory, exc)
+            return False
+        return True
+
+    def _watch_polling(self) -> None:
+        logger.info("watching %s for %s (polling every %.1fs)", self.directory, self.pattern, self.poll_seconds)
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                scanned = self._scan()
+            except OSError as exc:
+                logger.warning("could not scan %s: %s", self.directory, exc)
+                continue
+            self._observe(path for path, current in scanned.items() if self._known.get(path) != current)
+            self._flush()
+
+    def run(self) -> None:
+        try:
+            self.load_checkpoint()
+            self.catch_up()
+        except Exception:
+            logger.exception("report watcher failed to start")
+            return
+        if self.force_polling or not self._watch_events():
+            self._watch_polling()
+
+
+_inline: ReportWatcher | None = None
+
+
+def start_inline_watcher() -> None:
+    """Watcher thread in the API process (WATCH_REPORTS_ENABLED); run one per deployment."""
+    global _inline
+    if _inline is not None or not settings.watch_reports_enabled:
+        return
+    if not settings.watch_idea_id:
+        logger.warning("WATCH_REPORTS_ENABLED is set without WATCH_IDEA_ID; not watching")
+        return
+    _inline = ReportWatcher.from_settings()
+    threading.Thread(target=_inline.run, name="researchos-watcher", daemon=True).start()
+
+
+def stop_inline_watcher() -> None:
+    if _inline is not None:
+        _inline.stop()
@@ -0,0 +1,43 @@
+﻿from __future__ import annotations
+
+from sqlalchemy import update
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from .changes import TRACKED_ENTITIES, allocate_revision
+from .events import record_change
+from .models import live_idea_ids
+
+
+def can_return(db: Session) -> bool:
+    """UPDATE ... RETURNING is available (PostgreSQL, SQLite >= 3.35)."""
+    return db.get_bind().dialect.update_returning
+
+
+def update_returning(db: Session, model: type, workspace_id: str, row_id: str, values: dict) -> Row | None:
+    """Guarded single-statement update of one row: the new row, or None if it is not in the workspace
+    (or belongs to a deleted idea).
+
+    `UPDATE ... WHERE id AND workspace_id RETURNING *` replaces the load, the UPDATE and the
+    refresh of the ORM path. ORM flush events do not run, so this does what they would for
+    a plain column edit: stamps a new revision and queues the change event. Use it only for
+    columns nothing else is derived from (e.g. not the inputs of the priority score).
+    On a miss the transaction is rolled back, which also undoes the revision bump.
+    """
+    table = model.__table__
+    revision = allocate_revision(db.connection(), workspace_id)
+    row = db.execute(
+        update(table)
+        .where(
+            table.c.id == row_id,
+            table.c.workspace_id == workspace_id,
+            table.c.idea_id.in_(live_idea_ids(workspace_id)),
+        )
+        .values(**values, revision=revision)
+        .returning(*table.c)
+    ).first()
+    if row is None:
+        db.rollback()
+        return None
+    record_change(db, workspace_id, revision, TRACKED_ENTITIES[model], row.id, "update", row.idea_id)
+    return row
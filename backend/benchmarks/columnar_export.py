@@ -0,0 +1,131 @@
+﻿"""Analytics export: JSON `/export/workspace` vs the Parquet / Arrow IPC columnar export.
+
+Runs the exports in-process against a generated workspace and reports, per format, the
+download size, the export latency and the time to load every table into Arrow tables (the
+JSON is parsed and converted with `pa.Table.from_pylist`, which is what a dataframe load does).
+
+    python -m benchmarks.columnar_export
+    python -m benchmarks.columnar_export --preset medium --requests 5 --out columnar.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+from pathlib import Path
+import tempfile
+import time
+import zipfile
+
+from .report import Measurement, build_report, print_table, write_report
+from .workload import PRESETS
+
+SECTIONS = ("ideas", "tasks", "deliverables", "update_logs")
+
+
+def load_json(payload: bytes) -> dict:
+    import pyarrow as pa
+
+    export = json.loads(payload)
+    tables = {name: pa.Table.from_pylist(export[name]) for name in SECTIONS}
+    # Checklist items only exist nested in the logs; flatten them as an analysis would.
+    items = [dict(item, log_id=log["id"]) for log in export["update_logs"] for item in log.get("checklist_items", [])]
+    tables["checklist_items"] = pa.Table.from_pylist(items)
+    return tables
+
+
+def load_columnar(payload: bytes, fmt: str) -> dict:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    tables = {}
+    with zipfile.ZipFile(io.BytesIO(payload)) as archive:
+        for name in archive.namelist():
+            data = archive.read(name)
+            if fmt == "parquet":
+                tables[name.split(".")[0]] = pq.read_table(io.BytesIO(data))
+            else:
+                tables[name.split(".")[0]] = pa.ipc.open_file(pa.BufferReader(data)).read_all()
+    return tables
+
+
+def run_format(fmt: str, client, headers: dict, requests: int) -> Measurement:
+    url = "/export/workspace" if fmt == "json" else f"/export/workspace/columnar?format={fmt}"
+    client.get(url, headers=headers)  # warm-up, not recorded
+    measurement = Measurement(name=f"export {fmt}", extra={"format": fmt})
+    payload = b""
+    started = time.perf_counter()
+    for _ in range(requests):
+        t0 = time.perf_counter()
+        response = client.get(url, headers=headers)
+        if response.status_code != 200:
+            measurement.errors += 1
+            continue
+        measurement.samples_ms.append((time.perf_counter() - t0) * 1000)
+        payload = response.content
+    measurement.wall_s = time.perf_counter() - started
+    if not payload:
+        return measurement
+    loads = []
+    for _ in range(requests):
+        t0 = time.perf_counter()
+        tables = load_json(payload) if fmt == "json" else load_columnar(payload, fmt)
+        loads.append((time.perf_counter() - t0) * 1000)
+    measurement.extra["bytes"] = len(payload)
+    measurement.extra["load_ms"] = round(min(loads), 2)
+    measurement.extra["rows"] = sum(table.num_rows for table in tables.values())
+    measurement.extra["arrow_bytes"] = sum(table.nbytes for table in tables.values())
+    return measurement
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--requests", type=int, default=3, help="exports and loads per format")
+    parser.add_argument("--formats", nargs="+", choices=["json", "parquet", "arrow"], default=["json", "parquet", "arrow"])
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise SystemExit("this benchmark needs the optional `pyarrow` package")
+
+    workdir = Path(tempfile.mkdtemp(prefix="researchos-columnar-bench-"))
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir / 'columnar.db'}"
+    os.environ.setdefault("JOBS_INLINE_WORKER", "false")
+    os.environ.setdefault("REQUEST_LOG_ENABLED", "false")
+
+    from .endpoints import prepare_database
+
+    prepare_database(PRESETS[args.preset], reset=True)
+
+    from fastapi.testclient import TestClient
+
+    from app.config import settings
+    from app.main import app
+
+    measurements: list[Measurement] = []
+    with TestClient(app) as client:
+        login = client.post("/auth/login", json={"email": settings.owner_email, "password": settings.owner_password})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+        for fmt in args.formats:
+            measurements.append(run_format(fmt, client, headers, args.requests))
+
+    config = {"preset": args.preset, "requests": args.requests, "compression": settings.columnar_compression}
+    report = build_report("columnar_export", config, measurements)
+    print_table(report)
+    print()
+    print(f"{'format':<10} {'download MB':>12} {'export p50 ms':>14} {'load ms':>10} {'rows':>10} {'in-memory MB':>13}")
+    for row in report["results"]:
+        print(
+            f"{row['format']:<10} {row.get('bytes', 0) / 1e6:>12.2f} {row['p50_ms']:>14.1f} "
+            f"{row.get('load_ms', 0.0):>10.1f} {row.get('rows', 0):>10} {row.get('arrow_bytes', 0) / 1e6:>13.2f}"
+        )
+    if args.out:
+        write_report(report, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+﻿"""SQLite write-concurrency benchmark: engine profiles side by side.
+
+Each profile gets a fresh database file. Writer threads run short ORM transactions shaped like
+the API's (existence SELECT, INSERT of an update log, revision bump, commit) while reader threads
+page through update logs. Reports commit latency, throughput and "database is locked" failures.
+
+    python -m benchmarks.db_write_concurrency
+    python -m benchmarks.db_write_concurrency --writers 16 --readers 8 --profiles legacy default --out write.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+from pathlib import Path
+import tempfile
+import threading
+import time
+
+from .report import Measurement, build_report, print_table, write_report
+
+
+def run_profile(profile_name: str, args: argparse.Namespace, workdir: Path) -> list[Measurement]:
+    from sqlalchemy import func, select
+    from sqlalchemy.exc import OperationalError
+    from sqlalchemy.orm import sessionmaker
+
+    from app import changes  # noqa: F401  (revision listeners, as in the API)
+    from app.config import DB_PROFILES
+    from app.db import Base, build_engine
+    from app.models import Idea, UpdateLog, Workspace
+
+    db_path = workdir / f"write_{profile_name}.db"
+    url = f"sqlite:///{db_path}"
+    engine = build_engine(url, dict(DB_PROFILES[profile_name]))
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    with Session() as db:
+        workspace = Workspace(name="bench")
+        db.add(workspace)
+        db.flush()
+        idea = Idea(
+            workspace_id=workspace.id,
+            title="bench",
+            status="in_progress",
+            start_month="2026-01",
+            target_month="2026-12",
+            priority_inputs={},
+        )
+        db.add(idea)
+        db.commit()
+        workspace_id, idea_id = workspace.id, idea.id
+
+    body = "- [x] benchmark line with enough text to look like a report\n" * 40
+    writes = Measurement(name=f"{profile_name}: write txn")
+    reads = Measurement(name=f"{profile_name}: read page")
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def writer(worker: int) -> None:
+        for n in range(args.transactions):
+            started = time.perf_counter()
+            try:
+                with Session() as db:
+                    db.scalar(select(Idea).where(Idea.id == idea_id, Idea.workspace_id == workspace_id))
+                    db.add(
+                        UpdateLog(
+                            workspace_id=workspace_id,
+                            idea_id=idea_id,
+                            source="bench",
+                            title=f"w{worker}-{n}",
+                            body_md=body,
+                            ai_summary="",
+                            ai_tags=[],
+                            ai_risk_flags=[],
+                        )
+                    )
+                    db.commit()
+            except OperationalError:
+                with lock:
+                    writes.errors += 1
+                continue
+            with lock:
+                writes.samples_ms.append((time.perf_counter() - started) * 1000)
+
+    def reader() -> None:
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                with Session() as db:
+                    db.scalar(select(func.count(UpdateLog.id)).where(UpdateLog.workspace_id == workspace_id))
+                    db.scalars(
+                        select(UpdateLog)
+                        .where(UpdateLog.workspace_id == workspace_id)
+                        .order_by(UpdateLog.created_at.desc())
+                        .limit(50)
+                    ).all()
+            except OperationalError:
+                with lock:
+                    reads.errors += 1
+                continue
+            with lock:
+                reads.samples_ms.append((time.perf_counter() - started) * 1000)
+
+    readers = [threading.Thread(target=reader) for _ in range(args.readers)]
+    writers = [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+    started = time.perf_counter()
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    writes.wall_s = time.perf_counter() - started
+    stop.set()
+    for thread in readers:
+        thread.join()
+    reads.wall_s = time.perf_counter() - started
+    engine.dispose()
+
+    for measurement in (writes, reads):
+        measurement.extra["profile"] = profile_name
+    writes.extra["attempted"] = args.writers * args.transactions
+    return [writes, reads]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", default=["legacy", "default"])
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--transactions", type=int, default=200, help="per writer")
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+
+    # The comparison builds its own engines; keep the app engine off the real database.
+    workdir = Path(tempfile.mkdtemp(prefix="researchos-writebench-"))
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{workdir / 'unused.db'}")
+
+    measurements: list[Measurement] = []
+    for profile_name in args.profiles:
+        measurements.extend(run_profile(profile_name, args, workdir))
+
+    config = {"writers": args.writers, "readers": args.readers, "transactions": args.transactions}
+    report = build_report("db_write_concurrency", config, measurements)
+    print_table(report)
+    for row in report["results"]:
+        if "attempted" in row:
+            print(f"{row['profile']}: {row['count']}/{row['attempted']} commits, {row['errors']} lock errors")
+    if args.out:
+        write_report(report, args.out)
+
+
+if __name__ == "__main__":
+    main()
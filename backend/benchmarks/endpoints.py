@@ -0,0 +1,261 @@
+﻿"""Endpoint latency/throughput benchmark.
+
+Examples (run from backend/):
+
+    python -m benchmarks.endpoints --preset small
+    python -m benchmarks.endpoints --preset medium --target uvicorn --out bench.json
+    python -m benchmarks.endpoints --preset medium --database-url postgresql://localhost/researchos_bench --target uvicorn
+    python -m benchmarks.endpoints --target http://127.0.0.1:8000 --no-generate --baseline bench.json
+"""
+
+from __future__ import annotations
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import json
+import os
+from pathlib import Path
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Iterator
+
+from .report import Measurement, build_report, compare_reports, print_table, write_report
+from .workload import PRESETS, WorkloadSpec, write_report_files
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_BENCH_DB = "sqlite:///./bench.db"
+
+
+def prepare_database(spec: WorkloadSpec, reset: bool) -> dict[str, int]:
+    # Imported late: app.config reads DATABASE_URL from the environment at import time.
+    from app.changes import TRACKED_ENTITIES  # noqa: F401  (registers revision listeners)
+    from app.db import Base, SessionLocal, engine
+    from app.services import ensure_owner_context
+
+    from .workload import generate_workspace
+
+    if engine.url.render_as_string(hide_password=False) != os.environ["DATABASE_URL"]:
+        raise SystemExit(f"engine is bound to {engine.url!r}, not the bench database; refusing to reset it")
+    if reset:
+        Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        _, workspace, _ = ensure_owner_context(db)
+        started = time.perf_counter()
+        counts = generate_workspace(db, workspace.id, spec)
+        print(f"generated {counts} in {time.perf_counter() - started:.1f}s")
+    engine.dispose()
+    return counts
+
+
+@contextmanager
+def open_client(target: str, database_url: str, port: int) -> Iterator:
+    if target == "inprocess":
+        from fastapi.testclient import TestClient
+
+        from app.main import app
+
+        with TestClient(app) as client:
+            yield client
+        return
+
+    import httpx
+
+    if target != "uvicorn":
+        with httpx.Client(base_url=target, timeout=300) as client:
+            yield client
+        return
+
+    with socket.socket() as probe:
+        if probe.connect_ex(("127.0.0.1", port)) == 0:
+            raise SystemExit(f"port {port} is already in use; pass --port")
+
+    env = {**os.environ, "DATABASE_URL": database_url}
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        with httpx.Client(base_url=base_url, timeout=300) as client:
+            deadline = time.monotonic() + 60
+            while True:
+                try:
+                    if client.get("/ready").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline or proc.poll() is not None:
+                    raise SystemExit("uvicorn did not become healthy")
+                time.sleep(0.2)
+            yield client
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def run_scenario(name: str, make_request, iterations: int, concurrency: int) -> Measurement:
+    measurement = Measurement(name=name)
+
+    def one(i: int) -> None:
+        started = time.perf_counter()
+        try:
+            response = make_request(i)
+            ok = response.status_code < 400
+        except Exception:
+            ok = False
+        elapsed = (time.perf_counter() - started) * 1000
+        if ok:
+            measurement.samples_ms.append(elapsed)
+        else:
+            measurement.errors += 1
+
+    make_request(0)  # warm-up, not recorded
+    started = time.perf_counter()
+    if concurrency <= 1:
+        for i in range(iterations):
+            one(i)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(one, range(iterations)))
+    measurement.wall_s = time.perf_counter() - started
+    return measurement
+
+
+def run_suite(client, args: argparse.Namespace, spec: WorkloadSpec) -> list[Measurement]:
+    from app.config import settings
+
+    login = client.post("/auth/login", json={"email": settings.owner_email, "password": settings.owner_password})
+    if login.status_code != 200:
+        raise SystemExit(f"login failed: {login.status_code} {login.text}")
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    ideas = client.get("/ideas", headers=headers).json()
+    if not ideas:
+        raise SystemExit("workspace has no ideas; run without --no-generate")
+    idea_ids = [item["id"] for item in ideas]
+    month = f"{spec.start_year + spec.report_years - 1}-06"
+    n, c = args.requests, args.concurrency
+    heavy = max(3, n // 5)
+
+    def get(path: str):
+        return lambda i: client.get(path, headers=headers)
+
+    def per_idea(template: str):
+        return lambda i: client.get(template.format(idea_id=idea_ids[i % len(idea_ids)]), headers=headers)
+
+    results = [
+        run_scenario("GET /dashboard/overview", get(f"/dashboard/overview?month={month}"), n, c),
+        run_scenario("GET /ideas", get("/ideas"), n, c),
+        run_scenario("GET /tasks", get("/tasks"), n, c),
+        run_scenario("GET /update_logs?limit=50", get("/update_logs?limit=50"), n, c),
+        run_scenario("GET /ideas/{id}/risks", per_idea("/ideas/{idea_id}/risks?month=" + month), n, c),
+        run_scenario("GET /ideas/{id}/next_actions", per_idea("/ideas/{idea_id}/next_actions?month=" + month), n, c),
+        run_scenario("GET /ideas/{id}/progress", per_idea("/ideas/{idea_id}/progress"), n, c),
+        run_scenario("GET /export/workspace", get("/export/workspace"), heavy, 1),
+    ]
+
+    if args.bulk_files:
+        reports_dir = Path(tempfile.mkdtemp(prefix="researchos-bench-"))
+        write_report_files(spec, reports_dir, limit=args.bulk_files)
+
+        # A fresh idea per call (plus the warm-up) so the title dedup never short-circuits the ingest.
+        bulk_ideas = [
+            client.post(
+                "/ideas",
+                headers=headers,
+                json={
+                    "title": f"bench-bulk-{time.time_ns()}-{i}",
+                    "start_month": "2026-01",
+                    "target_month": "2026-12",
+                    "priority_inputs": {"impact": 3, "effort": 3, "risk": 3, "urgency": 3},
+                },
+            ).json()["id"]
+            for i in range(heavy + 1)
+        ]
+        next_idea = iter(bulk_ideas)
+
+        def bulk(i: int):
+            # Enqueue, then poll the job: the sample is the time until the ingest has finished.
+            response = client.post(
+                "/ingest/daily_reports/bulk",
+                headers=headers,
+                params={"idea_id": next(next_idea), "reports_dir": str(reports_dir), "pattern": "Daily_Report_*.md"},
+            )
+            if response.status_code != 202:
+                return response
+            job_url = f"/jobs/{response.json()['id']}"
+            while True:
+                response = client.get(job_url, headers=headers)
+                if response.status_code != 200 or response.json()["status"] == "succeeded":
+                    return response
+                if response.json()["status"] == "failed":
+                    raise RuntimeError(response.json()["error"])
+                time.sleep(0.05)
+
+        measurement = run_scenario("POST /ingest/daily_reports/bulk", bulk, heavy, 1)
+        measurement.extra["files_per_call"] = args.bulk_files
+        results.append(measurement)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--seed", type=int, default=None, help="override the preset RNG seed")
+    parser.add_argument("--target", default="inprocess", help="inprocess | uvicorn | http://host:port")
+    parser.add_argument("--database-url", default=os.environ.get("BENCH_DATABASE_URL", DEFAULT_BENCH_DB))
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--requests", type=int, default=50, help="iterations per read scenario")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--bulk-files", type=int, default=30, help="report files per bulk ingest call (0 skips)")
+    parser.add_argument("--no-generate", action="store_true", help="reuse the data already in the database")
+    parser.add_argument("--out", type=Path, default=None, help="write machine-readable JSON results here")
+    parser.add_argument("--baseline", type=Path, default=None, help="compare p95 against a previous --out file")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    spec = PRESETS[args.preset]
+    if args.seed is not None:
+        spec = WorkloadSpec(**{**spec.as_dict(), "seed": args.seed})
+
+    if args.target != "inprocess" and args.target != "uvicorn" and not args.no_generate:
+        print("remote target: skipping data generation (pass --no-generate to silence)")
+        args.no_generate = True
+
+    os.environ["DATABASE_URL"] = args.database_url
+    if args.database_url.endswith("researchos.db") and not args.no_generate:
+        raise SystemExit("refusing to reset the application database; point --database-url at a bench DB")
+
+    counts = {} if args.no_generate else prepare_database(spec, reset=True)
+
+    with open_client(args.target, args.database_url, args.port) as client:
+        measurements = run_suite(client, args, spec)
+
+    config = {
+        "preset": args.preset,
+        "workload": spec.as_dict(),
+        "rows": counts,
+        "target": args.target,
+        "database": args.database_url.split("://", 1)[0],
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+    }
+    report = build_report("endpoints", config, measurements)
+    print_table(report)
+    if args.out:
+        write_report(report, args.out)
+    if args.baseline:
+        regressions = compare_reports(json.loads(args.baseline.read_text(encoding="utf-8")), report, tolerance=args.tolerance)
+        for line in regressions:
+            print("REGRESSION", line)
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+﻿"""Local summarizer micro-benchmark: the old line-by-line implementation vs. app/tagger.py.
+
+Generates a synthetic corpus of daily reports in memory (no database) and runs both
+implementations over it, checking that they agree (mismatches are counted as errors). Tagging is
+also compared against a single compiled alternation regex. Reports latency, reports/s and MB/s.
+
+    python -m benchmarks.local_summarizer
+    python -m benchmarks.local_summarizer --reports 20000 --sections 6 --out local.json
+"""
+
+from __future__ import annotations
+
+import argparse
+from datetime import date, timedelta
+from pathlib import Path
+import random
+import re
+import time
+
+from .report import Measurement, build_report, print_table, write_report
+from .workload import render_report
+
+
+def legacy_summarize(body_md: str) -> tuple[str, list[str]]:
+    """The implementation this benchmark replaced, kept verbatim as the baseline."""
+    lines = [line.strip() for line in body_md.splitlines() if line.strip()]
+    completed: list[str] = []
+    in_progress: list[str] = []
+    for line in lines:
+        if line.startswith("- [x]"):
+            text = line[5:].strip().strip("*").strip()
+            if len(text.split()) >= 2 or len(text) > 20:
+                completed.append(text)
+        elif line.startswith("- [/]") or line.startswith("- [ ]"):
+            text = line[5:].strip().strip("*").strip()
+            if len(text.split()) >= 2 or len(text) > 20:
+                in_progress.append(text)
+
+    parts: list[str] = []
+    if completed:
+        parts.append(f"Completed ({len(completed)}): {'; '.join(completed[:4])}")
+    if in_progress:
+        parts.append(f"In progress: {'; '.join(in_progress[:3])}")
+    if parts:
+        summary = " | ".join(parts)
+    else:
+        bullet_lines = [line for line in lines if line.startswith("- ")][:5]
+        summary = "\n".join(bullet_lines) if bullet_lines else "\n".join(lines[:5])
+
+    tags: list[str] = []
+    lowered = body_md.lower()
+    for keyword in ("rtl", "simulation", "debug", "vivado", "matlab"):
+        if keyword in lowered:
+            tags.append(keyword)
+    return summary[:1200], tags[:5]
+
+
+def alternation_tagger(tags: dict[str, list[str]]):
+    """Single compiled alternation regex over all keywords: the other candidate for the tagger."""
+    keyword_tag = {keyword.lower(): tag for tag, keywords in tags.items() for keyword in keywords or [tag]}
+    order = {tag: index for index, tag in enumerate(tags)}
+    pattern = re.compile("|".join(re.escape(keyword) for keyword in sorted(keyword_tag, key=len, reverse=True)))
+
+    def tag(text: str) -> list[str]:
+        found = {keyword_tag[match] for match in pattern.findall(text.lower())}
+        return sorted(found, key=order.__getitem__)[:5]
+
+    return tag
+
+
+def build_corpus(count: int, sections: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    start = date(2020, 1, 1)
+    return [render_report(rng, start + timedelta(days=n), sections=sections) for n in range(count)]
+
+
+def run(name: str, func, corpus: list[str], total_bytes: int) -> tuple[Measurement, list]:
+    samples: list[float] = []
+    results = []
+    started = time.perf_counter()
+    for body in corpus:
+        call_started = time.perf_counter()
+        results.append(func(body))
+        samples.append((time.perf_counter() - call_started) * 1000)
+    wall_s = time.perf_counter() - started
+    measurement = Measurement(name=name, samples_ms=samples, wall_s=wall_s)
+    measurement.extra["mb_per_s"] = round(total_bytes / wall_s / 1e6, 2)
+    return measurement, results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=100_000)
+    parser.add_argument("--sections", type=int, default=4, help="sections per report")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+
+    from app import tagger
+    from app.config import settings
+
+    corpus = build_corpus(args.reports, args.sections, args.seed)
+    total_bytes = sum(len(body.encode("utf-8")) for body in corpus)
+    print(f"corpus: {len(corpus)} reports, {total_bytes / 1e6:.1f} MB")
+
+    legacy, legacy_results = run("legacy: per-keyword scans", legacy_summarize, corpus, total_bytes)
+    compiled, compiled_results = run("tagger: single-pass parser", tagger.summarize, corpus, total_bytes)
+    tags_only, tag_results = run("tagger: tags only", tagger.tagger.tags, corpus, total_bytes)
+    regex, regex_results = run("regex alternation: tags only", alternation_tagger(settings.local_tags), corpus, total_bytes)
+    mismatches = sum(1 for before, after in zip(legacy_results, compiled_results) if before != after)
+    compiled.errors = mismatches
+    regex.errors = sum(1 for before, after in zip(tag_results, regex_results) if before != after)
+
+    config = {"reports": args.reports, "sections": args.sections, "seed": args.seed, "bytes": total_bytes}
+    report = build_report("local_summarizer", config, [legacy, compiled, tags_only, regex])
+    print_table(report)
+    for row in report["results"]:
+        print(f"{row['name']:<40} {row['mb_per_s']:>8.2f} MB/s")
+    print(f"outputs differing from legacy: {mismatches}")
+    if args.out:
+        write_report(report, args.out)
+
+
+if __name__ == "__main__":
+    main()
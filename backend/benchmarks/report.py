@@ -0,0 +1,93 @@
+﻿from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+import json
+import math
+from pathlib import Path
+import platform
+import subprocess
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile over an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), math.ceil(pct / 100 * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+
+@dataclass
+class Measurement:
+    name: str
+    samples_ms: list[float] = field(default_factory=list)
+    wall_s: float = 0.0
+    errors: int = 0
+    extra: dict = field(default_factory=dict)
+
+    def summary(self) -> dict:
+        ordered = sorted(self.samples_ms)
+        count = len(ordered)
+        return {
+            "name": self.name,
+            "count": count,
+            "errors": self.errors,
+            "mean_ms": round(sum(ordered) / count, 3) if count else 0.0,
+            "p50_ms": round(percentile(ordered, 50), 3),
+            "p95_ms": round(percentile(ordered, 95), 3),
+            "p99_ms": round(percentile(ordered, 99), 3),
+            "max_ms": round(ordered[-1], 3) if count else 0.0,
+            "throughput_rps": round(count / self.wall_s, 2) if self.wall_s else 0.0,
+            **self.extra,
+        }
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def build_report(suite: str, config: dict, measurements: list[Measurement]) -> dict:
+    return {
+        "suite": suite,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config,
+        "results": [item.summary() for item in measurements],
+    }
+
+
+def print_table(report: dict) -> None:
+    print(f"suite={report['suite']} git={report['git_revision']}")
+    header = f"{'name':<40} {'n':>6} {'err':>4} {'p50':>9} {'p95':>9} {'p99':>9} {'rps':>9}"
+    print(header)
+    print("-" * len(header))
+    for row in report["results"]:
+        print(
+            f"{row['name']:<40} {row['count']:>6} {row['errors']:>4} {row['p50_ms']:>9.2f} "
+            f"{row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f} {row['throughput_rps']:>9.1f}"
+        )
+
+
+def write_report(report: dict, path: Path) -> None:
+    path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+def compare_reports(baseline: dict, current: dict, metric: str = "p95_ms", tolerance: float = 0.2) -> list[str]:
+    """Return one line per result whose `metric` regressed by more than `tolerance` (fraction)."""
+    previous = {row["name"]: row for row in baseline.get("results", [])}
+    regressions: list[str] = []
+    for row in current.get("results", []):
+        before = previous.get(row["name"])
+        if not before or not before.get(metric):
+            continue
+        change = (row[metric] - before[metric]) / before[metric]
+        if change > tolerance:
+            regressions.append(f"{row['name']}: {metric} {before[metric]:.2f} -> {row[metric]:.2f} (+{change:.0%})")
+    return regressions
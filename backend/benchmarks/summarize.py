@@ -0,0 +1,132 @@
+﻿"""Summarization benchmark: truncated single call vs. map-reduce over cached chunks.
+
+Runs offline against the fake provider and a throwaway SQLite database. For reports of growing
+size it measures the legacy call (first 15k chars only), a cold map-reduce run, a warm re-run of
+the unchanged report and a re-run after editing one section. Reports provider calls, tokens,
+characters actually seen by the model and latency.
+
+    python -m benchmarks.summarize
+    python -m benchmarks.summarize --sizes 10 50 200 --latency-ms 300 --out summarize.json
+"""
+
+from __future__ import annotations
+
+import argparse
+from datetime import date
+import os
+from pathlib import Path
+import random
+import tempfile
+import threading
+import time
+
+from .report import Measurement, build_report, print_table, write_report
+from .workload import render_report
+
+
+def build_body(sections: int, seed: int) -> str:
+    return render_report(random.Random(seed), date(2026, 1, 1), sections=sections)
+
+
+def edit_one_section(body: str) -> str:
+    # Append a line to the last section so exactly one chunk's content changes.
+    return body.rstrip("\n") + "\n- [x] **Follow up on the edited section** (1)\n"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 25, 100, 400], help="sections per report")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="fake provider latency per call")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+
+    # Settings are read at import time: point the app at a throwaway database and lift local rate limits.
+    workdir = Path(tempfile.mkdtemp(prefix="researchos-summarizebench-"))
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir / 'summarize.db'}"
+    os.environ["AI_REQUESTS_PER_MINUTE"] = "0"
+    os.environ["AI_TOKENS_PER_MINUTE"] = "0"
+
+    from app import ai, summarizer
+    from app.config import settings
+    from app.db import Base, engine
+    from app.services import _local_tags
+
+    Base.metadata.create_all(bind=engine)
+
+    class CountingProvider(ai.FakeProvider):
+        def __init__(self, latency_ms: float) -> None:
+            super().__init__(latency_ms, 0.0, 0.0, seed=args.seed)
+            self.calls = 0
+            self.input_tokens = 0
+            self.output_tokens = 0
+            self._counter_lock = threading.Lock()
+
+        def complete(self, system: str, user: str, max_output_tokens: int, model: str) -> ai.Completion:
+            result = super().complete(system, user, max_output_tokens, model)
+            with self._counter_lock:
+                self.calls += 1
+                self.input_tokens += result.input_tokens
+                self.output_tokens += result.output_tokens
+            return result
+
+    model = settings.openai_model
+
+    def measure(name: str, body: str, run) -> Measurement:
+        provider = CountingProvider(args.latency_ms)
+        started = time.perf_counter()
+        seen_chars = run(provider, body)
+        elapsed = time.perf_counter() - started
+        return Measurement(
+            name=name,
+            samples_ms=[elapsed * 1000],
+            wall_s=elapsed,
+            extra={
+                "report_chars": len(body),
+                "seen_chars": seen_chars,
+                "calls": provider.calls,
+                "input_tokens": provider.input_tokens,
+                "output_tokens": provider.output_tokens,
+            },
+        )
+
+    def legacy(provider, body: str) -> int:
+        ai.complete(provider, summarizer.SUMMARIZE_SYSTEM_PROMPT, body[:15000], 300, model)
+        return min(len(body), 15000)
+
+    def map_reduce(provider, body: str) -> int:
+        summarizer.summarize(provider, body, model, _local_tags)
+        return len(body)
+
+    measurements: list[Measurement] = []
+    for sections in args.sizes:
+        body = build_body(sections, args.seed + sections)
+        edited = edit_one_section(body)
+        measurements.append(measure(f"{sections} sections: legacy truncated", body, legacy))
+        measurements.append(measure(f"{sections} sections: map-reduce cold", body, map_reduce))
+        measurements.append(measure(f"{sections} sections: map-reduce warm", body, map_reduce))
+        measurements.append(measure(f"{sections} sections: one section edited", edited, map_reduce))
+    engine.dispose()
+
+    config = {
+        "sizes": args.sizes,
+        "latency_ms": args.latency_ms,
+        "single_call_chars": settings.ai_single_call_chars,
+        "chunk_chars": settings.ai_chunk_chars,
+        "map_concurrency": settings.ai_map_concurrency,
+    }
+    report = build_report("summarize", config, measurements)
+    print_table(report)
+    print()
+    print(f"{'name':<40} {'chars':>9} {'seen':>9} {'calls':>6} {'in_tok':>9} {'out_tok':>8}")
+    for row in report["results"]:
+        print(
+            f"{row['name']:<40} {row['report_chars']:>9} {row['seen_chars']:>9} {row['calls']:>6} "
+            f"{row['input_tokens']:>9} {row['output_tokens']:>8}"
+        )
+    if args.out:
+        write_report(report, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+﻿from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta
+from pathlib import Path
+import random
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+TOPICS = ["rtl", "simulation", "debug", "vivado", "matlab", "cdr", "mlsd", "fec", "timing", "layout"]
+VERBS = ["Finished", "Reviewed", "Refactored", "Measured", "Documented", "Verified", "Tuned", "Profiled"]
+NOUNS = ["FFT stage", "equalizer tap", "CDR loop", "testbench", "timing report", "FEC decoder", "PLL model"]
+DELIVERABLE_TYPES = ["paper", "patent", "report", "tapeout", "presentation"]
+
+
+@dataclass(frozen=True)
+class WorkloadSpec:
+    ideas: int = 5
+    tasks_per_idea: int = 20
+    deliverables_per_idea: int = 3
+    report_years: int = 1
+    reports_per_day: float = 1.0
+    max_dependencies: int = 2
+    start_year: int = 2024
+    seed: int = 42
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+PRESETS: dict[str, WorkloadSpec] = {
+    "tiny": WorkloadSpec(ideas=2, tasks_per_idea=5, deliverables_per_idea=1, report_years=1, reports_per_day=0.1),
+    "small": WorkloadSpec(),
+    "medium": WorkloadSpec(ideas=20, tasks_per_idea=50, deliverables_per_idea=5, report_years=2),
+    "large": WorkloadSpec(ideas=50, tasks_per_idea=200, deliverables_per_idea=8, report_years=5, reports_per_day=2.0),
+}
+
+
+def _month(year: int, index: int) -> str:
+    year += index // 12
+    return f"{year:04d}-{index % 12 + 1:02d}"
+
+
+def render_report(rng: random.Random, day: date, sections: int = 3) -> str:
+    """Markdown in the shape of a Daily_Report_*.md: headings, checklists and free text."""
+    lines = [f"# Daily Report {day.isoformat()}", ""]
+    for _ in range(sections):
+        topic = rng.choice(TOPICS)
+        lines.append(f"## {topic.upper()} work")
+        for _ in range(rng.randint(2, 6)):
+            mark = rng.choice(["x", "x", "/", " "])
+            lines.append(f"- [{mark}] **{rng.choice(VERBS)} {rng.choice(NOUNS)} for {topic}** ({rng.randint(1, 99)})")
+        lines.append("")
+        lines.append(
+            f"Notes: {rng.choice(VERBS).lower()} the {rng.choice(NOUNS)} after the {rng.choice(TOPICS)} "
+            f"run; margin {rng.uniform(0.1, 9.9):.2f} dB."
+        )
+        lines.append("")
+    return "\n".join(lines)
+
+
+def report_days(spec: WorkloadSpec) -> list[date]:
+    rng = random.Random(spec.seed + 1)
+    start = date(spec.start_year, 1, 1)
+    days: list[date] = []
+    for offset in range(spec.report_years * 365):
+        day = start + timedelta(days=offset)
+        whole, frac = divmod(spec.reports_per_day, 1)
+        days.extend([day] * int(whole + (1 if rng.random() < frac else 0)))
+    return days
+
+
+def write_report_files(spec: WorkloadSpec, target_dir: Path, limit: int | None = None) -> list[Path]:
+    """Write Daily_Report_YYYY-MM-DD.md files (one per day) for bulk-ingest benchmarks."""
+    rng = random.Random(spec.seed + 2)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    written: list[Path] = []
+    for day in sorted(set(report_days(spec)))[:limit]:
+        path = target_dir / f"Daily_Report_{day.isoformat()}.md"
+        path.write_text(render_report(rng, day), encoding="utf-8")
+        written.append(path)
+    return written
+
+
+def generate_workspace(db: Session, workspace_id: str, spec: WorkloadSpec, batch_size: int = 2000) -> dict[str, int]:
+    """Populate `workspace_id` deterministically from `spec` using batched Core inserts."""
+    # app.* is imported here, not at module level: importing app.db binds the engine to
+    # DATABASE_URL, and the harness must be able to point it at the bench DB first.
+    from app.bodies import body_hash, store
+    from app.enums import DeliverableStatus, ItemStatus
+    from app.models import Deliverable, Idea, Task, UpdateLog, Workspace, new_id
+
+    rng = random.Random(spec.seed)
+    now = datetime.utcnow()
+    statuses = [status.value for status in ItemStatus]
+
+    ideas: list[dict] = []
+    tasks: list[dict] = []
+    deliverables: list[dict] = []
+    for i in range(spec.ideas):
+        idea_id = new_id()
+        start = rng.randint(0, 11)
+        ideas.append(
+            {
+                "id": idea_id,
+                "workspace_id": workspace_id,
+                "title": f"Idea {i:04d}: {rng.choice(TOPICS)} {rng.choice(NOUNS)}",
+                "description": "Generated benchmark idea",
+                "status": rng.choice(statuses),
+                "main_topic_flag": i % 7 == 0,
+                "start_month": _month(spec.start_year, start),
+                "target_month": _month(spec.start_year, start + rng.randint(3, 24)),
+                "priority_inputs": {key: rng.randint(1, 5) for key in ("impact", "effort", "risk", "urgency")},
+                "revision": 1,
+                "created_at": now,
+                "updated_at": now,
+            }
+        )
+
+        idea_task_ids: list[str] = []
+        for t in range(spec.tasks_per_idea):
+            task_id = new_id()
+            begin = start + rng.randint(0, 12)
+            end = begin + rng.randint(0, 6)
+            upstream = rng.sample(idea_task_ids, k=min(len(idea_task_ids), rng.randint(0, spec.max_dependencies)))
+            tasks.append(
+                {
+                    "id": task_id,
+                    "workspace_id": workspace_id,
+                    "idea_id": idea_id,
+                    "title": f"Task {i:04d}.{t:04d}: {rng.choice(VERBS)} {rng.choice(NOUNS)}",
+                    "status": rng.choice(statuses),
+                    "importance": rng.randint(1, 5),
+                    "start_month": _month(spec.start_year, begin),
+                    "end_month": _month(spec.start_year, end),
+                    "due_month": _month(spec.start_year, end + rng.randint(0, 2)),
+                    "dependencies": upstream,
+                    "sort_order": t,
+                    "revision": 1,
+                    "updated_at": now,
+                }
+            )
+            idea_task_ids.append(task_id)
+
+        for d in range(spec.deliverables_per_idea):
+            deliverables.append(
+                {
+                    "id": new_id(),
+                    "workspace_id": workspace_id,
+                    "idea_id": idea_id,
+                    "title": f"Deliverable {i:04d}.{d:02d}",
+                    "type": rng.choice(DELIVERABLE_TYPES),
+                    "due_month": _month(spec.start_year, start + rng.randint(3, 24)),
+                    "status": rng.choice([status.value for status in DeliverableStatus]),
+                    "revision": 1,
+                }
+            )
+
+    def flush(model: type, rows: list[dict]) -> None:
+        for offset in range(0, len(rows), batch_size):
+            db.execute(insert(model), rows[offset : offset + batch_size])
+
+    flush(Idea, ideas)
+    flush(Task, tasks)
+    flush(Deliverable, deliverables)
+
+    log_rng = random.Random(spec.seed + 3)
+    pending: list[dict] = []
+    texts: dict[str, str] = {}
+    log_count = 0
+    for n, day in enumerate(report_days(spec)):
+        idea = ideas[n % len(ideas)] if ideas else None
+        if idea is None:
+            break
+        body = render_report(log_rng, day)
+        digest = body_hash(body)
+        texts[digest] = body
+        pending.append(
+            {
+                "id": new_id(),
+                "workspace_id": workspace_id,
+                "idea_id": idea["id"],
+                "source": "daily_report",
+                "title": f"Daily_Report_{day.isoformat()}_{n}.md",
+                "body_hash": digest,
+                "ai_summary": body.splitlines()[2][:200],
+                "ai_tags": sorted({tag for tag in TOPICS if tag in body.lower()})[:5],
+                "ai_risk_flags": [],
+                "revision": 1,
+                "created_at": datetime(day.year, day.month, day.day),
+            }
+        )
+        if len(pending) >= batch_size:
+            store(db.connection(), texts)
+            flush(UpdateLog, pending)
+            log_count += len(pending)
+            pending, texts = [], {}
+    store(db.connection(), texts)
+    flush(UpdateLog, pending)
+    log_count += len(pending)
+
+    db.execute(update(Workspace).where(Workspace.id == workspace_id).values(revision=Workspace.revision + 1))
+    db.commit()
+    return {"ideas": len(ideas), "tasks": len(tasks), "deliverables": len(deliverables), "update_logs": log_count}
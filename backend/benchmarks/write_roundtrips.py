@@ -0,0 +1,180 @@
+﻿"""Database round trips per mutation: guarded UPDATE ... RETURNING vs the load/commit/refresh path.
+
+Runs the mutation endpoints in-process against a generated workspace and counts, per request,
+the statements sent to the database plus the COMMIT (the auth lookups every request makes are
+subtracted). The `legacy` mode replays the previous write path on the same code: RETURNING is
+switched off on the engine's dialect and every response is built by a refresh after commit.
+
+    python -m benchmarks.write_roundtrips
+    python -m benchmarks.write_roundtrips --preset small --requests 200 --out roundtrips.json
+"""
+
+from __future__ import annotations
+
+import argparse
+from contextlib import contextmanager
+import os
+from pathlib import Path
+import tempfile
+import threading
+import time
+from typing import Iterator
+
+from .report import Measurement, build_report, print_table, write_report
+from .workload import PRESETS
+
+
+class RoundTripCounter:
+    """Statements and commits issued by request threads (background workers are ignored)."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def _hit(self, *args) -> None:
+        if not threading.current_thread().name.startswith("researchos-"):
+            with self._lock:
+                self.count += 1
+
+    def attach(self, engine) -> None:
+        from sqlalchemy import event
+
+        event.listen(engine, "before_cursor_execute", self._hit)
+        event.listen(engine, "commit", self._hit)
+
+    def measure(self, call) -> tuple[int, object]:
+        before = self.count
+        result = call()
+        return self.count - before, result
+
+
+@contextmanager
+def legacy_write_path(engine) -> Iterator[None]:
+    """UPDATE + SELECT for revisions, ORM load for every patch, refresh after every commit."""
+    from app import main
+
+    def commit_and_refresh(db, obj, to_schema):
+        db.commit()
+        db.refresh(obj)
+        return to_schema(obj)
+
+    returning, commit_as = engine.dialect.update_returning, main.commit_as
+    engine.dialect.update_returning, main.commit_as = False, commit_and_refresh
+    try:
+        yield
+    finally:
+        engine.dialect.update_returning, main.commit_as = returning, commit_as
+
+
+def run_mode(mode: str, client, headers: dict, counter: RoundTripCounter, requests: int) -> list[Measurement]:
+    ideas = client.get("/ideas", headers=headers).json()
+    tasks = client.get("/tasks", headers=headers).json()
+    deliverables = client.get("/export/workspace", headers=headers).json()["deliverables"]
+    if not ideas or not tasks or not deliverables:
+        raise SystemExit("workspace needs ideas, tasks and deliverables; use a larger --preset")
+    statuses = ["planned", "in_progress", "completed"]
+
+    def pick(rows: list[dict], i: int) -> str:
+        return rows[i % len(rows)]["id"]
+
+    scenarios = {
+        "PATCH /tasks/{id} status": lambda i: client.patch(
+            f"/tasks/{pick(tasks, i)}", headers=headers, json={"status": statuses[i % 3]}
+        ),
+        "PATCH /tasks/{id} months": lambda i: client.patch(
+            f"/tasks/{pick(tasks, i)}", headers=headers, json={"start_month": "2026-01", "end_month": f"2026-{i % 9 + 2:02d}"}
+        ),
+        "PATCH /tasks/{id} importance": lambda i: client.patch(
+            f"/tasks/{pick(tasks, i)}", headers=headers, json={"importance": i % 5 + 1}
+        ),
+        "PATCH /deliverables/{id}": lambda i: client.patch(
+            f"/deliverables/{pick(deliverables, i)}", headers=headers, json={"title": f"Deliverable rev {i}"}
+        ),
+        "PATCH /ideas/{id}": lambda i: client.patch(
+            f"/ideas/{pick(ideas, i)}", headers=headers, json={"description": f"rev {i}"}
+        ),
+        "POST /ideas/{id}/tasks": lambda i: client.post(
+            f"/ideas/{pick(ideas, i)}/tasks",
+            headers=headers,
+            json={"title": f"bench {i}", "start_month": "2026-01", "end_month": "2026-03", "due_month": "2026-03"},
+        ),
+    }
+
+    # Every authenticated request pays the same token/workspace lookups; report the write only.
+    from app.db import SessionLocal
+    from app.main import _resolve_user
+
+    with SessionLocal() as db:
+        auth_trips, _ = counter.measure(lambda: _resolve_user(headers["Authorization"].split(" ", 1)[1], db))
+    measurements: list[Measurement] = []
+    for name, request in scenarios.items():
+        request(0)  # warm-up, not recorded
+        measurement = Measurement(name=f"{mode}: {name}", extra={"mode": mode})
+        trips: list[int] = []
+        started = time.perf_counter()
+        for i in range(1, requests + 1):
+            t0 = time.perf_counter()
+            spent, response = counter.measure(lambda: request(i))
+            if response.status_code >= 400:
+                measurement.errors += 1
+                continue
+            measurement.samples_ms.append((time.perf_counter() - t0) * 1000)
+            trips.append(spent - auth_trips)
+        measurement.wall_s = time.perf_counter() - started
+        measurement.extra["round_trips"] = round(sum(trips) / len(trips), 2) if trips else 0.0
+        measurements.append(measurement)
+    return measurements
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="tiny")
+    parser.add_argument("--requests", type=int, default=50, help="per scenario and mode")
+    parser.add_argument("--modes", nargs="+", choices=["legacy", "returning"], default=["legacy", "returning"])
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="researchos-roundtrips-"))
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir / 'roundtrips.db'}"
+    os.environ.setdefault("JOBS_INLINE_WORKER", "false")
+    os.environ.setdefault("REQUEST_LOG_ENABLED", "false")
+
+    from .endpoints import prepare_database
+
+    prepare_database(PRESETS[args.preset], reset=True)
+
+    from fastapi.testclient import TestClient
+
+    from app.config import settings
+    from app.db import engine
+    from app.main import app
+
+    counter = RoundTripCounter()
+    counter.attach(engine)
+    measurements: list[Measurement] = []
+    with TestClient(app) as client:
+        login = client.post("/auth/login", json={"email": settings.owner_email, "password": settings.owner_password})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+        for mode in args.modes:
+            if mode == "legacy":
+                with legacy_write_path(engine):
+                    measurements.extend(run_mode(mode, client, headers, counter, args.requests))
+            else:
+                measurements.extend(run_mode(mode, client, headers, counter, args.requests))
+
+    config = {"preset": args.preset, "requests": args.requests, "dialect": engine.dialect.name}
+    report = build_report("write_roundtrips", config, measurements)
+    print_table(report)
+    print()
+    print(f"{'round trips per mutation':<40} " + " ".join(f"{mode:>10}" for mode in args.modes))
+    by_name: dict[str, dict[str, float]] = {}
+    for row in report["results"]:
+        by_name.setdefault(row["name"].split(": ", 1)[1], {})[row["mode"]] = row["round_trips"]
+    for name, trips in by_name.items():
+        print(f"{name:<40} " + " ".join(f"{trips.get(mode, 0.0):>10.2f}" for mode in args.modes))
+    if args.out:
+        write_report(report, args.out)
+
+
+if __name__ == "__main__":
+    main()
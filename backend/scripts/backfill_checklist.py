@@ -0,0 +1,27 @@
+﻿"""Fill checklist_items for update logs ingested before checklist extraction existed.
+
+    python -m scripts.backfill_checklist
+    python -m scripts.backfill_checklist --rebuild      # re-extract every log (after a parser change)
+"""
+
+import argparse
+
+from app import models  # noqa: F401
+from app.db import Base, SessionLocal, engine
+from app.services import backfill_checklist_items
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rebuild", action="store_true", help="replace existing rows instead of skipping those logs")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine, tables=[models.ChecklistItem.__table__])
+    with SessionLocal() as db:
+        scanned, written = backfill_checklist_items(db, rebuild=args.rebuild, batch_size=args.batch_size)
+    print(f"checklist_backfill_ok logs={scanned} items={written}")
+
+
+if __name__ == "__main__":
+    main()
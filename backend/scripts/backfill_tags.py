@@ -0,0 +1,27 @@
+﻿"""Fill the update_log_tags index from UpdateLog.ai_tags for logs written before it existed.
+
+    python -m scripts.backfill_tags
+    python -m scripts.backfill_tags --rebuild      # re-index every log
+"""
+
+import argparse
+
+from app import models  # noqa: F401
+from app.db import Base, SessionLocal, engine
+from app.services import backfill_log_tags
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rebuild", action="store_true", help="replace existing rows instead of skipping those logs")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine, tables=[models.UpdateLogTag.__table__])
+    with SessionLocal() as db:
+        scanned, written = backfill_log_tags(db, rebuild=args.rebuild, batch_size=args.batch_size)
+    print(f"tag_backfill_ok logs={scanned} tags={written}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+﻿"""Import-time profile of the API process (`python -X importtime`), summarized.
+
+    python -m scripts.profile_imports
+    python -m scripts.profile_imports --module openai --top 15
+"""
+
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass
+import subprocess
+import sys
+
+
+@dataclass
+class ImportTiming:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(stderr: str) -> list[ImportTiming]:
+    timings: list[ImportTiming] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:") :].split("|", 2)
+            indent = len(name) - len(name.lstrip())
+            timings.append(ImportTiming(name.strip(), int(self_us), int(cumulative_us), (indent - 1) // 2))
+        except ValueError:
+            continue
+    return timings
+
+
+def by_package(timings: list[ImportTiming]) -> list[tuple[str, int]]:
+    totals: dict[str, int] = {}
+    for timing in timings:
+        package = timing.module.split(".", 1)[0]
+        totals[package] = totals.get(package, 0) + timing.self_us
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main", help="module to import (default: app.main)")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {args.module}"],
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(proc.stderr[-2000:])
+    timings = parse_importtime(proc.stderr)
+    root = next((t for t in reversed(timings) if t.module == args.module), None)
+    total_us = root.cumulative_us if root else sum(t.self_us for t in timings)
+
+    print(f"import {args.module}: {total_us / 1000:.1f} ms, {len(timings)} modules\n")
+    print(f"{'package':<32}{'self ms':>10}{'share':>8}")
+    for package, self_us in by_package(timings)[: args.top]:
+        print(f"{package:<32}{self_us / 1000:>10.1f}{self_us / total_us:>8.0%}")
+
+    print(f"\n{'module (cumulative)':<48}{'cum ms':>10}{'self ms':>10}")
+    # Top-level imports only: nested modules are already inside their parent's cumulative time.
+    shallow = [t for t in timings if t.depth <= 1]
+    for timing in sorted(shallow, key=lambda t: t.cumulative_us, reverse=True)[: args.top]:
+        print(f"{timing.module:<48}{timing.cumulative_us / 1000:>10.1f}{timing.self_us / 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+﻿"""Recompute the activity_daily rollup from update logs and checklist items.
+
+    python -m scripts.rebuild_activity
+
+The rollup is maintained on every write; run this after changing rows outside the app
+(bulk SQL, restoring a backup) or if counts look off.
+"""
+
+import argparse
+
+from app import activity, models  # noqa: F401
+from app.db import Base, SessionLocal, engine
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    Base.metadata.create_all(bind=engine, tables=[models.ActivityDaily.__table__])
+    with SessionLocal() as db:
+        written = activity.rebuild(db)
+    print(f"activity_rebuild_ok rows={written}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+﻿"""Rebuild the related-reports index from every update log (drops deleted logs, applies new settings).
+
+    python -m scripts.rebuild_similarity
+"""
+
+import time
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from app.db import SessionLocal
+from app.models import UpdateLog
+from app.similarity import index, log_text
+
+
+def main() -> None:
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        logs = db.scalars(select(UpdateLog).options(selectinload(UpdateLog.body)).execution_options(yield_per=500))
+        count = index.rebuild((log.id, log.workspace_id, log_text(log)) for log in logs)
+    print(f"similarity_rebuild_ok docs={count} dir={index.directory} seconds={time.perf_counter() - started:.1f}")
+
+
+if __name__ == "__main__":
+    main()
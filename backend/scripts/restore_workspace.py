@@ -0,0 +1,41 @@
+﻿"""Load a workspace export (JSON, or NDJSON from /export/workspace/stream; either may be gzipped).
+
+    python -m scripts.restore_workspace workspace.ndjson                 # merge into the owner workspace
+    python -m scripts.restore_workspace backup.ndjson.gz --mode replace  # drop the workspace's data first
+    python -m scripts.restore_workspace workspace.json --workspace-id <id> --batch-size 20000
+
+Same loader as POST /restore/workspace, without the upload or the job queue: use it for
+large snapshots, staging refreshes and disaster recovery.
+"""
+
+import argparse
+from pathlib import Path
+import time
+
+from app import restore
+from app.config import settings
+from app.db import Base, SessionLocal, engine
+from app.services import ensure_owner_context
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--mode", choices=restore.MODES, default="merge")
+    parser.add_argument("--workspace-id", default=None, help="default: the owner workspace")
+    parser.add_argument("--batch-size", type=int, default=settings.restore_batch_size)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        workspace_id = args.workspace_id or ensure_owner_context(db)[1].id
+        counts = restore.restore_workspace(
+            db, workspace_id, restore.read_snapshot(args.path), mode=args.mode, batch_size=args.batch_size
+        )
+    summary = " ".join(f"{name}={count}" for name, count in counts.items())
+    print(f"restore_ok {summary} seconds={time.perf_counter() - started:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,158 @@
-﻿from fastapi.testclient import TestClient
+﻿from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import multiprocessing
+import time
 
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, func, select, update
+
+from app import jobs, usage
 from app.config import settings
+from app.db import SessionLocal
+from app.events import change_bus
 from app.main import app
+from app.models import AIUsage, Idea
+from app.services import purge_idea
+
+
+def wait_for_job(client: TestClient, headers: dict[str, str], response, label: str) -> dict:
+    if response.status_code != 202:
+        raise SystemExit(f"{label} failed: {response.status_code} {response.text}")
+    job = response.json()
+    deadline = time.monotonic() + 300
+    while job["status"] not in ("succeeded", "failed"):
+        if time.monotonic() > deadline:
+            raise SystemExit(f"{label} timed out: {job}")
+        time.sleep(0.2)
+        job = client.get(f"/jobs/{job['id']}", headers=headers).json()
+    if job["status"] != "succeeded":
+        raise SystemExit(f"{label} failed: {job['error']}")
+    return job["result"]
+
+
+def _worker_month_to_date() -> float:
+    # Runs in a job worker process: records one call, left for the exit flush to write.
+    spent = usage.ledger.month_to_date()
+    usage.ledger.record("smoke", "smoke", "ok", operation="smoke")
+    return spent
+
+
+def check_worker_usage() -> float:
+    """A spawned job worker process sees the spend already in `ai_usage` and flushes its own on exit."""
+    with SessionLocal() as db:
+        month = usage.current_month()
+        db.add(AIUsage(month=month, provider="smoke", model="smoke", operation="smoke", outcome="ok", cost_usd=1.25))
+        db.commit()
+        expected = db.scalar(select(func.sum(AIUsage.cost_usd)).where(AIUsage.month == month))
+    try:
+        spawn = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(1, mp_context=spawn, initializer=jobs._init_process) as pool:
+            spent = pool.submit(_worker_month_to_date).result()
+        if abs(spent - expected) > 1e-9:
+            raise SystemExit(f"worker usage failed: month-to-date {spent} in the worker, {expected} in ai_usage")
+        with SessionLocal() as db:
+            flushed = db.scalar(select(func.count()).select_from(AIUsage).where(AIUsage.operation == "smoke"))
+        if flushed != 2:
+            raise SystemExit(f"worker usage failed: {flushed - 1} of 1 worker usage rows flushed on exit")
+    finally:
+        with SessionLocal() as db:
+            db.execute(delete(AIUsage).where(AIUsage.operation == "smoke"))
+            db.commit()
+    return spent
+
+
+def check_shared_budget() -> str:
+    """Two ledgers on one database (two processes): once one spends the budget, the other degrades."""
+    first, second = usage.UsageLedger(), usage.UsageLedger()
+    refresh = settings.ai_usage_refresh_seconds
+    settings.ai_usage_refresh_seconds = 0
+    try:
+        before = usage.budget_decision(second)
+        input_price, _ = usage.price_per_1m(settings.openai_model)
+        remaining = settings.ai_monthly_budget_usd * settings.ai_budget_local_ratio - before.spent_usd
+        tokens = int(max(remaining, 0.0) / input_price * 1_000_000) + 1
+        first.record("smoke", settings.openai_model, "ok", input_tokens=tokens, operation="smoke")
+        first.flush()
+        after = usage.budget_decision(second)
+        if after.action != "local":
+            raise SystemExit(f"shared budget failed: second ledger decided {after.action!r} at {after.spent_usd} USD")
+    finally:
+        settings.ai_usage_refresh_seconds = refresh
+        with SessionLocal() as db:
+            db.execute(delete(AIUsage).where(AIUsage.operation == "smoke"))
+            db.commit()
+    return f"{before.action} -> {after.action}"
+
+
+IDEA_FIELDS = {
+    "start_month": "2026-01",
+    "target_month": "2026-06",
+    "priority_inputs": {"impact": 3, "effort": 3, "risk": 3, "urgency": 3},
+}
+TASK_MONTHS = {"start_month": "2026-01", "end_month": "2026-02", "due_month": "2026-02"}
+
+
+def create(client: TestClient, headers: dict[str, str], path: str, body: dict) -> str:
+    response = client.post(path, headers=headers, json=body)
+    if response.status_code != 200:
+        raise SystemExit(f"create {path} failed: {response.status_code} {response.text}")
+    return response.json()["id"]
+
+
+def check_update_paths(client: TestClient, headers: dict[str, str]) -> int:
+    """A task edit through UPDATE ... RETURNING (status) and one through the ORM (importance) both bump
+    the revision, publish the same change event and refresh the cached timeline."""
+    idea_id = create(client, headers, "/ideas", {"title": "smoke update paths", **IDEA_FIELDS})
+    task_id = create(client, headers, f"/ideas/{idea_id}/tasks", {"title": "smoke task", **TASK_MONTHS})
+    workspace_id = client.get("/me", headers=headers).json()["workspace_id"]
+    for path, patch in (("returning", {"status": "in_progress"}), ("orm", {"importance": 5})):
+        cached = client.get("/timeline?year=2026", headers=headers).json()
+        seq = change_bus.current_seq(workspace_id)
+        response = client.patch(f"/tasks/{task_id}", headers=headers, json=patch)
+        if response.status_code != 200:
+            raise SystemExit(f"{path} update failed: {response.status_code} {response.text}")
+        revision = response.json()["revision"]
+        published, _ = change_bus.replay(workspace_id, seq)
+        events = [(item.type, item.id, item.op, item.revision, item.idea_id) for item in published]
+        if revision <= cached["revision"] or events != [("task", task_id, "update", revision, idea_id)]:
+            raise SystemExit(f"{path} update failed: revision {cached['revision']} -> {revision}, events {events}")
+        fresh = client.get("/timeline?year=2026", headers=headers).json()
+        row = next(task for item in fresh["ideas"] for task in item["tasks"] if task["id"] == task_id)
+        field, value = next(iter(patch.items()))
+        if fresh["revision"] != revision or row[field] != value:
+            raise SystemExit(f"{path} update failed: timeline at revision {fresh['revision']} shows {row}")
+    client.delete(f"/ideas/{idea_id}", headers=headers)
+    return revision
+
+
+def check_changes_hide_deleted_children(client: TestClient, headers: dict[str, str]) -> int:
+    """/changes sends none of a soft-deleted idea's tasks, deliverables or logs while its purge is pending."""
+    idea_id = create(client, headers, "/ideas", {"title": "smoke deleted idea", **IDEA_FIELDS})
+    paper = {"title": "smoke paper", "type": "paper", "due_month": "2026-05"}
+    children = {
+        create(client, headers, f"/ideas/{idea_id}/tasks", {"title": "smoke task", **TASK_MONTHS}),
+        create(client, headers, f"/ideas/{idea_id}/deliverables", paper),
+        create(client, headers, f"/ideas/{idea_id}/update_logs", {"title": "smoke log", "body_md": "- [x] smoke"}),
+    }
+    # The state DELETE /ideas/{id} leaves behind until its purge job runs.
+    with SessionLocal() as db:
+        db.execute(update(Idea).where(Idea.id == idea_id).values(deleted_at=datetime.utcnow()))
+        db.commit()
+    try:
+        cursor, sent = "0", set()
+        while True:
+            page = client.get(f"/changes?since={cursor}&limit=1000", headers=headers).json()
+            for section in ("tasks", "deliverables", "update_logs"):
+                sent.update(row["id"] for row in page[section])
+            cursor = page["next_cursor"]
+            if not page["has_more"]:
+                break
+        if sent & children:
+            raise SystemExit(f"changes failed: children of a deleted idea were sent: {sorted(sent & children)}")
+    finally:
+        with SessionLocal() as db:
+            purge_idea(db, db.get(Idea, idea_id).workspace_id, idea_id)
+    return len(children)
 
 
 def main() -> None:
@@ -17,8 +168,7 @@ def main() -> None:
         headers = {"Authorization": f"Bearer {token}"}
 
         seed = client.post("/seed/import?path=../seed/mvp_seed_plan_2026.json", headers=headers)
-        if seed.status_code != 200:
-            raise SystemExit(f"seed import failed: {seed.status_code} {seed.text}")
+        seed_result = wait_for_job(client, headers, seed, "seed import")
 
         ideas = client.get("/ideas", headers=headers)
         if ideas.status_code != 200 or not ideas.json():
@@ -29,8 +179,7 @@ def main() -> None:
             f"/ingest/daily_reports/bulk?idea_id={idea_id}&reports_dir=C:/Research/07_reports",
             headers=headers,
         )
-        if bulk.status_code != 200:
-            raise SystemExit(f"bulk ingest failed: {bulk.status_code} {bulk.text}")
+        bulk_result = wait_for_job(client, headers, bulk, "bulk ingest")
 
         dashboard = client.get("/dashboard/overview?month=2026-02", headers=headers)
         if dashboard.status_code != 200:
@@ -52,13 +201,22 @@ def main() -> None:
         if export.status_code != 200:
             raise SystemExit(f"export failed: {export.status_code} {export.text}")
 
+        update_revision = check_update_paths(client, headers)
+        hidden_children = check_changes_hide_deleted_children(client, headers)
+        worker_spent = check_worker_usage()
+        shared_budget = check_shared_budget()
+
         print("smoke_ok")
-        print("seed:", seed.json())
-        print("bulk:", bulk.json())
+        print("seed:", seed_result)
+        print("bulk:", bulk_result)
         print("dashboard:", dashboard.json())
         print("progress:", progress.json())
         print("risks:", len(risks.json()))
         print("next_actions:", actions.json())
+        print("update paths revision:", update_revision)
+        print("hidden children of deleted idea:", hidden_children)
+        print("worker month-to-date:", worker_spent)
+        print("shared budget:", shared_budget)
 
 
 if __name__ == "__main__":
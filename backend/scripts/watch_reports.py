@@ -0,0 +1,58 @@
+﻿"""Watch REPORTS_DIR and ingest new or edited reports into an idea until interrupted.
+
+    python -m scripts.watch_reports --idea-id <idea>
+    python -m scripts.watch_reports --idea-id <idea> --once      # catch up, then exit
+    python -m scripts.watch_reports --idea-id <idea> --polling   # stat polling instead of file events
+
+Defaults come from REPORTS_DIR, REPORTS_PATTERN, WATCH_IDEA_ID and the WATCH_* settings.
+Run it instead of WATCH_REPORTS_ENABLED when the API has more than one process.
+"""
+
+import argparse
+from pathlib import Path
+import signal
+
+from app import models  # noqa: F401
+from app.config import settings
+from app.db import Base, engine
+from app.instrumentation import configure_logging
+from app.watcher import ReportWatcher
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--idea-id", default=settings.watch_idea_id)
+    parser.add_argument("--reports-dir", type=Path, default=Path(settings.reports_dir))
+    parser.add_argument("--pattern", default=settings.reports_pattern)
+    parser.add_argument("--debounce", type=float, default=settings.watch_debounce_seconds, help="seconds")
+    parser.add_argument("--polling", action="store_true", default=settings.watch_force_polling)
+    parser.add_argument("--once", action="store_true", help="ingest what changed since the last run and exit")
+    args = parser.parse_args()
+    if not args.idea_id:
+        parser.error("--idea-id (or WATCH_IDEA_ID) is required")
+
+    configure_logging()
+    Base.metadata.create_all(bind=engine, tables=[models.WatchedFile.__table__])
+    watcher = ReportWatcher(
+        args.reports_dir,
+        args.pattern,
+        args.idea_id,
+        debounce=0.0 if args.once else args.debounce,
+        poll_seconds=settings.watch_poll_seconds,
+        force_polling=args.polling,
+        batch_size=settings.upload_batch_size,
+    )
+    if args.once:
+        watcher.load_checkpoint()
+        watcher.catch_up()
+        print(f"watch_once_ok {dict(watcher.counts)}")
+        return
+    signal.signal(signal.SIGTERM, lambda *_: watcher.stop())
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        watcher.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+﻿"""Standalone job worker: claims queued jobs and runs them in a process pool.
+
+    python -m scripts.worker
+    python -m scripts.worker --concurrency 4
+    python -m scripts.worker --threads          # thread pool instead of processes
+
+Run it next to the API with JOBS_INLINE_WORKER=false.
+"""
+
+import argparse
+import os
+import signal
+
+from app.instrumentation import configure_logging
+from app.jobs import Worker
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--threads", action="store_true", help="use threads instead of worker processes")
+    args = parser.parse_args()
+
+    configure_logging()
+    worker = Worker(args.concurrency, use_processes=not args.threads)
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        worker.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@
 import { useEffect, useState } from "react";
 import { Sidebar } from "../components/sidebar";
 import { useAuth } from "../lib/auth-context";
-import { API_BASE, fetchRetry } from "../lib/api";
+import { API_BASE, fetchRetry, waitForJob, type Job } from "../lib/api";
 
 type AIStatus = {
   configured: boolean;
@@ -39,7 +39,10 @@ export default function SettingsPage() {
   async function importSeed() {
     if (!token) return;
     const res = await fetchRetry(`${API_BASE}/seed/import?path=../seed/mvp_seed_plan_2026.json`, { method: "POST", headers });
-    setMessage(res.ok ? "Seed imported successfully" : `Seed import failed: ${res.status}`);
+    if (!res.ok) { setMessage(`Seed import failed: ${res.status}`); return; }
+    setMessage("Seed import queued…");
+    const job = await waitForJob((await res.json()) as Job, headers);
+    setMessage(job.status === "succeeded" ? "Seed imported successfully" : `Seed import failed: ${job.error}`);
   }
 
   async function ingestReports() {
@@ -50,7 +53,11 @@ export default function SettingsPage() {
     if (ideasData.length === 0) { setMessage("No ideas found — import seed first"); return; }
     const ideaId = ideasData[0].id;
     const res = await fetchRetry(`${API_BASE}/ingest/daily_reports/bulk?idea_id=${ideaId}`, { method: "POST", headers });
-    setMessage(res.ok ? "Reports ingested successfully" : `Ingest failed: ${res.status}`);
+    if (!res.ok) { setMessage(`Ingest failed: ${res.status}`); return; }
+    const job = await waitForJob((await res.json()) as Job, headers, (j) => {
+      if (j.progress_total) setMessage(`Ingesting reports… ${j.progress_current}/${j.progress_total}`);
+    });
+    setMessage(job.status === "succeeded" ? `Reports ingested (${job.result?.imported_logs ?? 0} new)` : `Ingest failed: ${job.error}`);
   }
 
   const aiIndicatorClass = aiStatus ? `ai-indicator ${aiStatus.status}` : "ai-indicator";
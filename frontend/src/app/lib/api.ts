@@ -22,3 +22,31 @@ export async function fetchRetry(
   }
   throw new Error("fetchRetry exhausted");
 }
+
+export type Job = {
+  id: string;
+  kind: string;
+  status: "queued" | "running" | "succeeded" | "failed";
+  progress_current: number;
+  progress_total: number | null;
+  result: Record<string, number> | null;
+  error: string | null;
+};
+
+/** Poll a background job (bulk ingest, seed import) until it finishes */
+export async function waitForJob(
+  job: Job,
+  headers: HeadersInit,
+  onProgress?: (job: Job) => void,
+  intervalMs = 1000,
+): Promise<Job> {
+  let current = job;
+  while (current.status === "queued" || current.status === "running") {
+    await new Promise((r) => setTimeout(r, intervalMs));
+    const res = await fetchRetry(`${API_BASE}/jobs/${current.id}`, { headers });
+    if (!res.ok) throw new Error(`job poll failed: ${res.status}`);
+    current = (await res.json()) as Job;
+    onProgress?.(current);
+  }
+  return current;
+}
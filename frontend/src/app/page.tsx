@@ -6,7 +6,7 @@ import Link from "next/link";
 import { IconThemeLight, IconThemeDark, IconRefresh, IconChevronRight, IconGrip } from "./components/icons";
 import { Sidebar } from "./components/sidebar";
 import { statusClass, statusLabel } from "./lib/status";
-import { API_BASE, fetchRetry } from "./lib/api";
+import { API_BASE, fetchRetry, waitForJob, type Job } from "./lib/api";
 import { useAuth } from "./lib/auth-context";
 
 type Idea = { id: string; title: string; status: string; start_month: string; target_month: string };
@@ -213,6 +213,8 @@ export default function Home() {
     const params = new URLSearchParams({ idea_id: id });
     const res = await fetchRetry(`${API_BASE}/ingest/daily_reports/bulk?${params.toString()}`, { method: "POST", headers });
     if (!res.ok) throw new Error(`ingest failed: ${res.status}`);
+    const job = await waitForJob((await res.json()) as Job, headers);
+    if (job.status !== "succeeded") throw new Error(`ingest failed: ${job.error}`);
   }
 
   async function loadIntelligence(ideaId?: string) {